@@ -0,0 +1,121 @@
+"""Run many prompts through the agent loop concurrently, with resumable JSONL results."""
+
+import asyncio
+import io
+import json
+import os
+import shutil
+import tempfile
+import time
+from .console import routed_stdout, set_task_output
+
+
+def load_prompts(path):
+    """
+    Read prompts from a JSONL file.
+
+    Each line is either {"id": ..., "prompt": ...} or a bare JSON string.
+    Lines without an id get their 1-based line number as id.
+
+    Returns:
+        list: (id, prompt) tuples in file order
+    """
+    prompts = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line_number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            if isinstance(entry, str):
+                entry = {"prompt": entry}
+            prompts.append((str(entry.get("id", line_number)), entry["prompt"]))
+    return prompts
+
+
+def load_completed_ids(path):
+    """Return the ids that already have a successful result in a results file (the checkpoint)."""
+    completed = set()
+    if not os.path.exists(path):
+        return completed
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # A run killed mid-write can leave a partial last line
+                continue
+            if record.get("error") is None:
+                completed.add(str(record["id"]))
+            else:
+                completed.discard(str(record["id"]))
+    return completed
+
+
+async def run_batch(prompts_path, results_path, run_prompt, source_directory, concurrency=4):
+    """
+    Run every prompt in prompts_path and stream one JSON result per line to results_path.
+
+    Each task gets its own copy of source_directory, so concurrent sessions cannot see
+    each other's writes. Prompts that already have a successful result in results_path
+    are skipped, so an interrupted batch resumes where it stopped.
+
+    Args:
+        prompts_path (str): JSONL file of prompts (see load_prompts)
+        results_path (str): JSONL file results are appended to
+        run_prompt: Coroutine function (prompt, working_directory) -> final response text
+        source_directory (str): Directory copied for each task
+        concurrency (int): Maximum number of sessions running at once
+
+    Returns:
+        dict: Counts of completed, failed and skipped prompts
+    """
+    prompts = load_prompts(prompts_path)
+    completed_ids = load_completed_ids(results_path)
+    pending = [(prompt_id, prompt) for prompt_id, prompt in prompts if prompt_id not in completed_ids]
+    counts = {"completed": 0, "failed": 0, "skipped": len(prompts) - len(pending)}
+
+    queue = asyncio.Queue()
+    for item in pending:
+        queue.put_nowait(item)
+
+    results_dir = os.path.dirname(results_path)
+    if results_dir:
+        os.makedirs(results_dir, exist_ok=True)
+
+    async def run_task(prompt_id, prompt, results_file):
+        buffer = io.StringIO()
+        set_task_output(buffer)
+        workspace = await asyncio.to_thread(tempfile.mkdtemp, prefix="agent-batch-")
+        working_directory = os.path.join(workspace, os.path.basename(os.path.normpath(source_directory)))
+        started = time.perf_counter()
+        record = {"id": prompt_id, "prompt": prompt, "response": None, "error": None}
+        try:
+            await asyncio.to_thread(shutil.copytree, source_directory, working_directory)
+            record["response"] = await run_prompt(prompt, working_directory)
+        except Exception as e:
+            record["error"] = str(e)
+        finally:
+            await asyncio.to_thread(shutil.rmtree, workspace, True)
+        record["seconds"] = round(time.perf_counter() - started, 3)
+        record["output"] = buffer.getvalue()
+
+        results_file.write(json.dumps(record) + "\n")
+        results_file.flush()
+        counts["failed" if record["error"] else "completed"] += 1
+        done = counts["completed"] + counts["failed"]
+        status = f"error: {record['error']}" if record["error"] else "ok"
+        console.write(f"[{done}/{len(pending)}] {prompt_id}: {status} ({record['seconds']:.2f}s)\n")
+        console.flush()
+
+    async def worker(results_file):
+        while True:
+            try:
+                prompt_id, prompt = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            # A new task gets its own copy of the context, so its output buffer stays separate
+            await asyncio.create_task(run_task(prompt_id, prompt, results_file))
+
+    with routed_stdout() as console, open(results_path, 'a', encoding='utf-8') as results_file:
+        await asyncio.gather(*(worker(results_file) for _ in range(max(1, concurrency))))
+    return counts
@@ -0,0 +1,150 @@
+"""Persistent, content-addressed cache for chat completion responses."""
+
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from groq.types.chat import ChatCompletion
+from .config import COMPLETION_CACHE_MAX_BYTES, COMPLETION_CACHE_TTL_SECONDS
+
+# Bump when the key payload or stored format changes so old entries stop matching
+CACHE_KEY_VERSION = 1
+
+
+def to_jsonable(value):
+    """json.dumps default hook: turn SDK objects (pydantic models) into plain data."""
+    if hasattr(value, "model_dump"):
+        return value.model_dump(exclude_none=True)
+    if hasattr(value, "__dict__"):
+        return vars(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def completion_cache_key(request_kwargs):
+    """
+    Build a stable hash of everything that determines a completion.
+
+    Args:
+        request_kwargs (dict): The keyword arguments passed to chat.completions.create
+            (model, messages, tools, tool_choice and any sampling parameters)
+
+    Returns:
+        str: Hex sha256 digest
+    """
+    payload = {key: value for key, value in request_kwargs.items() if key != "stream"}
+    payload["__version__"] = CACHE_KEY_VERSION
+    encoded = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=to_jsonable)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class CompletionCache:
+    """SQLite-backed key/value store with TTL expiry and size-bounded LRU eviction."""
+    def __init__(self, path, max_bytes=COMPLETION_CACHE_MAX_BYTES, ttl_seconds=COMPLETION_CACHE_TTL_SECONDS):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.connection = sqlite3.connect(path)
+        self.connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS completions (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+            """
+        )
+        self.connection.execute("CREATE INDEX IF NOT EXISTS completions_lru ON completions (last_access)")
+        self.connection.commit()
+
+    def get(self, key):
+        """Return the stored value for key, or None if it is missing or expired."""
+        row = self.connection.execute("SELECT value, created FROM completions WHERE key = ?", (key,)).fetchone()
+        now = time.time()
+        if row is None or (self.ttl_seconds and now - row[1] > self.ttl_seconds):
+            if row is not None:
+                self.connection.execute("DELETE FROM completions WHERE key = ?", (key,))
+                self.connection.commit()
+            self.misses += 1
+            return None
+
+        self.connection.execute("UPDATE completions SET last_access = ? WHERE key = ?", (now, key))
+        self.connection.commit()
+        self.hits += 1
+        return row[0]
+
+    def put(self, key, value):
+        """Store value under key, then evict least recently used entries over max_bytes."""
+        now = time.time()
+        size = len(value.encode("utf-8"))
+        self.connection.execute(
+            "INSERT OR REPLACE INTO completions (key, value, size, created, last_access) VALUES (?, ?, ?, ?, ?)",
+            (key, value, size, now, now),
+        )
+        self._evict()
+        self.connection.commit()
+
+    def _evict(self):
+        total = self.connection.execute("SELECT COALESCE(SUM(size), 0) FROM completions").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self.connection.execute("SELECT key, size FROM completions ORDER BY last_access").fetchall():
+            if total <= self.max_bytes:
+                break
+            self.connection.execute("DELETE FROM completions WHERE key = ?", (key,))
+            total -= size
+            self.evictions += 1
+
+    def stats(self):
+        """Return this session's counters plus the current number and size of entries."""
+        entries, total = self.connection.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM completions"
+        ).fetchone()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": entries,
+            "bytes": total,
+        }
+
+    def close(self):
+        self.connection.close()
+
+
+class CachedCompletions:
+    """
+    Drop-in wrapper for client.chat.completions that serves repeated requests from a CompletionCache.
+
+    Streaming requests are passed straight through, since they are consumed incrementally.
+    """
+    def __init__(self, completions, cache, verbose=False):
+        self.completions = completions
+        self.cache = cache
+        self.verbose = verbose
+
+    async def create(self, **kwargs):
+        if kwargs.get("stream"):
+            return await self.completions.create(**kwargs)
+
+        key = completion_cache_key(kwargs)
+        cached = self.cache.get(key)
+        if cached is not None:
+            if self.verbose:
+                print(f"Completion cache hit ({key[:12]})")
+            return ChatCompletion.model_validate_json(cached)
+
+        if self.verbose:
+            print(f"Completion cache miss ({key[:12]})")
+        response = await self.completions.create(**kwargs)
+        self.cache.put(key, json.dumps(response, default=to_jsonable))
+        return response
@@ -0,0 +1,109 @@
+"""Record chat completion sessions to a cassette file and replay them offline."""
+
+import asyncio
+import json
+import os
+from groq.types.chat import ChatCompletion, ChatCompletionChunk
+from .cache import completion_cache_key, to_jsonable
+
+CASSETTE_VERSION = 1
+
+
+def load_cassette(path):
+    """Return the list of recorded interactions in a cassette file."""
+    with open(path, 'r', encoding='utf-8') as f:
+        cassette = json.load(f)
+    if cassette.get("version") != CASSETTE_VERSION:
+        raise ValueError(f'Unsupported cassette version in "{path}": {cassette.get("version")}')
+    return cassette["interactions"]
+
+
+class RecordingCompletions:
+    """
+    Wrapper for client.chat.completions that writes every request and response to a cassette.
+
+    The cassette is rewritten after each interaction, so a session that dies part way
+    through still leaves every completed exchange on disk.
+    """
+    def __init__(self, completions, path):
+        self.completions = completions
+        self.path = path
+        self.interactions = []
+
+    async def create(self, **kwargs):
+        request = json.loads(json.dumps(kwargs, default=to_jsonable))
+        response = await self.completions.create(**kwargs)
+        if kwargs.get("stream"):
+            return self._record_stream(request, response)
+        self._save(request, {"completion": json.loads(json.dumps(response, default=to_jsonable))})
+        return response
+
+    async def _record_stream(self, request, stream):
+        chunks = []
+        async for chunk in stream:
+            chunks.append(json.loads(json.dumps(chunk, default=to_jsonable)))
+            yield chunk
+        self._save(request, {"chunks": chunks})
+
+    def _save(self, request, response):
+        self.interactions.append({"key": completion_cache_key(request), "request": request, "response": response})
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump({"version": CASSETTE_VERSION, "interactions": self.interactions}, f, indent=1)
+
+
+class ReplayCompletions:
+    """
+    Offline stand-in for client.chat.completions that serves responses from a cassette.
+
+    A request is answered by the first unused interaction recorded with the same
+    request key; if none matches (for example because a tool produced different
+    output this time), the next unused interaction in recorded order is served.
+    Every response is delayed by latency seconds to simulate the network.
+    """
+    def __init__(self, path, latency=0.0):
+        self.interactions = load_cassette(path)
+        self.latency = latency
+        self.used = [False] * len(self.interactions)
+        self.exact_matches = 0
+        self.fallback_matches = 0
+
+    def _next_interaction(self, kwargs):
+        key = completion_cache_key(json.loads(json.dumps(kwargs, default=to_jsonable)))
+        for index, interaction in enumerate(self.interactions):
+            if not self.used[index] and interaction["key"] == key:
+                self.used[index] = True
+                self.exact_matches += 1
+                return interaction
+        for index, interaction in enumerate(self.interactions):
+            if not self.used[index]:
+                self.used[index] = True
+                self.fallback_matches += 1
+                return interaction
+        raise RuntimeError(f"Cassette exhausted after {len(self.interactions)} interactions")
+
+    async def create(self, **kwargs):
+        interaction = self._next_interaction(kwargs)
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        response = interaction["response"]
+        if bool(kwargs.get("stream")) != ("chunks" in response):
+            recorded = "with" if "chunks" in response else "without"
+            raise ValueError(f"Cassette interaction was recorded {recorded} --stream; replay it the same way")
+        if "chunks" in response:
+            return self._replay_stream(response["chunks"])
+        return ChatCompletion.model_validate(response["completion"])
+
+    async def _replay_stream(self, chunks):
+        for chunk in chunks:
+            yield ChatCompletionChunk.model_validate(chunk)
+
+    def stats(self):
+        return {
+            "served": self.exact_matches + self.fallback_matches,
+            "exact": self.exact_matches,
+            "fallback": self.fallback_matches,
+            "remaining": self.used.count(False),
+        }
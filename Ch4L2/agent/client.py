@@ -0,0 +1,51 @@
+"""Thin client for the agent daemon (main.py --daemon).
+
+Only the standard library is imported, so a prompt reaches the warm daemon in milliseconds.
+Run with: python -m agent.client "your prompt" [--verbose] [--stream] [--compact] [--memo]
+"""
+
+import argparse
+import json
+import socket
+import sys
+from .config import DAEMON_SOCKET_PATH
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Send a prompt to a running agent daemon')
+    parser.add_argument('prompt', help='The prompt to send to the AI model')
+    parser.add_argument('--verbose', action='store_true', help='Show detailed output including prompt and token counts')
+    parser.add_argument('--stream', action='store_true', help='Stream responses and start tool calls as soon as their arguments arrive')
+    parser.add_argument('--compact', action='store_true', help='Elide superseded file reads and trim stale tool output before each request')
+    parser.add_argument('--memo', action='store_true', help='Answer repeated reads of unchanged files/directories with a short reply')
+    parser.add_argument('--socket', default=DAEMON_SOCKET_PATH, help='Unix socket the daemon listens on')
+    args = parser.parse_args()
+
+    request = {"prompt": args.prompt, "verbose": args.verbose, "stream": args.stream, "compact": args.compact, "memo": args.memo}
+
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(args.socket)
+    except OSError:
+        print(f'Error: no agent daemon is listening on "{args.socket}" (start one with: uv run python main.py --daemon)')
+        return 1
+
+    with sock, sock.makefile('r', encoding='utf-8') as replies:
+        sock.sendall((json.dumps(request) + "\n").encode('utf-8'))
+        for line in replies:
+            message = json.loads(line)
+            if message["type"] == "output":
+                sys.stdout.write(message["text"])
+                sys.stdout.flush()
+            elif message["type"] == "done":
+                if message["error"]:
+                    print(f"Error during conversation: {message['error']}")
+                    return 1
+                return 0
+
+    print("Error: the agent daemon closed the connection before finishing")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,212 @@
+"""Shrink the conversation sent to the model without touching the full transcript."""
+
+import json
+import os
+import re
+from .cache import to_jsonable
+from .memo import memo_reference, written_paths
+
+# Tools whose results depend on the current contents of files, and the argument naming them
+FILE_READ_FUNCTIONS = {"get_file_content": "file_path", "read_files": "paths"}
+
+# Tools that replace the contents of a file
+FILE_WRITE_FUNCTIONS = {"write_file", "write_files", "edit_file", "undo_change", "restore_file"}
+
+# Characters of a stale tool output kept in front of its stub
+STUB_PREVIEW_CHARACTERS = 200
+
+# Lines that start a section of a read_files result: a file's header (with its path), or a
+# note about a path that wasn't read
+READ_FILES_SECTION = re.compile(r'^\[(?:File "(.+?)": |Error: |No files match |\.\.\.\d+ more files not read)', re.MULTILINE)
+
+
+def estimate_tokens(value):
+    """Rough token count (~4 characters per token) of a message, list of messages or string."""
+    if not isinstance(value, str):
+        value = json.dumps(value, default=to_jsonable)
+    return len(value) // 4
+
+
+def tool_call_fields(tool_call):
+    """Return (id, name, arguments_json) for an SDK tool call object or its dict form."""
+    if isinstance(tool_call, dict):
+        return tool_call["id"], tool_call["function"]["name"], tool_call["function"]["arguments"]
+    return tool_call.id, tool_call.function.name, tool_call.function.arguments
+
+
+def _parse_arguments(arguments):
+    try:
+        parsed = json.loads(arguments)
+    except ValueError:
+        return {}
+    return parsed if isinstance(parsed, dict) else {}
+
+
+def _stub(text):
+    return json.dumps({"result": text})
+
+
+def _elide_changed_files(content, written_later):
+    """
+    A read_files result with the sections of files changed later replaced by a note.
+
+    Returns:
+        str: The new tool message content, or None if no file in it was changed later
+    """
+    try:
+        result = json.loads(content).get("result")
+    except (TypeError, ValueError, AttributeError):
+        return None
+    if not isinstance(result, str):
+        return None
+    headers = list(READ_FILES_SECTION.finditer(result))
+    parts = [result[:headers[0].start()]] if headers else []
+    changed = False
+    for number, header in enumerate(headers):
+        end = headers[number + 1].start() if number + 1 < len(headers) else len(result)
+        path = os.path.normpath(header.group(1)) if header.group(1) else None
+        if path in written_later:
+            separator = "\n" if end < len(result) else ""
+            parts.append(f'[File "{header.group(1)}": earlier content elided; it was changed by {written_later[path]} later in this conversation]{separator}')
+            changed = True
+        else:
+            parts.append(result[header.start():end])
+    return _stub("".join(parts)) if changed else None
+
+
+class CompactionResult:
+    """Compacted messages plus what the compaction did."""
+    def __init__(self, messages, tokens_before, tokens_after, elided, trimmed):
+        self.messages = messages
+        self.tokens_before = tokens_before
+        self.tokens_after = tokens_after
+        self.elided = elided
+        self.trimmed = trimmed
+
+    @property
+    def tokens_saved(self):
+        return self.tokens_before - self.tokens_after
+
+
+def compact_messages(messages, token_budget):
+    """
+    Build a smaller copy of messages to send with the next request.
+
+    Two passes are applied:
+    1. File reads that were superseded later in the conversation (the file was
+       changed by a write tool, or read again with the same arguments) are elided. In a
+       read_files result, only the files changed later are.
+    2. If the estimate is still over token_budget, tool outputs older than the
+       latest assistant turn are shrunk to short stubs, oldest first.
+
+    The latest assistant turn and its tool results are never modified, nor is any
+    output a later "unchanged since tool call N" memo reply points back to. The
+    messages list passed in is left untouched.
+
+    Args:
+        messages (list): The full conversation
+        token_budget (int): Target size in estimated tokens
+
+    Returns:
+        CompactionResult
+    """
+    compacted = list(messages)
+    tokens_before = estimate_tokens(messages)
+
+    # Map tool_call_id -> (name, args) and find where the latest assistant turn starts
+    calls = {}
+    last_assistant = -1
+    for position, message in enumerate(messages):
+        if isinstance(message, dict) and message.get("role") == "assistant":
+            last_assistant = position
+            for tool_call in message.get("tool_calls") or []:
+                call_id, name, arguments = tool_call_fields(tool_call)
+                calls[call_id] = (name, _parse_arguments(arguments))
+
+    tool_positions = [
+        position for position, message in enumerate(messages)
+        if isinstance(message, dict) and message.get("role") == "tool" and position < last_assistant
+    ]
+    referenced = {
+        memo_reference(message.get("content")) for message in messages
+        if isinstance(message, dict) and message.get("role") == "tool"
+    }
+
+    # Pass 1: elide superseded reads, scanning newest to oldest
+    elided_positions = set()
+    partly_elided = 0
+    seen_reads = set()
+    # normalized path -> the tool that next changed it after the position being scanned
+    written_later = {}
+    for position in range(len(messages) - 1, -1, -1):
+        message = messages[position]
+        if not isinstance(message, dict):
+            continue
+        if message.get("role") == "assistant":
+            for tool_call in message.get("tool_calls") or []:
+                call_id, name, arguments = tool_call_fields(tool_call)
+                if name in FILE_WRITE_FUNCTIONS:
+                    for path in written_paths(name, _parse_arguments(arguments)) or []:
+                        if path:
+                            written_later[os.path.normpath(path)] = name
+            continue
+        if message.get("role") != "tool" or message.get("tool_call_id") not in calls:
+            continue
+
+        name, arguments = calls[message["tool_call_id"]]
+        if name not in FILE_READ_FUNCTIONS or FILE_READ_FUNCTIONS[name] not in arguments:
+            continue
+        # A memo reply is not a fresh copy of the file, so it supersedes nothing
+        if memo_reference(message.get("content")) is not None:
+            continue
+        if name == "read_files":
+            read_key = (name, json.dumps(arguments, sort_keys=True))
+            if read_key not in seen_reads:
+                seen_reads.add(read_key)
+                content = _elide_changed_files(message.get("content"), written_later) if position < last_assistant else None
+                if content is not None:
+                    # The files that didn't change stay, and can still be trimmed in pass 2
+                    compacted[position] = dict(message, content=content)
+                    partly_elided += 1
+                continue
+            if position < last_assistant:
+                compacted[position] = dict(message, content=_stub("[Earlier output elided: the same files were read again later in this conversation]"))
+                elided_positions.add(position)
+            continue
+        path = os.path.normpath(arguments["file_path"])
+        read_key = (name, json.dumps(dict(arguments, file_path=path), sort_keys=True))
+        if path in written_later:
+            reason = f'"{arguments["file_path"]}" was changed by {written_later[path]} later in this conversation'
+        elif read_key in seen_reads:
+            reason = f'"{arguments["file_path"]}" was read again later in this conversation'
+        else:
+            seen_reads.add(read_key)
+            continue
+        if position < last_assistant:
+            compacted[position] = dict(message, content=_stub(f"[Earlier output elided: {reason}]"))
+            elided_positions.add(position)
+        seen_reads.add(read_key)
+
+    # Pass 2: trim stale tool outputs until the estimate fits the budget
+    trimmed = 0
+    tokens = estimate_tokens(compacted)
+    for position in tool_positions:
+        if tokens <= token_budget:
+            break
+        message = compacted[position]
+        if position in elided_positions or message.get("tool_call_id") in referenced:
+            continue
+        content = message.get("content") or ""
+        name, arguments = calls.get(message.get("tool_call_id"), (message.get("name"), {}))
+        preview = content[:STUB_PREVIEW_CHARACTERS]
+        stub = _stub(
+            f"[Earlier output of {name}({json.dumps(arguments)}) trimmed from {len(content)} characters; "
+            f"call the function again if it is needed. Preview: {preview}]"
+        )
+        if len(stub) >= len(content):
+            continue
+        compacted[position] = dict(message, content=stub)
+        tokens -= estimate_tokens(content) - estimate_tokens(stub)
+        trimmed += 1
+
+    return CompactionResult(compacted, tokens_before, estimate_tokens(compacted), len(elided_positions) + partly_elided, trimmed)
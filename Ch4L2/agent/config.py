@@ -0,0 +1,25 @@
+"""Configuration constants for the agent loop."""
+
+# Opt-in completion cache (--cache), relative to the directory main.py runs from
+COMPLETION_CACHE_PATH = ".agent_cache/completions.sqlite3"
+
+# Least recently used entries are evicted once the cache grows past this size
+COMPLETION_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+# Cached completions older than this are treated as misses
+COMPLETION_CACHE_TTL_SECONDS = 7 * 24 * 60 * 60
+
+# Estimated-token target for --compact (llama3-70b-8192 has an 8192 token context)
+CONTEXT_TOKEN_BUDGET = 6000
+
+# Client-side rate limits (Groq free tier for llama3-70b-8192); response headers refine them
+RATE_LIMIT_REQUESTS_PER_MINUTE = 30
+RATE_LIMIT_TOKENS_PER_MINUTE = 6000
+
+# Retries for rate-limited or transient API failures, with jittered exponential backoff
+RATE_LIMIT_MAX_RETRIES = 5
+RETRY_BASE_SECONDS = 1.0
+RETRY_MAX_SECONDS = 60.0
+
+# Unix socket the agent daemon (--daemon) listens on and agent.client connects to
+DAEMON_SOCKET_PATH = ".agent_cache/agent.sock"
@@ -0,0 +1,51 @@
+"""Route each concurrent session's console output to its own destination."""
+
+import contextlib
+import contextvars
+import sys
+
+# Where prints from the session running in this context should go (None: the real stdout)
+_task_output = contextvars.ContextVar("task_output", default=None)
+
+
+class TaskStdout:
+    """
+    sys.stdout stand-in that sends each session's prints to that session's own target.
+
+    asyncio tasks and asyncio.to_thread workers inherit the context they were started
+    from, so everything a session prints - including from tool threads - reaches its target.
+    """
+    def __init__(self, stream):
+        self.stream = stream
+
+    def write(self, text):
+        target = _task_output.get()
+        if target is None:
+            return self.stream.write(text)
+        return target.write(text)
+
+    def flush(self):
+        target = _task_output.get()
+        if target is None:
+            self.stream.flush()
+        elif hasattr(target, "flush"):
+            target.flush()
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+
+def set_task_output(target):
+    """Send prints from the current context (task) to target, any object with write(text)."""
+    _task_output.set(target)
+
+
+@contextlib.contextmanager
+def routed_stdout():
+    """Install TaskStdout for the duration of the block; yields the real stdout."""
+    console = sys.stdout
+    sys.stdout = TaskStdout(console)
+    try:
+        yield console
+    finally:
+        sys.stdout = console
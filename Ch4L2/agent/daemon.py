@@ -0,0 +1,99 @@
+"""Long-running agent daemon that serves prompts over a Unix domain socket.
+
+Protocol: the client sends one JSON line, {"prompt": ..., "verbose": ..., "stream": ...,
+"compact": ..., "memo": ...}. The daemon answers with JSON lines: {"type": "output", "text": ...}
+for everything the session prints, as it is printed, then a final
+{"type": "done", "response": ..., "error": ...}.
+"""
+
+import asyncio
+import json
+import os
+import socket
+from .console import routed_stdout, set_task_output
+
+
+class SocketOutput:
+    """Print target that forwards a session's output to its client as it is written."""
+    def __init__(self, writer, loop):
+        self.writer = writer
+        self.loop = loop
+
+    def _send(self, message):
+        if not self.writer.is_closing():
+            self.writer.write((json.dumps(message) + "\n").encode("utf-8"))
+
+    def write(self, text):
+        if not text:
+            return 0
+        message = {"type": "output", "text": text}
+        try:
+            on_loop = asyncio.get_running_loop() is self.loop
+        except RuntimeError:
+            on_loop = False
+        if on_loop:
+            self._send(message)
+        else:
+            # Tools may print from worker threads; the stream belongs to the event loop
+            self.loop.call_soon_threadsafe(self._send, message)
+        return len(text)
+
+    def flush(self):
+        pass
+
+
+def remove_stale_socket(socket_path):
+    """Delete a socket file left behind by a daemon that is no longer running."""
+    if not os.path.exists(socket_path):
+        return
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(socket_path)
+    except OSError:
+        os.unlink(socket_path)
+        return
+    finally:
+        probe.close()
+    raise RuntimeError(f'An agent daemon is already listening on "{socket_path}"')
+
+
+async def serve(socket_path, handle_request):
+    """
+    Accept prompts on socket_path until cancelled, running each as its own session.
+
+    Args:
+        socket_path (str): Unix domain socket to listen on
+        handle_request: Coroutine function (request dict) -> final response text
+    """
+    loop = asyncio.get_running_loop()
+
+    async def handle_client(reader, writer):
+        done = {"type": "done", "response": None, "error": None}
+        try:
+            request = json.loads(await reader.readline())
+            set_task_output(SocketOutput(writer, loop))
+            done["response"] = await handle_request(request)
+        except Exception as e:
+            done["error"] = str(e)
+        writer.write((json.dumps(done) + "\n").encode("utf-8"))
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+        writer.close()
+
+    remove_stale_socket(socket_path)
+    directory = os.path.dirname(socket_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    server = await asyncio.start_unix_server(handle_client, path=socket_path)
+    os.chmod(socket_path, 0o600)
+    try:
+        with routed_stdout() as console:
+            console.write(f"Agent daemon listening on {socket_path}\n")
+            console.flush()
+            async with server:
+                await server.serve_forever()
+    finally:
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
@@ -0,0 +1,162 @@
+"""Session-scoped memoization of read-only tool calls, invalidated by writes."""
+
+import json
+import os
+import re
+import threading
+
+# The agent's own state directory in a working directory (functions/file_history.py)
+AGENT_CACHE_DIRECTORY = ".agent_cache"
+
+# Read-only tools the memo answers for, and the argument naming the path each one reads
+MEMOIZED_FUNCTIONS = {"get_file_content": "file_path", "get_files_info": "directory"}
+
+# Tools that change files, and the argument naming the file (or, for write_files, the list of
+# {"path": ...} entries) each one writes; a write invalidates memo entries for the same or a parent path
+INVALIDATING_FUNCTIONS = {
+    "write_file": "file_path",
+    "write_files": "files",
+    "edit_file": "file_path",
+    "undo_change": "file_path",
+    "restore_file": "file_path",
+}
+
+MEMO_REPLY_PATTERN = re.compile(r"^\[Unchanged since tool call \d+ \(([^)]*)\)")
+
+
+def memo_reference(content):
+    """Return the tool_call_id a memo reply points back to, or None for any other content."""
+    if not isinstance(content, str):
+        return None
+    if content.startswith("{"):
+        try:
+            content = json.loads(content).get("result")
+        except (ValueError, AttributeError):
+            return None
+        if not isinstance(content, str):
+            return None
+    match = MEMO_REPLY_PATTERN.match(content)
+    return match.group(1) if match else None
+
+
+def written_paths(name, args):
+    """
+    The paths, as given, that a call to a write tool changes.
+
+    Returns:
+        list: Paths, or None if the arguments don't say (undo_change without a file_path)
+    """
+    value = args.get(INVALIDATING_FUNCTIONS.get(name))
+    if value is None:
+        return None
+    if isinstance(value, list):
+        return [entry["path"] for entry in value if isinstance(entry, dict) and isinstance(entry.get("path"), str)]
+    return [value]
+
+
+def _resolve(working_directory, path):
+    if os.path.isabs(path):
+        return os.path.realpath(path)
+    return os.path.realpath(os.path.join(working_directory, path))
+
+
+def _fingerprint(path):
+    """Stat data that changes whenever the file (or the listing of a directory) changes."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    if not os.path.isdir(path):
+        return (stat.st_mtime_ns, stat.st_size)
+    entries = []
+    with os.scandir(path) as it:
+        for entry in it:
+            if entry.name == AGENT_CACHE_DIRECTORY:
+                continue  # Not listed by get_files_info, and written to by every write tool
+            try:
+                entry_stat = entry.stat()
+            except OSError:
+                continue
+            entries.append((entry.name, entry_stat.st_mtime_ns, entry_stat.st_size))
+    return (stat.st_mtime_ns, tuple(sorted(entries)))
+
+
+class ToolCallMemo:
+    """
+    Remembers which read-only tool calls a session already made and what they saw.
+
+    An identical call (same function, resolved path and other arguments) whose target
+    still has the same stat fingerprint gets a short "unchanged since tool call N" reply
+    instead of the full output again.
+    """
+    def __init__(self):
+        self.entries = {}
+        self.call_count = 0
+        self.hits = 0
+        self.lock = threading.Lock()
+
+    def next_call_number(self):
+        """Number tool calls in the order they were requested (1-based, per session)."""
+        self.call_count += 1
+        return self.call_count
+
+    def _key(self, name, args):
+        path_arg = MEMOIZED_FUNCTIONS.get(name)
+        if path_arg is None:
+            return None, None
+        # The fingerprint only covers a directory's own entries, not its subdirectories
+        if args.get("recursive") or (args.get("max_depth") or 1) > 1:
+            return None, None
+        working_directory = args.get("working_directory", ".")
+        path = _resolve(working_directory, args.get(path_arg) or ".")
+        others = {k: v for k, v in args.items() if k not in (path_arg, "working_directory")}
+        return (name, path, json.dumps(others, sort_keys=True)), path
+
+    def lookup(self, name, args):
+        """Return a compact reply if this exact read already happened and nothing changed since."""
+        key, path = self._key(name, args)
+        if key is None:
+            return None
+        with self.lock:
+            entry = self.entries.get(key)
+        if entry is None or _fingerprint(path) != entry["fingerprint"]:
+            return None
+        with self.lock:
+            self.hits += 1
+        return (
+            f"[Unchanged since tool call {entry['number']} ({entry['tool_call_id']}); "
+            f"that result is still current]"
+        )
+
+    def record(self, name, args, result, number, tool_call_id):
+        """Remember a successful read-only call, or apply a write's invalidation."""
+        if name in INVALIDATING_FUNCTIONS:
+            working_directory = args.get("working_directory", ".")
+            paths = written_paths(name, args)
+            if paths is None:
+                # Any file in the working directory may have changed
+                self.invalidate(_resolve(working_directory, "."), subtree=True)
+            for path in paths or []:
+                self.invalidate(_resolve(working_directory, path))
+            return
+        key, path = self._key(name, args)
+        if key is None or not isinstance(result, str) or result.startswith("Error"):
+            return
+        with self.lock:
+            self.entries[key] = {
+                "fingerprint": _fingerprint(path),
+                "number": number,
+                "tool_call_id": tool_call_id,
+            }
+
+    def invalidate(self, path, subtree=False):
+        """Forget reads of path itself and listings of any directory containing it (with subtree, of anything under it too)."""
+        with self.lock:
+            for key in list(self.entries):
+                entry_path = key[1]
+                if (
+                    entry_path == path
+                    or path.startswith(entry_path.rstrip(os.sep) + os.sep)
+                    or subtree and entry_path.startswith(path.rstrip(os.sep) + os.sep)
+                ):
+                    del self.entries[key]
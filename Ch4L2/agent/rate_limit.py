@@ -0,0 +1,203 @@
+"""Client-side request/token rate limiting with retries, driven by Groq's rate-limit headers."""
+
+import asyncio
+import random
+import re
+import time
+import groq
+from .compaction import estimate_tokens
+from .config import RETRY_BASE_SECONDS, RETRY_MAX_SECONDS
+
+# Errors worth retrying: rate limits, dropped connections and server-side failures
+RETRYABLE_ERRORS = (groq.RateLimitError, groq.APIConnectionError, groq.InternalServerError)
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+
+def parse_duration(value):
+    """Parse a header duration such as "7.66s", "2m59.56s" or "250ms" into seconds (None if unparseable)."""
+    if value is None:
+        return None
+    value = value.strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        return None
+    return sum(float(amount) * _DURATION_UNITS[unit] for amount, unit in parts)
+
+
+def _header_number(headers, name):
+    try:
+        return float(headers.get(name))
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """Continuously refilling bucket: holds up to capacity units, refilled at capacity per minute."""
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.available = float(per_minute)
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.available = min(self.capacity, self.available + (now - self.updated) * self.capacity / 60)
+        self.updated = now
+
+    def wait_time(self, amount, now):
+        """Seconds until amount units are available (amount is capped at capacity)."""
+        self._refill(now)
+        missing = min(amount, self.capacity) - self.available
+        return max(0.0, missing * 60 / self.capacity)
+
+    def consume(self, amount, now):
+        self._refill(now)
+        self.available -= min(amount, self.capacity)
+
+    def adjust(self, amount, now):
+        """Give back (negative amount) or take extra units once the real cost is known."""
+        self._refill(now)
+        self.available = min(self.capacity, self.available - amount)
+
+    def clamp(self, remaining, now):
+        """Never believe we have more than the server says is left."""
+        self._refill(now)
+        self.available = min(self.available, remaining)
+
+
+class RateLimiter:
+    """
+    Requests-per-minute and tokens-per-minute limiter shared by every session in the process.
+
+    Requests wait in arrival order until both buckets can cover them. The buckets start
+    from the configured limits and are corrected from the x-ratelimit-* response headers:
+    the tokens bucket adopts Groq's per-minute token limit and remaining count, while
+    Groq's request headers count requests per day, so they only pause requests once
+    the daily allowance is used up.
+    """
+    def __init__(self, requests_per_minute, tokens_per_minute):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.blocked_until = 0.0
+        self.lock = asyncio.Lock()
+        self.waited_seconds = 0.0
+        self.retries = 0
+
+    async def acquire(self, estimated_tokens):
+        """Wait until a request costing estimated_tokens fits; return the seconds waited."""
+        waited = 0.0
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                delay = max(
+                    self.requests.wait_time(1, now),
+                    self.tokens.wait_time(estimated_tokens, now),
+                    self.blocked_until - now,
+                )
+                if delay <= 0:
+                    self.requests.consume(1, now)
+                    self.tokens.consume(estimated_tokens, now)
+                    break
+                await asyncio.sleep(delay)
+                waited += delay
+        self.waited_seconds += waited
+        return waited
+
+    def record_usage(self, estimated_tokens, actual_tokens):
+        """Correct the tokens bucket once the response reports what the request really cost."""
+        if actual_tokens is not None:
+            self.tokens.adjust(actual_tokens - estimated_tokens, time.monotonic())
+
+    def update_from_headers(self, headers):
+        """Sync both buckets with the x-ratelimit-* and retry-after headers of a response."""
+        if headers is None:
+            return
+        now = time.monotonic()
+
+        token_limit = _header_number(headers, "x-ratelimit-limit-tokens")
+        if token_limit:
+            self.tokens.capacity = token_limit
+        remaining_tokens = _header_number(headers, "x-ratelimit-remaining-tokens")
+        if remaining_tokens is not None:
+            self.tokens.clamp(remaining_tokens, now)
+
+        remaining_requests = _header_number(headers, "x-ratelimit-remaining-requests")
+        if remaining_requests is not None and remaining_requests <= 0:
+            reset = parse_duration(headers.get("x-ratelimit-reset-requests"))
+            if reset:
+                self.blocked_until = max(self.blocked_until, now + reset)
+
+        retry_after = parse_duration(headers.get("retry-after"))
+        if retry_after:
+            self.blocked_until = max(self.blocked_until, now + retry_after)
+
+
+def backoff_delay(attempt, retry_after=None):
+    """Full-jitter exponential backoff, never shorter than the server's retry-after."""
+    delay = random.uniform(0, min(RETRY_MAX_SECONDS, RETRY_BASE_SECONDS * 2 ** attempt))
+    if retry_after:
+        delay = max(delay, retry_after)
+    return delay
+
+
+class RateLimitedCompletions:
+    """
+    Wrapper for client.chat.completions that waits for the shared RateLimiter and retries
+    rate-limited or transient failures with jittered exponential backoff.
+    """
+    def __init__(self, completions, limiter, max_retries=5, verbose=False):
+        self.completions = completions
+        self.limiter = limiter
+        self.max_retries = max_retries
+        self.verbose = verbose
+
+    async def create(self, **kwargs):
+        estimated = estimate_tokens(kwargs.get("messages", [])) + estimate_tokens(kwargs.get("tools", []))
+        attempt = 0
+        while True:
+            waited = await self.limiter.acquire(estimated)
+            if waited and self.verbose:
+                print(f"Rate limiter: waited {waited:.2f}s before sending the request")
+            try:
+                raw_response = await self.completions.with_raw_response.create(**kwargs)
+            except RETRYABLE_ERRORS as e:
+                response = getattr(e, "response", None)
+                headers = response.headers if response is not None else None
+                # Nothing was generated, so hand back the estimate before syncing with the headers
+                self.limiter.record_usage(estimated, 0)
+                self.limiter.update_from_headers(headers)
+                if attempt >= self.max_retries:
+                    raise
+                retry_after = parse_duration(headers.get("retry-after")) if headers is not None else None
+                delay = backoff_delay(attempt, retry_after)
+                attempt += 1
+                self.limiter.retries += 1
+                if self.verbose:
+                    print(f"{type(e).__name__}; retrying in {delay:.2f}s (attempt {attempt}/{self.max_retries})")
+                await asyncio.sleep(delay)
+                continue
+
+            response = await raw_response.parse()
+            if kwargs.get("stream"):
+                self.limiter.update_from_headers(raw_response.headers)
+                return self._track_stream_usage(response, estimated)
+            # Settle the real cost first; the headers already account for it
+            usage = getattr(response, "usage", None)
+            self.limiter.record_usage(estimated, usage.total_tokens if usage is not None else None)
+            self.limiter.update_from_headers(raw_response.headers)
+            return response
+
+    async def _track_stream_usage(self, stream, estimated):
+        usage = None
+        async for chunk in stream:
+            chunk_usage = getattr(chunk, "usage", None)
+            if chunk_usage is None and getattr(chunk, "x_groq", None) is not None:
+                chunk_usage = getattr(chunk.x_groq, "usage", None)
+            if chunk_usage is not None:
+                usage = chunk_usage
+            yield chunk
+        self.limiter.record_usage(estimated, usage.total_tokens if usage is not None else None)
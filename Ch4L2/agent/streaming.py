@@ -0,0 +1,125 @@
+"""Assemble streamed Groq chat completions while forwarding text and tool calls early."""
+
+import json
+import time
+from groq.types.chat import ChatCompletionMessage, ChatCompletionMessageToolCall
+from groq.types.chat.chat_completion_message_tool_call import Function
+
+
+class ToolCallBuffer:
+    """Accumulates the deltas of one streamed tool call."""
+    def __init__(self, index):
+        self.index = index
+        self.id = None
+        self.name = ""
+        self.arguments = ""
+        self.dispatched = False
+
+    def add_delta(self, delta):
+        if delta.id:
+            self.id = delta.id
+        if delta.function:
+            if delta.function.name:
+                self.name += delta.function.name
+            if delta.function.arguments:
+                self.arguments += delta.function.arguments
+
+    def has_complete_arguments(self):
+        """Return True once the buffered arguments parse as a JSON object."""
+        if not self.name or not self.arguments.rstrip().endswith("}"):
+            return False
+        try:
+            json.loads(self.arguments)
+        except ValueError:
+            return False
+        return True
+
+    def to_tool_call(self):
+        return ChatCompletionMessageToolCall(
+            id=self.id or f"call_{self.index}",
+            type="function",
+            function=Function(name=self.name, arguments=self.arguments),
+        )
+
+
+class StreamResult:
+    """The assembled assistant message plus the latencies measured while streaming."""
+    def __init__(self, message, usage, first_byte_seconds, first_action_seconds):
+        self.message = message
+        self.usage = usage
+        self.first_byte_seconds = first_byte_seconds
+        self.first_action_seconds = first_action_seconds
+
+
+async def consume_stream(stream, started, on_text=None, on_tool_call=None):
+    """
+    Read a streamed completion, handing out text and finished tool calls as they arrive.
+
+    A tool call is passed to on_tool_call as soon as its arguments form valid JSON,
+    so the caller can start running it while the rest of the response streams in.
+    Any tool call still pending when the stream ends is handed out at that point.
+
+    Args:
+        stream: Async iterator of ChatCompletionChunk objects
+        started: time.perf_counter() value taken just before the request was sent
+        on_text: Optional callable receiving each content delta (str)
+        on_tool_call: Optional callable receiving each ChatCompletionMessageToolCall
+
+    Returns:
+        StreamResult with the assembled ChatCompletionMessage and usage
+    """
+    content_parts = []
+    buffers = {}
+    usage = None
+    first_byte_seconds = None
+    first_action_seconds = None
+
+    def dispatch(buffer):
+        nonlocal first_action_seconds
+        buffer.dispatched = True
+        if first_action_seconds is None:
+            first_action_seconds = time.perf_counter() - started
+        if on_tool_call:
+            on_tool_call(buffer.to_tool_call())
+
+    async for chunk in stream:
+        if first_byte_seconds is None:
+            first_byte_seconds = time.perf_counter() - started
+
+        # Groq reports usage on the last chunk, either top level or under x_groq
+        chunk_usage = getattr(chunk, "usage", None)
+        if chunk_usage is None and getattr(chunk, "x_groq", None) is not None:
+            chunk_usage = getattr(chunk.x_groq, "usage", None)
+        if chunk_usage is not None:
+            usage = chunk_usage
+
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta
+
+        if delta.content:
+            content_parts.append(delta.content)
+            if on_text:
+                on_text(delta.content)
+
+        for tool_call_delta in delta.tool_calls or []:
+            # A new index means every earlier tool call has finished streaming
+            for buffer in buffers.values():
+                if buffer.index < tool_call_delta.index and not buffer.dispatched:
+                    dispatch(buffer)
+            buffer = buffers.setdefault(tool_call_delta.index, ToolCallBuffer(tool_call_delta.index))
+            buffer.add_delta(tool_call_delta)
+            if not buffer.dispatched and buffer.has_complete_arguments():
+                dispatch(buffer)
+
+    ordered = [buffers[index] for index in sorted(buffers)]
+    for buffer in ordered:
+        if not buffer.dispatched:
+            dispatch(buffer)
+
+    message = ChatCompletionMessage(
+        role="assistant",
+        content="".join(content_parts) or None,
+        tool_calls=[buffer.to_tool_call() for buffer in ordered] or None,
+    )
+    return StreamResult(message, usage, first_byte_seconds, first_action_seconds)
@@ -0,0 +1,74 @@
+"""Atomic file replacement for the tools that change files in the working directory."""
+
+import os
+import secrets
+from .file_index import FILE_INDEX
+from .run_cache import RUN_CACHE
+
+
+def stage_file(path, content):
+    """
+    Write content (bytes) to a temporary file next to path and sync it to disk.
+
+    The temporary file gets the permissions of the file at path, if there is one.
+
+    Returns:
+        str: Path of the temporary file, to pass to commit_staged or discard_staged
+    """
+    temp_path = os.path.join(os.path.dirname(path), f".{os.path.basename(path)}.{secrets.token_hex(4)}.tmp")
+    try:
+        mode = os.stat(path).st_mode & 0o7777
+    except FileNotFoundError:
+        mode = 0o666  # Narrowed by the umask, as for any new file
+    handle = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, mode)
+    try:
+        with os.fdopen(handle, 'wb') as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        if mode != 0o666:
+            os.chmod(temp_path, mode)  # os.open applied the umask
+    except BaseException:
+        discard_staged(temp_path)
+        raise
+    return temp_path
+
+
+def commit_staged(temp_path, path):
+    """Rename a staged file over path and sync the rename to disk."""
+    os.replace(temp_path, path)
+    directory = os.open(os.path.dirname(path) or ".", os.O_RDONLY)
+    try:
+        os.fsync(directory)
+    finally:
+        os.close(directory)
+
+
+def discard_staged(temp_path):
+    try:
+        os.remove(temp_path)
+    except FileNotFoundError:
+        pass
+
+
+def write_atomically(path, content):
+    """
+    Replace the file at path with content (bytes), so readers see either the old or the new file, never part of one.
+
+    The content is written to a temporary file next to path and synced to disk, then renamed
+    over it, and the rename is synced too; a crash leaves either version, never a truncated file.
+    An existing file's permissions are kept.
+    """
+    temp_path = stage_file(path, content)
+    try:
+        commit_staged(temp_path, path)
+    except BaseException:
+        discard_staged(temp_path)
+        raise
+
+
+def record_change(working_directory, path):
+    """Tell the caches built from the working directory's files that a tool changed path."""
+    # Earlier script results may depend on what was just overwritten
+    RUN_CACHE.invalidate(working_directory)
+    FILE_INDEX.changed(working_directory, os.path.relpath(path, working_directory))
@@ -0,0 +1,87 @@
+"""Outlines of Python source files: classes and functions with signatures, line ranges and docstrings.
+
+Imported by get_code_outline, and also run by it (in the working directory's interpreter, so
+only the standard library is imported) to parse many files in parallel processes.
+Run as: python code_outline.py <results path> <file> ...
+"""
+
+import ast
+import json
+import sys
+
+# Statements whose bodies may define module-level or class-level names
+COMPOUND_STATEMENTS = (ast.If, ast.Try, ast.With)
+
+
+def _first_line(docstring):
+    for line in (docstring or "").splitlines():
+        if line.strip():
+            return line.strip()
+    return ""
+
+
+def signature(node, decorators=True):
+    """One-line signature of a function or class definition, decorators included unless decorators is False."""
+    decorators = "".join(f"@{ast.unparse(decorator)} " for decorator in node.decorator_list) if decorators else ""
+    if isinstance(node, ast.ClassDef):
+        bases = [ast.unparse(base) for base in node.bases] + [ast.unparse(keyword) for keyword in node.keywords]
+        return f"{decorators}class {node.name}" + (f"({', '.join(bases)})" if bases else "")
+    prefix = "async def" if isinstance(node, ast.AsyncFunctionDef) else "def"
+    returns = f" -> {ast.unparse(node.returns)}" if node.returns else ""
+    return f"{decorators}{prefix} {node.name}({ast.unparse(node.args)}){returns}"
+
+
+def outline(source):
+    """
+    Outline of Python source (bytes).
+
+    Functions nested in functions are left out; classes list their methods and nested classes.
+
+    Returns:
+        dict: "lines" (line count), "docstring" (first line of the module docstring) and
+            "entries": [depth, signature, first line, last line, docstring first line, signature
+            without decorators, name] in source order
+    """
+    tree = ast.parse(source)
+    entries = []
+
+    def visit(body, depth):
+        for node in body:
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                first = min([node.lineno] + [decorator.lineno for decorator in node.decorator_list])
+                entries.append([
+                    depth, signature(node), first, node.end_lineno, _first_line(ast.get_docstring(node)),
+                    signature(node, decorators=False), node.name,
+                ])
+                if isinstance(node, ast.ClassDef):
+                    visit(node.body, depth + 1)
+            elif isinstance(node, COMPOUND_STATEMENTS):
+                for block in (node.body, getattr(node, "orelse", []), getattr(node, "finalbody", [])):
+                    visit(block, depth)
+                for handler in getattr(node, "handlers", []):
+                    visit(handler.body, depth)
+
+    visit(tree.body, 0)
+    lines = source.count(b"\n") + (1 if source and not source.endswith(b"\n") else 0)
+    return {"lines": lines, "docstring": _first_line(ast.get_docstring(tree)), "entries": entries}
+
+
+def outline_file(path):
+    """Outline of the file at path, or {"error": ...} if it can't be parsed."""
+    try:
+        with open(path, 'rb') as f:
+            return outline(f.read())
+    except SyntaxError as e:
+        return {"error": f"SyntaxError: {e.msg} (line {e.lineno})"}
+    except (OSError, ValueError) as e:
+        return {"error": str(e)}
+
+
+def main():
+    results_path, paths = sys.argv[1], sys.argv[2:]
+    with open(results_path, 'w', encoding='utf-8') as f:
+        json.dump({path: outline_file(path) for path in paths}, f)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,3 +2,126 @@
 
 # Maximum number of characters to read from a file before truncating
 MAX_FILE_CHARACTERS = 10000
+
+# Entries per page of a get_files_info listing
+FILES_INFO_PAGE_SIZE = 200
+
+# Default (and largest) total characters of file content a read_files call returns, shared by its files
+READ_FILES_MAX_CHARACTERS = 40000
+
+# Most files one read_files call reads
+READ_FILES_MAX_FILES = 50
+
+# Threads read_files reads files with
+READ_FILES_MAX_WORKERS = 8
+
+# Most matches a search_files call returns
+SEARCH_MAX_RESULTS = 50
+
+# Characters of the matching line shown with each search_files match
+SEARCH_SNIPPET_CHARACTERS = 200
+
+# Threads search_files reads and searches files with
+SEARCH_MAX_WORKERS = 8
+
+# Working directories with at least this many searchable files get a persistent trigram index,
+# so that searches only open the files that can contain a match
+SEARCH_INDEX_MIN_FILES = 500
+
+# Where the trigram index is stored, relative to the agent's directory
+SEARCH_INDEX_PATH = ".agent_cache/search_index.sqlite3"
+
+# Files larger than this are not indexed (they are always searched)
+SEARCH_INDEX_MAX_FILE_BYTES = 1024 * 1024
+
+# Files get_code_outline must parse (not cached) per extra worker process it starts
+OUTLINE_PARALLEL_MIN_FILES = 64
+
+# Most worker processes get_code_outline parses files in at once
+OUTLINE_MAX_WORKERS = 8
+
+# Most diff lines an edit_file result shows of the change it made
+EDIT_SUMMARY_MAX_LINES = 20
+
+# Default estimated-token budget (about 4 characters per token) of the repository map main.py --repo-map
+# adds to the system prompt
+REPO_MAP_MAX_TOKENS = 1500
+
+# Where the latest repository map of each working directory is kept, with the tree hash it was built for
+REPO_MAP_CACHE_PATH = ".agent_cache/repo_maps.json"
+
+# Most working directories whose map is kept in the cache; the least recently used are dropped
+REPO_MAP_CACHE_MAX_ENTRIES = 32
+
+# Where the BM25 index of code chunks (main.py --relevant-snippets) is stored, relative to the agent's directory
+RELEVANCE_INDEX_PATH = ".agent_cache/relevance_index.sqlite3"
+
+# Files larger than this are left out of the BM25 index
+RELEVANCE_INDEX_MAX_FILE_BYTES = 256 * 1024
+
+# Lines per chunk of files (or parts of Python files outside definitions) that are indexed by window
+RELEVANCE_CHUNK_LINES = 40
+
+# Snippets added to the system prompt by --relevant-snippets when no count is given
+RELEVANCE_TOP_K = 5
+
+# Most snippets taken from one file, so a single large file can't fill every slot
+RELEVANCE_MAX_SNIPPETS_PER_FILE = 2
+
+# Most lines shown of each snippet, and most characters of all snippets together
+RELEVANCE_SNIPPET_LINES = 40
+RELEVANCE_MAX_CHARACTERS = 6000
+
+# Seconds a working directory index without inotify (not Linux, or out of watches) trusts its
+# last scan; it is rescanned when used after that
+FILE_INDEX_RESCAN_SECONDS = 2.0
+
+# Most working directories indexed at once (least recently used ones are dropped)
+FILE_INDEX_MAX_TREES = 8
+
+# Command that starts the project's Python interpreter inside the working directory
+PYTHON_LAUNCHER = ("uv", "run", "python")
+
+# Seconds a Python script may run before it is killed
+PYTHON_TIMEOUT_SECONDS = 30
+
+# Bytes of a script's stdout (and of its stderr) kept for the model: the first and last half
+PYTHON_OUTPUT_MAX_BYTES = 10000
+
+# Total bytes of output after which a runaway script is killed early
+PYTHON_OUTPUT_KILL_BYTES = 1024 * 1024
+
+# Most run_python_file results kept by the opt-in result cache (main.py --cache-runs)
+PYTHON_RESULT_CACHE_MAX_ENTRIES = 128
+
+# Run scripts in forked children of a warm interpreter instead of a new `uv run` each time
+PYTHON_POOL_ENABLED = True
+
+# Modules the warm interpreter imports once so that scripts don't pay for them on every run
+PYTHON_POOL_PRELOAD = ("unittest", "json", "re", "collections", "functools", "itertools", "traceback")
+
+# Most warm interpreters kept at once (one per working directory; least recently used go first)
+PYTHON_POOL_MAX_INTERPRETERS = 8
+
+# Seconds to wait for a warm interpreter to start (the first start may sync the environment)
+PYTHON_POOL_START_TIMEOUT_SECONDS = 120
+
+# File names run_tests treats as unittest test modules
+TEST_FILE_PATTERNS = ("test*.py", "*_test.py")
+
+# Most processes run_tests splits the selected tests across
+TEST_MAX_SHARDS = 8
+
+# Seconds each test shard may run before it is killed
+TEST_TIMEOUT_SECONDS = 120
+
+# Most failures listed individually in a run_tests summary
+TEST_MAX_REPORTED_FAILURES = 20
+
+# Most changes the file history of a working directory keeps, and most bytes of stored versions;
+# past either, the oldest changes and the versions only they refer to are dropped
+HISTORY_MAX_CHANGES = 1000
+HISTORY_MAX_BYTES = 100 * 1024 * 1024
+
+# Seconds an unreferenced stored version is kept, in case another agent process is about to journal it
+HISTORY_BLOB_GRACE_SECONDS = 60
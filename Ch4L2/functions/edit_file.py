@@ -0,0 +1,59 @@
+"""Function to change part of a file with search/replace blocks or a unified diff."""
+
+import os
+from .config import EDIT_SUMMARY_MAX_LINES
+from .file_history import replace_file
+from .patching import EditError, SearchReplace, apply_search_replace, apply_unified_diff, diff_summary
+from .registry import tool
+
+
+@tool(
+    description="Change part of an existing file without resending all of it: either search/replace blocks, or a unified diff. Each search text (or each hunk's context and removed lines) must match exactly one place in the current file. All of the changes are applied, or none. Returns a short diff of what changed.",
+    parameters={
+        "file_path": "The path to the file to edit, relative to the working directory.",
+        "edits": "Search/replace blocks, applied in order. Each search text is copied exactly from the file, with enough lines to be unique.",
+        "diff": "A unified diff of this one file (@@ hunks with context lines), as an alternative to edits.",
+    },
+)
+def edit_file(working_directory, file_path: str, edits: list[SearchReplace] | None = None, diff: str | None = None):
+    """
+    Apply search/replace blocks or a unified diff to a file within the working directory.
+
+    Args:
+        working_directory (str): The permitted working directory
+        file_path (str): The path to the file to edit
+        edits (list): {"search": ..., "replace": ...} blocks
+        diff (str): Unified diff of the file
+
+    Returns:
+        str: Summary of the change, or an error message
+    """
+    try:
+        working_dir_abs = os.path.abspath(working_directory)
+        file_path_abs = os.path.abspath(os.path.join(working_directory, file_path))
+        if not file_path_abs.startswith(working_dir_abs + os.sep):
+            return f'Error: Cannot edit "{file_path}" as it is outside the permitted working directory'
+        if not os.path.isfile(file_path_abs):
+            return f'Error: File not found or is not a regular file: "{file_path}". Use write_file to create it'
+        if (edits is None) == (diff is None):
+            return 'Error: Pass either edits or diff'
+
+        # newline='' keeps the file's line endings as they are
+        with open(file_path_abs, 'r', encoding='utf-8', newline='') as f:
+            old_content = f.read()
+        try:
+            if edits is not None:
+                new_content = apply_search_replace(old_content, edits)
+            else:
+                new_content = apply_unified_diff(old_content, diff)
+        except EditError as e:
+            return f'Error: Nothing was changed in "{file_path}": {e}'
+        if new_content == old_content:
+            return f'Error: The edits leave "{file_path}" unchanged'
+
+        change = replace_file(working_dir_abs, file_path_abs, new_content, "edit_file")
+
+        return f"Edited (change {change.id}) " + diff_summary(file_path, old_content, new_content, EDIT_SUMMARY_MAX_LINES)
+
+    except Exception as e:
+        return f'Error: {str(e)}'
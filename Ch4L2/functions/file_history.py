@@ -0,0 +1,415 @@
+"""Journal of the changes the agent's tools make to files, with every version kept for undo and restore.
+
+Each working directory gets .agent_cache/history/ (skipped by listings, searches and hashes):
+- blobs/<sha256[:2]>/<sha256[2:]>: file contents, content-addressed, so a version that recurs
+  is stored once
+- journal.jsonl: one line per change, naming the tool, the file and the blobs of its content
+  before and after (null when the file didn't exist)
+
+Several files can be changed as one batch: every new version is staged next to its file
+first, and pending.json lists the batch while the staged files are renamed into place. If the
+agent dies before the batch is journaled, the files it had already replaced are put back the
+next time the journal is opened.
+
+Rolling a change back restores a whole stored version, so it costs one file write however
+long the history is, and the model never has to send the old content again.
+
+The history is bounded: past HISTORY_MAX_CHANGES changes or HISTORY_MAX_BYTES of stored
+versions, the oldest changes are dropped from the journal (whole batches at a time) along with
+the blobs no remaining change refers to.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from .atomic_write import stage_file, commit_staged, discard_staged, write_atomically, record_change
+from .config import HISTORY_MAX_CHANGES, HISTORY_MAX_BYTES, HISTORY_BLOB_GRACE_SECONDS
+
+# Where the agent keeps its own state in a working directory; listings never show it
+AGENT_CACHE_DIRECTORY = ".agent_cache"
+
+HISTORY_DIRECTORY = os.path.join(AGENT_CACHE_DIRECTORY, "history")
+
+
+def journal_lines(changes):
+    """changes serialized as journal.jsonl lines."""
+    return "".join(json.dumps({name: getattr(change, name) for name in Change.__slots__}) + "\n" for change in changes).encode("utf-8")
+
+
+def digest(content):
+    """Name of content in the blob store; None for the content of a file that doesn't exist."""
+    return None if content is None else hashlib.sha256(content).hexdigest()
+
+
+class Change:
+    """
+    One journaled change to a file.
+
+    undoes is the id of the change it reverted, if any; batch is the id of the first change of
+    the batch it was made in, for changes made together with others.
+    """
+    __slots__ = ("id", "time", "tool", "path", "before", "after", "undoes", "batch")
+
+    def __init__(self, id, time, tool, path, before, after, undoes=None, batch=None):
+        self.id = id
+        self.time = time
+        self.tool = tool
+        self.path = path
+        self.before = before
+        self.after = after
+        self.undoes = undoes
+        self.batch = batch
+
+    def describe(self):
+        return f'change {self.id} ({self.tool} of "{self.path}" at {time.strftime("%H:%M:%S", time.localtime(self.time))})'
+
+
+class Journal:
+    """The change journal and blob store of one working directory."""
+    def __init__(self, root):
+        self.root = root
+        self.directory = os.path.join(root, HISTORY_DIRECTORY)
+        self.journal_path = os.path.join(self.directory, "journal.jsonl")
+        self.pending_path = os.path.join(self.directory, "pending.json")
+        self.changes = []
+        self.undone = set()
+        self.offset = 0  # Bytes of the journal file read so far
+        self.inode = None  # Of the journal file read so far; another one means it was pruned since
+        self.blob_bytes = None  # Size of the blob store, once measured
+        self.lock = threading.Lock()
+
+    def _refresh(self):
+        """Read the journal lines appended since the last call (by this or another agent process)."""
+        try:
+            with open(self.journal_path, 'rb') as f:
+                inode = os.fstat(f.fileno()).st_ino
+                if inode != self.inode:
+                    # Rewritten by a pruning (in this or another process): read it from the start
+                    self.changes, self.undone, self.offset, self.inode = [], set(), 0, inode
+                f.seek(self.offset)
+                data = f.read()
+        except FileNotFoundError:
+            return
+        # A crash can leave a partial last line; it is read again once it's complete
+        end = data.rfind(b"\n") + 1
+        for line in data[:end].splitlines():
+            try:
+                change = Change(**json.loads(line))
+            except (ValueError, TypeError):
+                continue
+            self.changes.append(change)
+            if change.undoes is not None:
+                self.undone.add(change.undoes)
+        self.offset += end
+
+    def _blob_path(self, blob):
+        return os.path.join(self.directory, "blobs", blob[:2], blob[2:])
+
+    def _store(self, content):
+        """Digest of content, adding it to the blob store unless it's there already."""
+        blob = digest(content)
+        if blob is None:
+            return None
+        path = self._blob_path(blob)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            write_atomically(path, content)
+            if self.blob_bytes is not None:
+                self.blob_bytes += len(content)
+        return blob
+
+    def _blob_sizes(self):
+        """Size of every blob in the store, by digest."""
+        sizes = {}
+        try:
+            prefixes = os.scandir(os.path.join(self.directory, "blobs"))
+        except FileNotFoundError:
+            return sizes
+        with prefixes:
+            for prefix in prefixes:
+                if len(prefix.name) != 2 or not prefix.is_dir():
+                    continue
+                with os.scandir(prefix.path) as blobs:
+                    for blob in blobs:
+                        if not blob.name.startswith("."):  # Skip files still being written
+                            sizes[prefix.name + blob.name] = blob.stat().st_size
+        return sizes
+
+    def blob(self, blob):
+        """Stored content of a blob digest (None stands for a file that didn't exist)."""
+        if blob is None:
+            return None
+        with open(self._blob_path(blob), 'rb') as f:
+            return f.read()
+
+    def blob_size(self, blob):
+        return os.path.getsize(self._blob_path(blob))
+
+    def current(self, path):
+        """Content of the file at path right now, or None if it doesn't exist."""
+        try:
+            with open(os.path.join(self.root, path), 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def _put(self, path, content):
+        """Replace the file at path with content, or delete it if content is None."""
+        abs_path = os.path.join(self.root, path)
+        if content is not None:
+            write_atomically(abs_path, content)
+        elif os.path.exists(abs_path):
+            os.remove(abs_path)
+
+    def recover(self):
+        """
+        Put back the files of a batch that was being renamed into place when the agent died.
+
+        Returns:
+            int: Files put back
+        """
+        with self.lock:
+            try:
+                with open(self.pending_path, encoding='utf-8') as f:
+                    pending = json.load(f)
+            except FileNotFoundError:
+                return 0
+            except ValueError:
+                pending = {"batch": None, "files": []}
+            self._refresh()
+            restored = 0
+            # A batch that reached the journal was complete; only the pending file was left behind
+            if not any(change.batch is not None and change.batch == pending["batch"] for change in self.changes):
+                for entry in pending["files"]:
+                    if entry["temp"]:
+                        discard_staged(os.path.join(self.root, entry["temp"]))
+                    if entry["after"] != entry["before"] and digest(self.current(entry["path"])) == entry["after"]:
+                        self._put(entry["path"], self.blob(entry["before"]))
+                        restored += 1
+            os.remove(self.pending_path)
+            return restored
+
+    def apply(self, tool, writes):
+        """
+        Replace files (or delete them, for content None) all together, and journal the changes.
+
+        Both versions of every file are in the blob store before any file is touched, and the
+        journal lines are appended after the last one is replaced, so a crash never journals a
+        change that didn't happen. If replacing any file fails, the ones already replaced are
+        put back.
+
+        Args:
+            tool (str): The tool making the changes
+            writes (list): (path relative to the root, content bytes or None, id of the change it undoes or None)
+
+        Returns:
+            list: The journaled Changes, in the order of writes
+        """
+        with self.lock:
+            self._refresh()
+            if self.blob_bytes is None:
+                self.blob_bytes = sum(self._blob_sizes().values())
+            first_id = self.changes[-1].id + 1 if self.changes else 1
+            batch = first_id if len(writes) > 1 else None
+            now = time.time()
+            changes = [
+                Change(first_id + i, now, tool, path, self._store(self.current(path)), self._store(content), undoes, batch)
+                for i, (path, content, undoes) in enumerate(writes)
+            ]
+
+            staged = {}
+            try:
+                for path, content, _ in writes:
+                    if content is not None:
+                        abs_path = os.path.join(self.root, path)
+                        os.makedirs(os.path.dirname(abs_path), exist_ok=True)
+                        staged[path] = stage_file(abs_path, content)
+                if batch is not None:
+                    write_atomically(self.pending_path, json.dumps({"batch": batch, "files": [
+                        {
+                            "path": change.path,
+                            "temp": staged.get(change.path) and os.path.relpath(staged[change.path], self.root),
+                            "before": change.before,
+                            "after": change.after,
+                        }
+                        for change in changes
+                    ]}).encode("utf-8"))
+                replaced = []
+                try:
+                    for change in changes:
+                        if change.path in staged:
+                            commit_staged(staged[change.path], os.path.join(self.root, change.path))
+                            del staged[change.path]
+                        else:
+                            self._put(change.path, None)
+                        replaced.append(change)
+                except BaseException:
+                    for change in reversed(replaced):
+                        self._put(change.path, self.blob(change.before))
+                    raise
+            except BaseException:
+                for temp_path in staged.values():
+                    discard_staged(temp_path)
+                if batch is not None and os.path.exists(self.pending_path):
+                    os.remove(self.pending_path)
+                raise
+
+            lines = journal_lines(changes)
+            with open(self.journal_path, 'ab') as f:
+                f.write(lines)
+                f.flush()
+                os.fsync(f.fileno())
+                if self.inode is None:
+                    self.inode = os.fstat(f.fileno()).st_ino  # The journal's first lines
+            self.offset += len(lines)
+            if batch is not None:
+                os.remove(self.pending_path)
+            self.changes.extend(changes)
+            self.undone.update(change.undoes for change in changes if change.undoes is not None)
+            if len(self.changes) > HISTORY_MAX_CHANGES or self.blob_bytes > HISTORY_MAX_BYTES:
+                self._prune()
+        return changes
+
+    def _prune(self):
+        """
+        Drop the oldest changes down to three quarters of HISTORY_MAX_CHANGES and of
+        HISTORY_MAX_BYTES (so pruning doesn't run again on the next write), and delete the blobs
+        no remaining change refers to. Batches are kept or dropped whole, since undoing one
+        restores all its files.
+        """
+        sizes = self._blob_sizes()
+        max_changes = HISTORY_MAX_CHANGES * 3 // 4
+        max_bytes = HISTORY_MAX_BYTES * 3 // 4
+        kept_blobs = set()
+        kept_bytes = 0
+        cut = len(self.changes)
+        # The newest change is always kept, whatever its size
+        while cut > 0:
+            change = self.changes[cut - 1]
+            new_blobs = {blob for blob in (change.before, change.after) if blob is not None and blob not in kept_blobs}
+            new_bytes = sum(sizes.get(blob, 0) for blob in new_blobs)
+            if cut < len(self.changes) and (len(self.changes) - cut >= max_changes or kept_bytes + new_bytes > max_bytes):
+                break
+            kept_blobs |= new_blobs
+            kept_bytes += new_bytes
+            cut -= 1
+        while cut > 0 and self.changes[cut].batch not in (None, self.changes[cut].id):
+            cut -= 1  # Back to the start of a batch cut in two
+
+        if cut:
+            kept = self.changes[cut:]
+            lines = journal_lines(kept)
+            write_atomically(self.journal_path, lines)
+            self.changes = kept
+            self.undone = {change.undoes for change in kept if change.undoes is not None}
+            self.offset = len(lines)
+            self.inode = os.stat(self.journal_path).st_ino
+
+        referenced = {blob for change in self.changes for blob in (change.before, change.after)}
+        now = time.time()
+        for blob in [blob for blob in sizes if blob not in referenced]:
+            path = self._blob_path(blob)
+            try:
+                if now - os.path.getmtime(path) > HISTORY_BLOB_GRACE_SECONDS:
+                    os.remove(path)
+                    del sizes[blob]
+            except FileNotFoundError:
+                del sizes[blob]
+        self.blob_bytes = sum(sizes.values())
+
+    def latest(self, path=None):
+        """The most recent change (to path, if given) that is neither an undo nor undone already."""
+        with self.lock:
+            self._refresh()
+            for change in reversed(self.changes):
+                if change.undoes is None and change.id not in self.undone and path in (None, change.path):
+                    return change
+        return None
+
+    def batch(self, batch):
+        """The changes of a batch that haven't been undone yet."""
+        with self.lock:
+            return [change for change in self.changes if change.batch == batch and change.id not in self.undone]
+
+    def versions(self, path):
+        """
+        Every recorded version of path, oldest first.
+
+        Returns:
+            list: (blob digest or None, the change that produced it, or None for the version before the first change)
+        """
+        with self.lock:
+            self._refresh()
+            changes = [change for change in self.changes if change.path == path]
+        if not changes:
+            return []
+        return [(changes[0].before, None)] + [(change.after, change) for change in changes]
+
+
+class FileHistory:
+    """Journals of the working directories the agent has written to."""
+    def __init__(self):
+        self.journals = {}
+        self.lock = threading.Lock()
+
+    def journal(self, working_directory):
+        root = os.path.abspath(working_directory)
+        with self.lock:
+            if root not in self.journals:
+                # Batch workspaces are deleted when their prompt is done; drop the journals of any that are gone
+                for gone in [directory for directory in self.journals if not os.path.isdir(directory)]:
+                    del self.journals[gone]
+                journal = Journal(root)
+                journal.recover()
+                self.journals[root] = journal
+            return self.journals[root]
+
+
+HISTORY = FileHistory()
+
+
+def history_path(working_directory, path):
+    """
+    path (absolute) relative to working_directory, as the history records it.
+
+    Raises:
+        ValueError: path is inside the agent's own cache directory
+    """
+    relative_path = os.path.relpath(path, os.path.abspath(working_directory)).replace(os.sep, "/")
+    if relative_path.split("/")[0] == AGENT_CACHE_DIRECTORY:
+        raise ValueError(f'"{relative_path}" is inside the agent\'s cache directory')
+    return relative_path
+
+
+def replace_files(working_directory, writes, tool_name):
+    """
+    Atomically replace (or, with content None, delete) files together on behalf of a tool, journaling their previous versions.
+
+    Args:
+        working_directory (str): The working directory whose journal records the changes
+        writes (list): (absolute path inside working_directory, content as str (encoded as UTF-8), bytes or None, id of the change it undoes or None)
+        tool_name (str): The tool making the changes, as shown in the history
+
+    Returns:
+        list: The journaled Changes, in the order of writes
+
+    Raises:
+        ValueError: A path is inside the agent's own cache directory
+    """
+    root = os.path.abspath(working_directory)
+    relative_writes = [
+        (history_path(root, path), content.encode("utf-8") if isinstance(content, str) else content, undoes)
+        for path, content, undoes in writes
+    ]
+    try:
+        return HISTORY.journal(root).apply(tool_name, relative_writes)
+    finally:
+        for path, _, _ in writes:
+            record_change(root, path)
+
+
+def replace_file(working_directory, path, content, tool_name, undoes=None):
+    """Replace (or delete) one file with replace_files; returns its Change."""
+    return replace_files(working_directory, [(path, content, undoes)], tool_name)[0]
@@ -0,0 +1,465 @@
+"""In-memory index of working directory trees: paths, sizes, mtimes and content hashes.
+
+A tree is scanned once. On Linux every directory in it is then watched with inotify, and the
+pending events are read each time the index is used, so only the entries they name are
+stat'ed again. Without inotify (other platforms, or no watches left) the tree is rescanned
+when it is used more than FILE_INDEX_RESCAN_SECONDS after the last scan, and tools that
+change files report them so that their own changes show up at once.
+
+Content hashes are computed on first use and kept until the file's stat data changes.
+"""
+
+import atexit
+import collections
+import ctypes
+import errno
+import hashlib
+import os
+import stat
+import struct
+import sys
+import threading
+import time
+from .config import FILE_INDEX_RESCAN_SECONDS, FILE_INDEX_MAX_TREES
+from .gitignore import load_gitignore, is_ignored
+
+# inotify(7) flags
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = os.O_CLOEXEC
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_DONT_FOLLOW = 0x02000000
+IN_EXCL_UNLINK = 0x04000000
+
+WATCH_MASK = (
+    IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+    | IN_ONLYDIR | IN_DONT_FOLLOW | IN_EXCL_UNLINK
+)
+
+EVENT_HEADER = struct.Struct("iIII")
+
+
+class Inotify:
+    """Linux inotify instance (through ctypes) whose events are read without blocking."""
+    def __init__(self):
+        if not sys.platform.startswith("linux"):
+            raise OSError(errno.ENOSYS, "inotify is only available on Linux")
+        libc = ctypes.CDLL(None, use_errno=True)
+        try:
+            self._add_watch = libc.inotify_add_watch
+            self._rm_watch = libc.inotify_rm_watch
+            init = libc.inotify_init1
+        except AttributeError:
+            raise OSError(errno.ENOSYS, "inotify is not available") from None
+        self._add_watch.argtypes = (ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32)
+        self._rm_watch.argtypes = (ctypes.c_int, ctypes.c_int)
+        self.fd = init(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, os.strerror(error))
+
+    def add_watch(self, path):
+        """Watch directory path; returns its watch descriptor (the same one if already watched)."""
+        wd = self._add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, os.strerror(error), path)
+        return wd
+
+    def remove_watch(self, wd):
+        self._rm_watch(self.fd, wd)
+
+    def read_events(self):
+        """Every queued event as (watch descriptor, mask, name)."""
+        events = []
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                return events
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+                offset += EVENT_HEADER.size
+                name = os.fsdecode(data[offset:offset + length].rstrip(b"\0"))
+                offset += length
+                events.append((wd, mask, name))
+
+    def close(self):
+        os.close(self.fd)
+
+
+class IndexEntry:
+    """Stat data of one directory entry (symlinks followed), and its content digest once taken."""
+    __slots__ = ("name", "is_dir", "is_file", "is_link", "size", "mtime_ns", "inode", "digest", "hashed_at")
+
+    def __init__(self, name, is_dir, is_file, is_link, size, mtime_ns, inode):
+        self.name = name
+        self.is_dir = is_dir
+        self.is_file = is_file
+        self.is_link = is_link
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.inode = inode
+        self.digest = None
+        self.hashed_at = 0
+
+    @property
+    def is_subtree(self):
+        """A directory that is indexed itself (symlinked directories are not followed)."""
+        return self.is_dir and not self.is_link
+
+    def same_file(self, other):
+        return (self.mtime_ns, self.size, self.inode) == (other.mtime_ns, other.size, other.inode)
+
+
+def stat_entry(path, name):
+    """IndexEntry for path, or None if it no longer exists."""
+    try:
+        link_stat = os.lstat(path)
+    except (FileNotFoundError, NotADirectoryError):
+        return None
+    target_stat = link_stat
+    if stat.S_ISLNK(link_stat.st_mode):
+        try:
+            target_stat = os.stat(path)
+        except OSError:
+            pass  # Broken symlink
+    return IndexEntry(
+        name,
+        stat.S_ISDIR(target_stat.st_mode),
+        stat.S_ISREG(target_stat.st_mode),
+        stat.S_ISLNK(link_stat.st_mode),
+        target_stat.st_size,
+        target_stat.st_mtime_ns,
+        target_stat.st_ino,
+    )
+
+
+def join(relative_path, name):
+    return f"{relative_path}/{name}" if relative_path else name
+
+
+class DirectoryNode:
+    """The entries of one directory. Nodes are replaced, not changed, when the directory changes."""
+    __slots__ = ("directory", "relative_path", "entries", "watch", "_sorted", "_rules")
+
+    def __init__(self, directory, relative_path, entries, watch=None, rules=None):
+        self.directory = directory
+        self.relative_path = relative_path
+        self.entries = entries
+        self.watch = watch
+        self._sorted = None
+        self._rules = rules
+
+    def sorted_entries(self):
+        if self._sorted is None:
+            self._sorted = [self.entries[name] for name in sorted(self.entries)]
+        return self._sorted
+
+    def gitignore_rules(self):
+        """Rules of this directory's .gitignore, parsed once per version of the directory."""
+        if self._rules is None:
+            self._rules = load_gitignore(self.directory, self.relative_path)
+        return self._rules
+
+
+def scan_directory(directory, relative_path, previous=None):
+    """
+    A DirectoryNode for directory, read from disk.
+
+    Args:
+        directory (str): Absolute path of the directory
+        relative_path (str): /-separated path of the directory relative to the working directory
+        previous (DirectoryNode): Earlier node for the directory, whose digests are kept for unchanged files
+    """
+    entries = {}
+    try:
+        with os.scandir(directory) as it:
+            names = [entry.name for entry in it]
+    except (FileNotFoundError, NotADirectoryError, PermissionError):
+        names = []
+    for name in names:
+        entry = stat_entry(os.path.join(directory, name), name)
+        if entry is None:
+            continue
+        old = previous.entries.get(name) if previous is not None else None
+        if old is not None and old.same_file(entry):
+            entry.digest, entry.hashed_at = old.digest, old.hashed_at
+        entries[name] = entry
+    return DirectoryNode(directory, relative_path, entries)
+
+
+class TreeIndex:
+    """Index of one working directory tree, kept fresh by inotify or by periodic rescans."""
+    def __init__(self, root):
+        self.root = root
+        self.directories = {}  # /-separated relative path ("" for the root) -> DirectoryNode
+        self.lock = threading.RLock()
+        self.watches = {}  # watch descriptor -> relative path of the watched directory
+        self.changed_names = {}  # relative directory path -> names of entries to stat again
+        self.links = set()  # relative paths of symlinks, whose targets may change without an event here
+        self.scanned_at = None
+        self.rescans = 0
+        self.events = 0
+        try:
+            self.inotify = Inotify()
+        except OSError:
+            self.inotify = None
+
+    def refresh(self, exact=False):
+        """
+        Bring the index up to date with the disk.
+
+        Args:
+            exact (bool): Without inotify, rescan now even if the last scan is recent
+        """
+        with self.lock:
+            if self.scanned_at is None:
+                self._rescan()
+            elif self.inotify is not None:
+                if self._read_events():
+                    self._rescan()  # The kernel dropped events
+            elif exact or time.monotonic() - self.scanned_at > FILE_INDEX_RESCAN_SECONDS:
+                self._rescan()
+            self._apply_changes()
+
+    def changed(self, relative_path=None):
+        """Note that a tool changed relative_path (anything, when None); inotify reports these itself."""
+        with self.lock:
+            if self.inotify is not None or self.scanned_at is None:
+                return
+            if relative_path is None:
+                self.scanned_at = None
+                return
+            # A new file may be in new directories; the first indexed ancestor gets the new entry
+            parent, _, name = relative_path.replace(os.sep, "/").rpartition("/")
+            while parent and parent not in self.directories:
+                parent, _, name = parent.rpartition("/")
+            self.changed_names.setdefault(parent, set()).add(name)
+
+    def directory(self, relative_path):
+        """The DirectoryNode for a /-separated relative path, or None if it isn't an indexed directory."""
+        return self.directories.get(relative_path)
+
+    def files(self, skipped_directories=()):
+        """(relative path, IndexEntry) of every regular file, not entering directories named in skipped_directories."""
+        pending = [""]
+        while pending:
+            node = self.directories.get(pending.pop())
+            if node is None:
+                continue
+            for entry in node.entries.values():
+                if entry.is_subtree:
+                    if entry.name not in skipped_directories:
+                        pending.append(join(node.relative_path, entry.name))
+                elif entry.is_file:
+                    yield join(node.relative_path, entry.name), entry
+
+    def digest(self, relative_path, entry):
+        """Content digest of a file, read again only when its stat data changed."""
+        # A file modified just before it was hashed can change again without its stat
+        # data changing (same mtime tick, same size), so such digests are not trusted
+        if entry.digest is not None and entry.hashed_at - entry.mtime_ns > 1_000_000_000:
+            return entry.digest
+        hashed_at = time.time_ns()
+        digest = hashlib.blake2b()
+        with open(os.path.join(self.root, relative_path), 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(chunk)
+        entry.digest, entry.hashed_at = digest.hexdigest(), hashed_at
+        return entry.digest
+
+    def digests(self, skipped_directories=()):
+        """Content digest of every file, keyed by relative path."""
+        return {path: self.digest(path, entry) for path, entry in self.files(skipped_directories)}
+
+    def close(self):
+        with self.lock:
+            if self.inotify is not None:
+                self.inotify.close()
+                self.inotify = None
+            self.watches.clear()
+
+    def _watch(self, relative_path):
+        if self.inotify is None:
+            return None
+        try:
+            wd = self.inotify.add_watch(os.path.join(self.root, relative_path))
+        except OSError as e:
+            if e.errno == errno.ENOSPC:
+                # Out of inotify watches (fs.inotify.max_user_watches): rescan periodically instead
+                self.close()
+            return None
+        self.watches[wd] = relative_path
+        return wd
+
+    def _scan_tree(self, relative_path, previous):
+        pending = [relative_path]
+        while pending:
+            path = pending.pop()
+            # Watch before reading, so that nothing created in between is missed
+            wd = self._watch(path)
+            node = scan_directory(os.path.join(self.root, path), path, previous.get(path))
+            node.watch = wd
+            self.directories[path] = node
+            pending.extend(join(path, entry.name) for entry in node.entries.values() if entry.is_subtree)
+            self.links.update(join(path, entry.name) for entry in node.entries.values() if entry.is_link)
+
+    def _drop_tree(self, relative_path):
+        prefix = relative_path + "/"
+        self.links = {p for p in self.links if not p.startswith(prefix)}
+        for path in [p for p in self.directories if p == relative_path or p.startswith(prefix)]:
+            node = self.directories.pop(path)
+            # A directory moved elsewhere in the tree keeps its watch descriptor under the new path
+            if node.watch is not None and self.watches.get(node.watch) == path:
+                del self.watches[node.watch]
+                self.inotify.remove_watch(node.watch)
+
+    def _rescan(self):
+        previous = self.directories
+        self.directories = {}
+        self.changed_names = {}
+        self.links = set()
+        self._scan_tree("", previous)
+        for wd, path in list(self.watches.items()):
+            node = self.directories.get(path)
+            if node is None or node.watch != wd:
+                del self.watches[wd]
+                self.inotify.remove_watch(wd)
+        self.scanned_at = time.monotonic()
+        self.rescans += 1
+
+    def _read_events(self):
+        """Record the entries named by pending events; returns True if events were lost."""
+        overflowed = False
+        for wd, mask, name in self.inotify.read_events():
+            self.events += 1
+            if mask & IN_Q_OVERFLOW:
+                overflowed = True
+            elif mask & IN_IGNORED:
+                self.watches.pop(wd, None)
+            elif name and wd in self.watches:
+                self.changed_names.setdefault(self.watches[wd], set()).add(name)
+        return overflowed
+
+    def _apply_changes(self):
+        changed_names, self.changed_names = self.changed_names, {}
+        if changed_names:
+            for link in self.links:
+                parent, _, name = link.rpartition("/")
+                changed_names.setdefault(parent, set()).add(name)
+        # Parents first, so a directory dropped with its parent isn't stat'ed for nothing
+        for path in sorted(changed_names):
+            node = self.directories.get(path)
+            if node is None:
+                continue
+            entries = dict(node.entries)
+            for name in changed_names[path]:
+                child_path = join(path, name)
+                old = entries.get(name)
+                entry = stat_entry(os.path.join(node.directory, name), name)
+                if old is not None and old.is_subtree and not (entry is not None and entry.is_subtree and entry.inode == old.inode):
+                    self._drop_tree(child_path)
+                self.links.discard(child_path)
+                if entry is None:
+                    entries.pop(name, None)
+                    continue
+                if entry.is_link:
+                    self.links.add(child_path)
+                if old is not None and old.same_file(entry):
+                    entry.digest, entry.hashed_at = old.digest, old.hashed_at
+                entries[name] = entry
+                if entry.is_subtree and child_path not in self.directories:
+                    self._scan_tree(child_path, {})
+            rules = None if ".gitignore" in changed_names[path] else node._rules
+            self.directories[path] = DirectoryNode(node.directory, path, entries, node.watch, rules)
+
+
+def visible_files(index, skipped_directories=()):
+    """(relative path, IndexEntry) of the files not ignored by .gitignore, outside directories named in skipped_directories."""
+    pending = [("", [])]
+    while pending:
+        relative_path, rules = pending.pop()
+        node = index.directory(relative_path)
+        if node is None:
+            continue
+        rules = rules + node.gitignore_rules()
+        for entry in node.entries.values():
+            path = join(relative_path, entry.name)
+            if is_ignored(rules, path, entry.is_dir):
+                continue
+            if entry.is_subtree:
+                if entry.name not in skipped_directories:
+                    pending.append((path, rules))
+            elif entry.is_file:
+                yield path, entry
+
+
+def resolves_inside(real_root, path):
+    """Whether path, with symlinks resolved, is real_root (itself resolved) or lies under it."""
+    return os.path.commonpath([real_root, os.path.realpath(path)]) == real_root
+
+
+def contained_files(root, files):
+    """The (relative path, IndexEntry) pairs of files that are not symlinks to a file outside root."""
+    real_root = os.path.realpath(root)
+    for relative_path, entry in files:
+        if not entry.is_link or resolves_inside(real_root, os.path.join(root, relative_path)):
+            yield relative_path, entry
+
+
+class FileIndex:
+    """Tree indexes keyed by working directory; the least recently used are dropped."""
+    def __init__(self, max_trees=FILE_INDEX_MAX_TREES):
+        self.max_trees = max_trees
+        self.trees = collections.OrderedDict()
+        self.lock = threading.Lock()
+
+    def tree(self, working_directory, exact=False):
+        """
+        The up-to-date index of working_directory, scanning it on first use.
+
+        Args:
+            working_directory (str): Root of the tree
+            exact (bool): Without inotify, rescan now rather than trust a recent scan
+        """
+        root = os.path.abspath(working_directory)
+        dropped = []
+        with self.lock:
+            # Batch sessions run in temporary copies; forget trees of deleted directories
+            for directory in [d for d in self.trees if not os.path.isdir(d)]:
+                dropped.append(self.trees.pop(directory))
+            tree = self.trees.pop(root, None) or TreeIndex(root)
+            self.trees[root] = tree
+            while len(self.trees) > self.max_trees:
+                dropped.append(self.trees.popitem(last=False)[1])
+        for old in dropped:
+            old.close()
+        tree.refresh(exact)
+        return tree
+
+    def changed(self, working_directory, relative_path=None):
+        """Note that a tool changed relative_path in working_directory (anything, when None)."""
+        with self.lock:
+            tree = self.trees.get(os.path.abspath(working_directory))
+        if tree is not None:
+            tree.changed(relative_path)
+
+    def close(self):
+        with self.lock:
+            trees, self.trees = list(self.trees.values()), collections.OrderedDict()
+        for tree in trees:
+            tree.close()
+
+
+FILE_INDEX = FileIndex()
+atexit.register(FILE_INDEX.close)
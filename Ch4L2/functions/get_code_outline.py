@@ -0,0 +1,139 @@
+"""Function to outline the classes and functions of Python files, so they can be read by line range."""
+
+import concurrent.futures
+import os
+import threading
+from pathlib import Path
+from .code_outline import outline_file
+from .config import MAX_FILE_CHARACTERS, PYTHON_TIMEOUT_SECONDS, OUTLINE_PARALLEL_MIN_FILES, OUTLINE_MAX_WORKERS
+from .file_index import FILE_INDEX, visible_files, contained_files
+from .python_pool import run_helper
+from .registry import tool
+from .run_cache import SKIPPED_DIRECTORIES
+
+CODE_OUTLINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "code_outline.py")
+
+# absolute path -> ((mtime_ns, size), outline)
+_outlines = {}
+_outlines_lock = threading.Lock()
+
+
+def _parse(root, paths):
+    """Outlines of paths (relative to root), parsed in parallel worker processes when there are many."""
+    worker_count = min(OUTLINE_MAX_WORKERS, os.cpu_count() or 1, len(paths) // OUTLINE_PARALLEL_MIN_FILES)
+    if worker_count > 1:
+        shards = [paths[i::worker_count] for i in range(worker_count)]
+        try:
+            with concurrent.futures.ThreadPoolExecutor(max_workers=worker_count) as executor:
+                reports = executor.map(lambda shard: run_helper(root, CODE_OUTLINE_PATH, shard, PYTHON_TIMEOUT_SECONDS), shards)
+                return {path: outline for report in reports for path, outline in report.items()}
+        except Exception:
+            pass  # Parse them here instead
+    return {path: outline_file(os.path.join(root, path)) for path in paths}
+
+
+def cached_outlines(root, files):
+    """
+    Outlines of Python files under root; files are only parsed again when their mtime or size changed.
+
+    Args:
+        root (str): Absolute working directory
+        files (list): (path relative to root, (mtime_ns, size))
+
+    Returns:
+        dict: Relative path -> outline (see code_outline.outline)
+    """
+    outlines = {}
+    with _outlines_lock:
+        for file_path, key in files:
+            cached = _outlines.get(os.path.join(root, file_path))
+            if cached is not None and cached[0] == key:
+                outlines[file_path] = cached[1]
+    parsed = _parse(root, [file_path for file_path, _ in files if file_path not in outlines])
+    with _outlines_lock:
+        for file_path, key in files:
+            if file_path in parsed:
+                _outlines[os.path.join(root, file_path)] = (key, parsed[file_path])
+    outlines.update(parsed)
+    return outlines
+
+
+def _format(path, outline):
+    if "error" in outline:
+        return [f"{path}: {outline['error']}"]
+    header = f"{path} ({outline['lines']} lines)"
+    if outline["docstring"]:
+        header += f": {outline['docstring']}"
+    lines = [header]
+    for depth, signature, first, last, docstring, _, _ in outline["entries"]:
+        line = f"{'  ' * (depth + 1)}{first}-{last} {signature}"
+        if docstring:
+            line += f"  # {docstring}"
+        lines.append(line)
+    return lines
+
+
+@tool(
+    description="Outline Python files: their classes and functions with signatures, line ranges and the first line of each docstring. Use it to find the code you need, then read just those lines with get_file_content offset/limit.",
+    parameters={
+        "path": "The Python file or directory to outline, relative to the working directory. Directories are outlined recursively. If not provided, outlines the whole working directory.",
+    },
+    read_only=True,
+)
+def get_code_outline(working_directory, path: str = "."):
+    """
+    Outline the Python files at a path within a restricted working directory.
+
+    Args:
+        working_directory (str): The base directory that limits file access
+        path (str): Python file or directory, relative to working_directory
+
+    Returns:
+        str: Outline of each file, or an error message
+    """
+    try:
+        abs_working_dir = os.path.abspath(working_directory)
+        abs_path = os.path.abspath(os.path.join(working_directory, path))
+        if not abs_path.startswith(abs_working_dir + os.sep) and abs_path != abs_working_dir:
+            return f'Error: Cannot outline "{path}" as it is outside the permitted working directory'
+        # Security check with symlinks resolved, as get_file_content does
+        try:
+            Path(abs_path).resolve().relative_to(Path(working_directory).resolve())
+        except ValueError:
+            return f'Error: Cannot outline "{path}" as it is outside the permitted working directory'
+
+        index = FILE_INDEX.tree(abs_working_dir)
+        relative_path = os.path.relpath(abs_path, abs_working_dir).replace(os.sep, "/")
+        if os.path.isfile(abs_path):
+            if not abs_path.endswith(".py"):
+                return f'Error: "{path}" is not a Python file'
+            stat = os.stat(abs_path)
+            files = [(relative_path, (stat.st_mtime_ns, stat.st_size))]
+        elif os.path.isdir(abs_path):
+            prefix = "" if relative_path == "." else relative_path + "/"
+            files = sorted(
+                (file_path, (entry.mtime_ns, entry.size))
+                for file_path, entry in contained_files(abs_working_dir, visible_files(index, SKIPPED_DIRECTORIES))
+                if file_path.endswith(".py") and file_path.startswith(prefix)
+            )
+            if not files:
+                return f'No Python files in "{path}"'
+        else:
+            return f'Error: "{path}" does not exist'
+
+        outlines = cached_outlines(abs_working_dir, files)
+
+        lines = []
+        characters = 0
+        for shown, (file_path, _) in enumerate(files):
+            file_lines = _format(file_path, outlines[file_path])
+            size = sum(len(line) + 1 for line in file_lines)
+            if lines and characters + size > MAX_FILE_CHARACTERS:
+                lines.append(f"[...outline truncated; {len(files) - shown} more files not shown. Outline a subdirectory or a single file]")
+                break
+            lines.extend(file_lines)
+            characters += size
+        return "\n".join(lines)
+
+    except Exception as e:
+        return f"Error: {str(e)}"
@@ -3,15 +3,39 @@
 import os
 from pathlib import Path
 from .config import MAX_FILE_CHARACTERS
+from .ranged_read import read_lines, read_bytes, file_totals
+from .registry import tool
 
 
-def get_file_content(working_directory, file_path):
+@tool(
+    description="Read the contents of a file within the working directory. Large files can be read in pages, either by line (offset/limit) or by byte range (byte_offset/byte_limit); ranged reads report the file's total size and line count.",
+    parameters={
+        "file_path": "The path to the file to read, relative to the working directory.",
+        "offset": "Optional 1-based line number to start reading at.",
+        "limit": "Optional maximum number of lines to read.",
+        "byte_offset": "Optional byte position to start reading at (instead of offset/limit).",
+        "byte_limit": "Optional maximum number of bytes to read (instead of offset/limit).",
+    },
+    read_only=True,
+)
+def get_file_content(
+    working_directory,
+    file_path: str,
+    offset: int | None = None,
+    limit: int | None = None,
+    byte_offset: int | None = None,
+    byte_limit: int | None = None,
+):
     """
     Read file content with security checks and truncation.
     
     Args:
         working_directory (str): The base working directory
         file_path (str): Path to the file to read (relative to working_directory or absolute)
+        offset (int): 1-based first line to read
+        limit (int): Maximum number of lines to read
+        byte_offset (int): First byte to read
+        byte_limit (int): Maximum number of bytes to read
     
     Returns:
         str: File contents (truncated if > MAX_FILE_CHARACTERS) or error message
@@ -36,36 +60,52 @@ def get_file_content(working_directory, file_path):
         if not target_path.exists() or not target_path.is_file():
             return f'Error: File not found or is not a regular file: "{file_path}"'
         
-        # Read the file content
+        line_range = offset is not None or limit is not None
+        byte_range = byte_offset is not None or byte_limit is not None
+        if line_range and byte_range:
+            return 'Error: Use either offset/limit (lines) or byte_offset/byte_limit (bytes), not both'
+        for name, value in (("offset", offset), ("limit", limit), ("byte_offset", byte_offset), ("byte_limit", byte_limit)):
+            if value is not None and value < 0:
+                return f'Error: {name} must not be negative'
+        if limit is not None and limit < 1:
+            return 'Error: limit must be at least 1'
+        
+        if line_range:
+            # Decode only the requested lines from the memory-mapped file
+            content, first, last, total_lines, size, cut = read_lines(str(target_path), offset or 1, limit, MAX_FILE_CHARACTERS)
+            if last < first:
+                return f'[Line {first} is past the end of "{file_path}" ({total_lines} lines, {size} bytes)]'
+            if cut is not None:
+                # The last line is longer than can be returned; the rest of it is read by byte range
+                header = f'[Lines {first}-{last} of {total_lines} in "{file_path}" ({size} bytes); line {last} is only partly shown]'
+                content += f'[...line {last} truncated at byte {cut}; continue with byte_offset={cut}'
+                content += f', then offset={last + 1}]' if last < total_lines else ']'
+                return f"{header}\n{content}"
+            header = f'[Lines {first}-{last} of {total_lines} in "{file_path}" ({size} bytes)]'
+            if last < total_lines:
+                content += f'[...{total_lines - last} more lines; continue with offset={last + 1}]'
+            return f"{header}\n{content}"
+        
+        if byte_range:
+            # Decode only the requested bytes from the memory-mapped file
+            content, start, end, total_lines, size = read_bytes(str(target_path), byte_offset or 0, byte_limit, MAX_FILE_CHARACTERS)
+            header = f'[Bytes {start}-{end} of {size} in "{file_path}" ({total_lines} lines)]'
+            if end < size:
+                content += f'[...{size - end} more bytes; continue with byte_offset={end}]'
+            return f"{header}\n{content}"
+        
+        # Read only as much of the file as can be returned
         with open(target_path, 'r', encoding='utf-8') as f:
-            content = f.read()
+            content = f.read(MAX_FILE_CHARACTERS + 1)
         
         # Truncate if necessary
         if len(content) > MAX_FILE_CHARACTERS:
             content = content[:MAX_FILE_CHARACTERS]
-            content += f'[...File "{file_path}" truncated at {MAX_FILE_CHARACTERS} characters]'
+            total_lines, size = file_totals(str(target_path))
+            content += f'[...File "{file_path}" truncated at {MAX_FILE_CHARACTERS} characters; it has {total_lines} lines ({size} bytes). Read the rest with offset/limit or byte_offset/byte_limit]'
         
         return content
         
     except Exception as e:
         return f"Error: {str(e)}"
 
-
-# Function schema for Groq API
-schema_get_file_content = {
-    "type": "function",
-    "function": {
-        "name": "get_file_content",
-        "description": "Read the contents of a file within the working directory.",
-        "parameters": {
-            "type": "object",
-            "properties": {
-                "file_path": {
-                    "type": "string",
-                    "description": "The path to the file to read, relative to the working directory."
-                }
-            },
-            "required": ["file_path"]
-        }
-    }
-}
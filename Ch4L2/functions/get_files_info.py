@@ -1,67 +1,189 @@
+import base64
+import fnmatch
+import hashlib
+import json
 import os
+from .config import FILES_INFO_PAGE_SIZE
+from .file_history import AGENT_CACHE_DIRECTORY
+from .file_index import FILE_INDEX, scan_directory
+from .gitignore import is_ignored
+from .registry import tool
 
 
-def get_files_info(working_directory, directory="."):
+def glob_matches(patterns, relative_path):
+    """Glob match: patterns containing a / match the whole relative path, others just the name."""
+    name = relative_path.rsplit("/", 1)[-1]
+    return any(fnmatch.fnmatchcase(relative_path if "/" in pattern else name, pattern) for pattern in patterns)
+
+
+def _node(index, directory, relative_path):
+    """The indexed DirectoryNode for a path, or one read from disk (paths under a symlinked directory)."""
+    return index.directory(relative_path) or scan_directory(directory, relative_path)
+
+
+def _walk(index, node, prefix, depth, options, rules, resume):
+    """
+    Yield (path relative to the listed directory, IndexEntry) in sorted pre-order.
+
+    Args:
+        index (TreeIndex): Index of the working directory
+        node (DirectoryNode): Directory to list
+        prefix (str): Listed path of directory ("" for the listed directory itself)
+        depth (int): Depth of the entries in directory (1 for the listed directory's entries)
+        options (dict): max_depth, include, exclude
+        rules (list): .gitignore rules in effect, or None to ignore .gitignore files
+        resume (list): Path components of the last entry of the previous page, or None
+    """
+    if rules is not None:
+        rules = rules + node.gitignore_rules()
+    ignore_prefix = node.relative_path + "/" if node.relative_path else ""
+
+    for entry in node.sorted_entries():
+        # Entries up to the previous page's last one were already listed
+        on_resume_path = False
+        if resume:
+            if entry.name < resume[0]:
+                continue
+            if entry.name == resume[0]:
+                on_resume_path = True
+            else:
+                resume = None
+
+        # The file history and caches are the agent's own, whatever respect_gitignore says
+        if entry.name == AGENT_CACHE_DIRECTORY:
+            continue
+        path = prefix + entry.name
+        descend = entry.is_subtree and (options["max_depth"] is None or depth < options["max_depth"])
+        if rules is not None and (entry.name == ".git" or is_ignored(rules, ignore_prefix + entry.name, entry.is_dir)):
+            continue
+        if options["exclude"] and glob_matches(options["exclude"], path):
+            continue
+
+        if not on_resume_path and (not options["include"] or glob_matches(options["include"], path)):
+            yield path, entry
+        if descend:
+            child_resume = (resume[1:] or None) if on_resume_path else None
+            child = _node(index, os.path.join(node.directory, entry.name), ignore_prefix + entry.name)
+            yield from _walk(index, child, path + "/", depth + 1, options, rules, child_resume)
+        if on_resume_path:
+            resume = None
+
+
+def _query_key(directory, options):
+    """Fingerprint of a listing's arguments, so a page_token is only used with the listing it came from."""
+    return hashlib.sha256(json.dumps([os.path.normpath(directory), options], sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+
+def _page_token(last_path, query_key):
+    token = json.dumps({"after": last_path, "query": query_key})
+    return base64.urlsafe_b64encode(token.encode("utf-8")).decode("ascii")
+
+
+@tool(
+    description="Lists files in the specified directory along with their sizes, constrained to the working directory. Can list recursively (optionally to a max_depth), filter by glob patterns, skip files ignored by .gitignore, and returns long listings in pages.",
+    parameters={
+        "directory": "The directory to list files from, relative to the working directory. If not provided, lists files in the working directory itself.",
+        "recursive": "List the contents of subdirectories too; paths are then relative to the listed directory.",
+        "max_depth": "Optional maximum depth for a recursive listing (1 lists only the directory's own entries). Implies recursive.",
+        "include": "Optional glob patterns; only entries matching one are listed (e.g. [\"*.py\"]). Patterns containing / match the relative path, others the name.",
+        "exclude": "Optional glob patterns; matching entries are not listed, and matching directories are not descended into.",
+        "respect_gitignore": "In recursive listings, skip entries ignored by .gitignore files and the .git directory (default true).",
+        "page_token": "Token from the end of a previous, truncated listing with the same arguments, to get the next page.",
+    },
+    read_only=True,
+)
+def get_files_info(
+    working_directory,
+    directory: str = ".",
+    recursive: bool = False,
+    max_depth: int | None = None,
+    include: list[str] | None = None,
+    exclude: list[str] | None = None,
+    respect_gitignore: bool = True,
+    page_token: str | None = None,
+):
     """
     Get information about files and directories within a restricted working directory.
-    
+
     Args:
         working_directory: The base directory that limits file access
         directory: Relative path within the working_directory to list (default: ".")
-    
+        recursive: List subdirectories' contents too
+        max_depth: Deepest level to list (1 = the directory's own entries); implies recursive
+        include: Glob patterns an entry must match to be listed
+        exclude: Glob patterns of entries (and directories) to leave out
+        respect_gitignore: Skip .gitignore'd entries in recursive listings
+        page_token: Continuation token from a previous truncated listing
+
     Returns:
         String with formatted file information or error message
     """
     try:
         # Create the full path by joining working_directory and directory
         full_path = os.path.join(working_directory, directory)
-        
+
         # Get the absolute path and normalize it
         abs_full_path = os.path.abspath(full_path)
         abs_working_dir = os.path.abspath(working_directory)
-        
+
         # Security check: ensure the target directory is within working_directory
         if not abs_full_path.startswith(abs_working_dir + os.sep) and abs_full_path != abs_working_dir:
             return f'Error: Cannot list "{directory}" as it is outside the permitted working directory'
-        
+
         # Check if the path exists and is a directory
         if not os.path.exists(abs_full_path):
             return f'Error: "{directory}" does not exist'
-        
+
         if not os.path.isdir(abs_full_path):
             return f'Error: "{directory}" is not a directory'
-        
-        # List directory contents
+
+        if max_depth is not None and max_depth < 1:
+            return 'Error: max_depth must be at least 1'
+        recursive = recursive or max_depth is not None
+        options = {
+            "max_depth": max_depth if recursive else 1,
+            "include": include or [],
+            "exclude": exclude or [],
+        }
+        query_key = _query_key(directory, dict(options, respect_gitignore=respect_gitignore and recursive))
+
+        resume = None
+        if page_token:
+            try:
+                token = json.loads(base64.urlsafe_b64decode(page_token.encode("ascii")))
+            except ValueError:
+                return 'Error: page_token is not valid'
+            if token.get("query") != query_key:
+                return 'Error: page_token belongs to a listing with different arguments'
+            resume = token["after"].split("/")
+
+        # Listings are answered from the in-memory index of the working directory
+        index = FILE_INDEX.tree(abs_working_dir)
+        relative_directory = os.path.relpath(abs_full_path, abs_working_dir)
+        parts = [] if relative_directory == "." else relative_directory.split(os.sep)
+        node = _node(index, abs_full_path, "/".join(parts))
+
+        # .gitignore files from the working directory down to the listed directory apply
+        rules = None
+        if recursive and respect_gitignore:
+            rules = []
+            for i in range(len(parts)):
+                rules += _node(index, os.path.join(abs_working_dir, *parts[:i]), "/".join(parts[:i])).gitignore_rules()
+            if parts and is_ignored(rules, "/".join(parts), True):
+                rules = None  # Listing an ignored directory on purpose shows its contents
+
+        # The index holds each entry's type and size, so listing touches no files
         items = []
-        for item_name in sorted(os.listdir(abs_full_path)):
-            item_path = os.path.join(abs_full_path, item_name)
-            
-            # Get file size and check if it's a directory
-            file_size = os.path.getsize(item_path)
-            is_dir = os.path.isdir(item_path)
-            
-            items.append(f" - {item_name}: file_size={file_size} bytes, is_dir={is_dir}")
-        
+        last_path = None
+        for path, entry in _walk(index, node, "", 1, options, rules, resume):
+            if len(items) == FILES_INFO_PAGE_SIZE:
+                items.append(f'[...more entries; call again with page_token="{_page_token(last_path, query_key)}" to continue]')
+                break
+
+            items.append(f" - {path}: file_size={entry.size} bytes, is_dir={entry.is_dir}")
+            last_path = path
+
         return "\n".join(items)
-    
+
     except Exception as e:
         return f"Error: {str(e)}"
-
-
-# Function schema for Groq API
-schema_get_files_info = {
-    "type": "function",
-    "function": {
-        "name": "get_files_info",
-        "description": "Lists files in the specified directory along with their sizes, constrained to the working directory.",
-        "parameters": {
-            "type": "object",
-            "properties": {
-                "directory": {
-                    "type": "string",
-                    "description": "The directory to list files from, relative to the working directory. If not provided, lists files in the working directory itself."
-                }
-            }
-        }
-    }
-}
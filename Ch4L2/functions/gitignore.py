@@ -0,0 +1,120 @@
+"""Minimal .gitignore matching for directory listings.
+
+Supports comments, negation (!), directory-only patterns (trailing /), anchored patterns
+(a leading or inner /), and the *, ?, [...] and ** wildcards.
+"""
+
+import os
+import re
+
+
+class IgnoreRule:
+    """One .gitignore pattern, relative to the directory holding the .gitignore."""
+    __slots__ = ("base", "regex", "negated", "directory_only")
+
+    def __init__(self, base, regex, negated, directory_only):
+        self.base = base
+        self.regex = regex
+        self.negated = negated
+        self.directory_only = directory_only
+
+
+def _translate(pattern):
+    """Regex source for a gitignore glob matched against a /-separated relative path."""
+    parts = []
+    i = 0
+    while i < len(pattern):
+        c = pattern[i]
+        if pattern.startswith("**/", i):
+            parts.append("(?:.*/)?")
+            i += 3
+            continue
+        if pattern.startswith("**", i):
+            parts.append(".*")
+            i += 2
+            continue
+        if c == "*":
+            parts.append("[^/]*")
+        elif c == "?":
+            parts.append("[^/]")
+        elif c == "[" and "]" in pattern[i + 2:]:
+            end = pattern.index("]", i + 2)
+            body = pattern[i + 1:end]
+            if body.startswith("!"):
+                body = "^" + body[1:]
+            parts.append(f"[{body.replace(chr(92), chr(92) * 2)}]")
+            i = end + 1
+            continue
+        elif c == "\\" and i + 1 < len(pattern):
+            parts.append(re.escape(pattern[i + 1]))
+            i += 2
+            continue
+        else:
+            parts.append(re.escape(c))
+        i += 1
+    return "".join(parts)
+
+
+def parse_gitignore(text, base):
+    """
+    Parse the contents of a .gitignore file.
+
+    Args:
+        text (str): The .gitignore contents
+        base (str): /-separated path of its directory, relative to the listing root ("" for the root)
+
+    Returns:
+        list: IgnoreRule objects in file order
+    """
+    rules = []
+    for line in text.splitlines():
+        line = line.rstrip()
+        if not line or line.startswith("#"):
+            continue
+        negated = line.startswith("!")
+        if negated:
+            line = line[1:]
+        directory_only = line.endswith("/")
+        line = line.rstrip("/")
+        if not line:
+            continue
+        # A slash anywhere but the end anchors the pattern to the .gitignore's directory
+        anchored = "/" in line
+        regex = _translate(line.lstrip("/"))
+        if not anchored:
+            regex = "(?:.*/)?" + regex
+        rules.append(IgnoreRule(base, re.compile(regex), negated, directory_only))
+    return rules
+
+
+def load_gitignore(directory, base):
+    """Rules from directory/.gitignore, or an empty list if there is none."""
+    try:
+        with open(os.path.join(directory, ".gitignore"), 'r', encoding='utf-8', errors='replace') as f:
+            return parse_gitignore(f.read(), base)
+    except OSError:
+        return []
+
+
+def is_ignored(rules, path, is_dir):
+    """
+    Whether path is ignored; later rules (and deeper .gitignore files) win.
+
+    Args:
+        rules (list): IgnoreRule objects, outermost .gitignore first
+        path (str): /-separated path relative to the listing root
+        is_dir (bool): Whether path is a directory
+    """
+    ignored = False
+    for rule in rules:
+        if rule.directory_only and not is_dir:
+            continue
+        if rule.base:
+            if not path.startswith(rule.base + "/"):
+                continue
+            relative = path[len(rule.base) + 1:]
+        else:
+            relative = path
+        if rule.regex.fullmatch(relative):
+            ignored = not rule.negated
+    return ignored
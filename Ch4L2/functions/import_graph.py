@@ -0,0 +1,115 @@
+"""Static import graph of the Python files in a working directory.
+
+Used by run_tests to find the tests a change can affect. Imports are read from each file's
+AST, and a file is only parsed again when its stat data changes.
+"""
+
+import ast
+import os
+import threading
+from .file_index import FILE_INDEX
+from .run_cache import SKIPPED_DIRECTORIES
+
+
+def python_files(root):
+    """Paths of the .py files under root, relative to root."""
+    return sorted(path for path, _ in FILE_INDEX.tree(root).files(SKIPPED_DIRECTORIES) if path.endswith(".py"))
+
+
+def module_imports(source, relative_path):
+    """
+    Names of the modules a file imports, with relative imports made absolute.
+
+    "from a import b" yields both "a" and "a.b", since b may be a submodule.
+    """
+    package = os.path.dirname(relative_path).replace(os.sep, ".")
+    names = set()
+    for node in ast.walk(ast.parse(source)):
+        if isinstance(node, ast.Import):
+            names.update(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            base = node.module
+            if node.level:
+                parts = package.split(".") if package else []
+                if node.level - 1 > len(parts):
+                    continue
+                parts = parts[:len(parts) - (node.level - 1)]
+                base = ".".join(parts + ([node.module] if node.module else []))
+            if base:
+                names.add(base)
+            names.update(f"{base}.{alias.name}" if base else alias.name for alias in node.names if alias.name != "*")
+    return names
+
+
+def resolve_module(name, search_directories, files):
+    """The files in files (relative paths) that importing name would execute."""
+    found = set()
+    parts = name.split(".")
+    for directory in search_directories:
+        for i in range(1, len(parts) + 1):
+            prefix = os.path.join(directory, *parts[:i])
+            for candidate in (prefix + ".py", os.path.join(prefix, "__init__.py")):
+                candidate = os.path.normpath(candidate)
+                if candidate in files:
+                    found.add(candidate)
+    return found
+
+
+class ImportGraph:
+    """Local imports of every Python file under a root, re-parsing only changed files."""
+    def __init__(self):
+        # absolute path -> ((mtime_ns, size), imported module names)
+        self.parsed = {}
+        self.lock = threading.Lock()
+
+    def _imports(self, root, relative_path):
+        path = os.path.join(root, relative_path)
+        stat = os.stat(path)
+        key = (stat.st_mtime_ns, stat.st_size)
+        with self.lock:
+            cached = self.parsed.get(path)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        try:
+            with open(path, 'rb') as f:
+                names = module_imports(f.read(), relative_path)
+        except (SyntaxError, ValueError):
+            names = set()
+        with self.lock:
+            self.parsed[path] = (key, names)
+        return names
+
+    def dependencies(self, root, targets):
+        """
+        Map each target file to every local file it imports, directly or indirectly.
+
+        Args:
+            root (str): Working directory the files are under
+            targets (list): Relative paths of the files to follow (e.g. test files)
+
+        Returns:
+            dict: target -> set of relative paths, including the target itself
+        """
+        files = set(python_files(root))
+        edges = {}
+
+        def local_imports(relative_path):
+            if relative_path not in edges:
+                # Scripts run with their own directory on sys.path, packages resolve from the root
+                search_directories = ["", os.path.dirname(relative_path)]
+                edges[relative_path] = set()
+                for name in self._imports(root, relative_path):
+                    edges[relative_path] |= resolve_module(name, search_directories, files)
+            return edges[relative_path]
+
+        dependencies = {}
+        for target in targets:
+            seen = {target}
+            pending = [target]
+            while pending:
+                for imported in local_imports(pending.pop()):
+                    if imported not in seen:
+                        seen.add(imported)
+                        pending.append(imported)
+            dependencies[target] = seen
+        return dependencies
@@ -0,0 +1,179 @@
+"""Apply search/replace blocks and unified diffs to file contents, and summarize the result as a short diff.
+
+Every anchor (a search text, or a hunk's context and removed lines) must match exactly one
+place in the file, so an edit can't silently land somewhere other than where the model meant.
+"""
+
+import difflib
+import re
+import typing
+
+HUNK_HEADER = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+
+
+class EditError(ValueError):
+    """An edit that can't be applied; nothing is written."""
+
+
+class SearchReplace(typing.TypedDict):
+    search: str
+    replace: str
+
+
+def _newline(content):
+    return "\r\n" if "\r\n" in content else "\n"
+
+
+def apply_search_replace(content, edits):
+    """
+    Apply search/replace blocks in order, each to the result of the ones before it.
+
+    Raises:
+        EditError: A block is malformed, or its search text is missing or not unique
+    """
+    for number, edit in enumerate(edits, 1):
+        if not isinstance(edit, dict) or not isinstance(edit.get("search"), str) or not isinstance(edit.get("replace"), str):
+            raise EditError(f'edit {number} must have "search" and "replace" strings')
+        search, replace = edit["search"], edit["replace"]
+        if not search:
+            raise EditError(f"edit {number} has an empty search text")
+        # Models write \n; keep a CRLF file's line endings
+        if search not in content and "\r\n" in content:
+            search, replace = search.replace("\n", "\r\n"), replace.replace("\n", "\r\n")
+        count = content.count(search)
+        if count == 0:
+            raise EditError(f"edit {number}: search text not found; copy it exactly from the current file")
+        if count > 1:
+            raise EditError(f"edit {number}: search text matches {count} places; include more surrounding lines to make it unique")
+        content = content.replace(search, replace, 1)
+    return content
+
+
+class Hunk:
+    """One @@ hunk: the lines it expects (context and removed) and the lines it leaves in their place."""
+    __slots__ = ("old_start", "old", "new", "old_missing_newline", "new_missing_newline")
+
+    def __init__(self, old_start):
+        self.old_start = old_start
+        self.old = []
+        self.new = []
+        self.old_missing_newline = False
+        self.new_missing_newline = False
+
+
+def parse_unified_diff(diff):
+    """
+    Hunks of a single-file unified diff; file headers are optional.
+
+    Raises:
+        EditError: The diff is malformed or changes several files
+    """
+    hunks = []
+    files = 0
+    hunk = None
+    kind = None
+    old_left = new_left = 0  # Lines the current hunk's header says are still to come
+    lines = diff.splitlines()
+    for number, line in enumerate(lines):
+        match = HUNK_HEADER.match(line)
+        if match:
+            hunk = Hunk(int(match.group(1)))
+            hunks.append(hunk)
+            kind = None
+            old_left = int(match.group(2) or 1)
+            new_left = int(match.group(4) or 1)
+            continue
+        # Inside a hunk's line counts, "--- " and "+++ " start removed and added lines, not file headers
+        if not old_left and not new_left:
+            if line.startswith("+++ "):
+                files += 1
+                hunk = None
+                continue
+            if line.startswith("--- ") and number + 1 < len(lines) and lines[number + 1].startswith("+++ "):
+                continue
+        if hunk is None:
+            continue  # Anything before the first hunk
+        if line.startswith("\\"):
+            # "\ No newline at end of file" is about the line before it
+            if kind in (" ", "-"):
+                hunk.old_missing_newline = True
+            if kind in (" ", "+"):
+                hunk.new_missing_newline = True
+            continue
+        kind, text = (line[0], line[1:]) if line else (" ", "")  # Some diffs drop the space of blank context lines
+        if kind not in " -+":
+            raise EditError(f"unexpected line in a diff hunk: {line[:80]!r}")
+        if kind != "+":
+            hunk.old.append(text)
+            old_left = max(old_left - 1, 0)
+        if kind != "-":
+            hunk.new.append(text)
+            new_left = max(new_left - 1, 0)
+    if files > 1:
+        raise EditError("the diff changes more than one file; edit one file per call")
+    if not hunks:
+        raise EditError("the diff has no @@ hunks")
+    return hunks
+
+
+def apply_unified_diff(content, diff):
+    """
+    Apply a unified diff's hunks in order.
+
+    Hunks are placed by their context and removed lines, which must match exactly one place
+    (ignoring trailing whitespace), so wrong line numbers in the header don't matter. A hunk
+    that only adds lines is placed by its line number.
+
+    Raises:
+        EditError: The diff is malformed, or a hunk doesn't match exactly one place
+    """
+    newline = _newline(content)
+    lines = content.split(newline)
+    final_newline = lines[-1] == ""
+    if final_newline:
+        lines.pop()
+    shift = 0  # Lines added minus removed by the hunks so far, for placing pure additions
+    for number, hunk in enumerate(parse_unified_diff(diff), 1):
+        if hunk.old:
+            wanted = [text.rstrip() for text in hunk.old]
+            starts = [
+                i for i in range(len(lines) - len(wanted) + 1)
+                if lines[i].rstrip() == wanted[0] and all(lines[i + j].rstrip() == wanted[j] for j in range(1, len(wanted)))
+            ]
+            if not starts:
+                raise EditError(f"hunk {number} (@@ -{hunk.old_start}): its context and removed lines were not found; copy them exactly from the current file")
+            if len(starts) > 1:
+                raise EditError(f"hunk {number} (@@ -{hunk.old_start}): its context and removed lines match {len(starts)} places; include more context lines")
+            start = starts[0]
+        else:
+            # "@@ -N,0" adds lines after line N of the original file
+            start = max(0, min(hunk.old_start + shift, len(lines)))
+        if start + len(hunk.old) == len(lines):
+            if hunk.new_missing_newline:
+                final_newline = False
+            elif hunk.old_missing_newline:
+                final_newline = True
+        lines[start:start + len(hunk.old)] = hunk.new
+        shift += len(hunk.new) - len(hunk.old)
+    return newline.join(lines) + (newline if final_newline and lines else "")
+
+
+def diff_summary(path, old, new, max_lines):
+    """
+    Summary of a change: +/- line counts and the changed lines as a diff without context.
+
+    Args:
+        path (str): File path to show
+        old (str): Content before the change
+        new (str): Content after the change
+        max_lines (int): Most diff lines to include
+    """
+    diff = list(difflib.unified_diff(old.splitlines(), new.splitlines(), lineterm="", n=0))[2:]
+    added = sum(1 for line in diff if line.startswith("+"))
+    removed = sum(1 for line in diff if line.startswith("-"))
+    hunks = sum(1 for line in diff if line.startswith("@@"))
+    summary = [f'"{path}": {hunks} {"change" if hunks == 1 else "changes"}, +{added} -{removed} lines']
+    summary += [line[:200] for line in diff[:max_lines]]
+    if len(diff) > max_lines:
+        summary.append(f"[...{len(diff) - max_lines} more diff lines]")
+    return "\n".join(summary)
@@ -0,0 +1,147 @@
+"""Bounded, streaming capture of a script's stdout and stderr.
+
+Output is read from the pipes as it is produced. Only the first and last bytes of each stream
+are kept, so memory and tokens stay bounded no matter how much a script prints. A script
+that keeps printing past a hard limit is killed along with everything it started.
+"""
+
+import locale
+import os
+import selectors
+import signal
+import subprocess
+import time
+
+
+class ScriptResult:
+    """Exit status and captured (possibly shortened) output of one script run."""
+    __slots__ = ("returncode", "stdout", "stderr", "output_limit_exceeded")
+
+    def __init__(self, returncode, stdout, stderr, output_limit_exceeded=False):
+        self.returncode = returncode
+        self.stdout = stdout
+        self.stderr = stderr
+        self.output_limit_exceeded = output_limit_exceeded
+
+
+def decode_output(data):
+    """Decode captured output the way subprocess.run(..., text=True) does."""
+    text = data.decode(locale.getpreferredencoding(False), errors="replace")
+    return text.replace("\r\n", "\n").replace("\r", "\n")
+
+
+class BoundedOutput:
+    """Keeps the first and last max_bytes / 2 bytes of a stream and counts what is dropped in between."""
+    def __init__(self, max_bytes):
+        self.head_limit = max_bytes // 2
+        self.tail_limit = max_bytes - self.head_limit
+        self.head = bytearray()
+        self.tail = bytearray()
+        self.total = 0
+
+    def write(self, data):
+        self.total += len(data)
+        room = self.head_limit - len(self.head)
+        if room > 0:
+            self.head += data[:room]
+            data = data[room:]
+        if data:
+            self.tail += data
+            if len(self.tail) > self.tail_limit:
+                del self.tail[:len(self.tail) - self.tail_limit]
+
+    @property
+    def omitted(self):
+        return self.total - len(self.head) - len(self.tail)
+
+    def text(self):
+        """The kept output, with a marker where bytes were omitted."""
+        if not self.omitted:
+            return decode_output(bytes(self.head + self.tail))
+        return f"{decode_output(bytes(self.head))}\n[... {self.omitted} bytes omitted ...]\n{decode_output(bytes(self.tail))}"
+
+
+def kill_group(pid):
+    """Kill the process group led by pid (a script and anything it started)."""
+    try:
+        os.killpg(pid, signal.SIGKILL)
+    except OSError:
+        try:
+            os.kill(pid, signal.SIGKILL)
+        except OSError:
+            pass
+
+
+def capture_output(fds, deadline, max_bytes, kill_after_bytes, kill):
+    """
+    Read each of fds until EOF, keeping a bounded head/tail window of each.
+
+    Args:
+        fds (list): File descriptors to read (stdout and stderr pipes)
+        deadline (float): time.monotonic() value to stop reading at
+        max_bytes (int): Bytes kept per stream
+        kill_after_bytes (int): Total bytes after which kill is called
+        kill: Callable that stops the process writing to fds
+
+    Returns:
+        tuple: (list of BoundedOutput in fds order, True if the deadline passed,
+            True if kill_after_bytes was exceeded)
+    """
+    outputs = {fd: BoundedOutput(max_bytes) for fd in fds}
+    total = 0
+    limit_exceeded = False
+    with selectors.DefaultSelector() as selector:
+        for fd in fds:
+            selector.register(fd, selectors.EVENT_READ)
+        while selector.get_map():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return [outputs[fd] for fd in fds], True, limit_exceeded
+            for key, _ in selector.select(remaining):
+                data = os.read(key.fd, 65536)
+                if not data:
+                    selector.unregister(key.fd)
+                    continue
+                outputs[key.fd].write(data)
+                total += len(data)
+                if total > kill_after_bytes and not limit_exceeded:
+                    limit_exceeded = True
+                    kill()
+    return [outputs[fd] for fd in fds], False, limit_exceeded
+
+
+def run_process(cmd, cwd, timeout, max_bytes, kill_after_bytes):
+    """
+    Run cmd in its own process group, capturing bounded output.
+
+    Returns:
+        ScriptResult
+
+    Raises:
+        subprocess.TimeoutExpired: The process ran longer than timeout
+    """
+    deadline = time.monotonic() + timeout
+    process = subprocess.Popen(
+        cmd,
+        cwd=cwd,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        start_new_session=True,
+    )
+    with process:
+        outputs, timed_out, limit_exceeded = capture_output(
+            [process.stdout.fileno(), process.stderr.fileno()],
+            deadline,
+            max_bytes,
+            kill_after_bytes,
+            lambda: kill_group(process.pid),
+        )
+        try:
+            if timed_out:
+                raise subprocess.TimeoutExpired(cmd, timeout)
+            returncode = process.wait(timeout=max(deadline - time.monotonic(), 0.001))
+        except subprocess.TimeoutExpired:
+            kill_group(process.pid)
+            process.wait()
+            raise subprocess.TimeoutExpired(cmd, timeout)
+    return ScriptResult(returncode, outputs[0].text(), outputs[1].text(), limit_exceeded)
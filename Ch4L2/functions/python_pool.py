@@ -0,0 +1,333 @@
+"""Warm interpreter pool: run Python scripts without starting a new interpreter for each one.
+
+Each working directory gets one zygote (python_zygote.py), started once with the
+interpreter `uv run python` uses there. The zygote forks a fresh child per script, so
+every run starts from the same clean state without paying for uv or interpreter startup.
+
+Compare the per-execution overhead with `uv run` using:
+    python -m functions.python_pool calculator --runs 10
+"""
+
+import argparse
+import atexit
+import collections
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from .config import (
+    PYTHON_LAUNCHER,
+    PYTHON_TIMEOUT_SECONDS,
+    PYTHON_POOL_PRELOAD,
+    PYTHON_POOL_MAX_INTERPRETERS,
+    PYTHON_POOL_START_TIMEOUT_SECONDS,
+    PYTHON_OUTPUT_MAX_BYTES,
+    PYTHON_OUTPUT_KILL_BYTES,
+    PYTHON_POOL_ENABLED,
+)
+from .process_output import ScriptResult, capture_output, kill_group, run_process
+
+ZYGOTE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "python_zygote.py")
+
+
+class Zygote:
+    """A warm interpreter for one working directory that forks a child per script."""
+    def __init__(self, working_directory):
+        self.working_directory = working_directory
+        self.lock = threading.Lock()
+        self.control = None
+        self.process = None
+        self.starts = 0
+        self.startup_seconds = 0.0
+
+    def _start(self):
+        started = time.perf_counter()
+        control, zygote_end = socket.socketpair(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+        with tempfile.TemporaryFile() as errors:
+            try:
+                process = subprocess.Popen(
+                    list(PYTHON_LAUNCHER) + [ZYGOTE_PATH, str(zygote_end.fileno())] + list(PYTHON_POOL_PRELOAD),
+                    cwd=self.working_directory,
+                    stdin=subprocess.DEVNULL,
+                    stdout=subprocess.DEVNULL,
+                    stderr=errors,
+                    pass_fds=(zygote_end.fileno(),),
+                    start_new_session=True,
+                )
+            except Exception:
+                control.close()
+                raise
+            finally:
+                zygote_end.close()
+
+            control.settimeout(PYTHON_POOL_START_TIMEOUT_SECONDS)
+            try:
+                ready = control.recv(16)
+            except socket.timeout:
+                ready = b""
+            if ready != b"ready":
+                control.close()
+                process.kill()
+                process.wait()
+                errors.seek(0)
+                detail = errors.read().decode("utf-8", errors="replace").strip()
+                raise RuntimeError(f"Warm Python interpreter failed to start: {detail or f'exit code {process.returncode}'}")
+
+        control.settimeout(None)
+        self.control = control
+        self.process = process
+        self.starts += 1
+        self.startup_seconds += time.perf_counter() - started
+
+    def ensure_started(self):
+        """Start the zygote if it isn't running (first use, or it died)."""
+        with self.lock:
+            if self.process is None or self.process.poll() is not None:
+                self._close()
+                self._start()
+
+    def fork(self, request, stdout_fd, stderr_fd):
+        """Ask the zygote to run request in a new child; returns the socket its status arrives on."""
+        reply, child_reply = socket.socketpair(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+        message = json.dumps(request).encode("utf-8")
+        try:
+            with self.lock:
+                try:
+                    socket.send_fds(self.control, [message], [child_reply.fileno(), stdout_fd, stderr_fd])
+                except (OSError, AttributeError):
+                    # The zygote went away since ensure_started(); start a new one and retry once
+                    self._close()
+                    self._start()
+                    socket.send_fds(self.control, [message], [child_reply.fileno(), stdout_fd, stderr_fd])
+        except Exception:
+            reply.close()
+            raise
+        finally:
+            child_reply.close()
+        return reply
+
+    def _close(self):
+        if self.control is not None:
+            self.control.close()
+            self.control = None
+        if self.process is not None:
+            try:
+                self.process.wait(timeout=1)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+            self.process = None
+
+    def close(self):
+        """Stop the zygote; closing the control socket makes it exit."""
+        with self.lock:
+            self._close()
+
+
+class PythonPool:
+    """Warm interpreters keyed by working directory, plus execution statistics."""
+    def __init__(self, max_interpreters=PYTHON_POOL_MAX_INTERPRETERS):
+        self.max_interpreters = max_interpreters
+        self.zygotes = collections.OrderedDict()
+        self.lock = threading.Lock()
+        self.executions = 0
+        self.overhead_seconds = 0.0
+        self.starts = 0
+        self.startup_seconds = 0.0
+
+    def zygote(self, working_directory):
+        """The started zygote for working_directory (least recently used ones are stopped)."""
+        working_directory = os.path.abspath(working_directory)
+        stopped = []
+        with self.lock:
+            # Batch sessions run in temporary copies; forget zygotes for deleted directories
+            for directory in [d for d in self.zygotes if not os.path.isdir(d)]:
+                stopped.append(self.zygotes.pop(directory))
+            zygote = self.zygotes.pop(working_directory, None) or Zygote(working_directory)
+            self.zygotes[working_directory] = zygote
+            while len(self.zygotes) > self.max_interpreters:
+                stopped.append(self.zygotes.popitem(last=False)[1])
+        for old in stopped:
+            self._retire(old)
+        zygote.ensure_started()
+        return zygote
+
+    def _retire(self, zygote):
+        zygote.close()
+        with self.lock:
+            self.starts += zygote.starts
+            self.startup_seconds += zygote.startup_seconds
+
+    def run(self, working_directory, file_path, args, timeout=PYTHON_TIMEOUT_SECONDS):
+        """
+        Run file_path with args in a fresh child of the working directory's warm interpreter.
+
+        Args:
+            working_directory (str): Directory to run in (the script's cwd)
+            file_path (str): Script path, relative to working_directory
+            args (list): Command-line arguments for the script
+            timeout (float): Seconds before the script is killed
+
+        Returns:
+            ScriptResult with the exit code and bounded stdout and stderr
+
+        Raises:
+            subprocess.TimeoutExpired: The script ran longer than timeout
+        """
+        cmd = list(PYTHON_LAUNCHER) + [file_path] + args
+        zygote = self.zygote(working_directory)
+
+        started = time.monotonic()
+        deadline = started + timeout
+        stdout_r, stdout_w = os.pipe()
+        stderr_r, stderr_w = os.pipe()
+        try:
+            try:
+                reply = zygote.fork({"file_path": file_path, "args": args}, stdout_w, stderr_w)
+            finally:
+                os.close(stdout_w)
+                os.close(stderr_w)
+
+            with reply:
+                reply.settimeout(timeout)
+                child = reply.recv(4096)
+                if not child:
+                    raise RuntimeError("Warm Python interpreter exited before starting the script")
+                child = json.loads(child)
+                with self.lock:
+                    self.executions += 1
+                    self.overhead_seconds += child["started"] - started
+
+                outputs, timed_out, limit_exceeded = capture_output(
+                    [stdout_r, stderr_r],
+                    deadline,
+                    PYTHON_OUTPUT_MAX_BYTES,
+                    PYTHON_OUTPUT_KILL_BYTES,
+                    lambda: kill_group(child["pid"]),
+                )
+                status = None
+                if not timed_out:
+                    reply.settimeout(max(deadline - time.monotonic(), 0.001))
+                    try:
+                        status = reply.recv(4096)
+                    except socket.timeout:
+                        pass
+                if status is None:
+                    kill_group(child["pid"])
+                    raise subprocess.TimeoutExpired(cmd, timeout)
+                if not status:
+                    raise RuntimeError("Warm Python interpreter exited before reporting the script's exit code")
+        finally:
+            os.close(stdout_r)
+            os.close(stderr_r)
+
+        return ScriptResult(json.loads(status)["returncode"], outputs[0].text(), outputs[1].text(), limit_exceeded)
+
+    def stats(self):
+        """Counts and timings for a verbose summary."""
+        with self.lock:
+            zygotes = list(self.zygotes.values())
+            return {
+                "executions": self.executions,
+                "overhead_seconds": self.overhead_seconds,
+                "starts": self.starts + sum(zygote.starts for zygote in zygotes),
+                "startup_seconds": self.startup_seconds + sum(zygote.startup_seconds for zygote in zygotes),
+            }
+
+    def close(self):
+        """Stop every zygote."""
+        with self.lock:
+            zygotes = list(self.zygotes.values())
+            self.zygotes.clear()
+        for zygote in zygotes:
+            self._retire(zygote)
+
+
+POOL = PythonPool()
+atexit.register(POOL.close)
+
+
+def prewarm(working_directory):
+    """Start working_directory's zygote in the background so the first script doesn't wait."""
+    def start():
+        try:
+            POOL.zygote(working_directory)
+        except Exception:
+            pass  # The first run_python_file call starts it again and reports the error
+    threading.Thread(target=start, daemon=True).start()
+
+
+def run_helper(working_directory, script_path, args, timeout):
+    """
+    Run a standard-library helper script in the working directory's interpreter and return its JSON report.
+
+    The script gets the path to write its report to as its first argument.
+
+    Raises:
+        RuntimeError: The script wrote no report
+        subprocess.TimeoutExpired: The script ran longer than timeout
+    """
+    handle, results_path = tempfile.mkstemp(suffix=".json")
+    os.close(handle)
+    try:
+        args = [results_path] + args
+        if PYTHON_POOL_ENABLED:
+            result = POOL.run(working_directory, script_path, args, timeout=timeout)
+        else:
+            result = run_process(
+                list(PYTHON_LAUNCHER) + [script_path] + args,
+                working_directory,
+                timeout,
+                PYTHON_OUTPUT_MAX_BYTES,
+                PYTHON_OUTPUT_KILL_BYTES,
+            )
+        with open(results_path, 'r', encoding='utf-8') as f:
+            report = f.read()
+        if not report:
+            detail = result.stderr.strip().splitlines()[-1:] or [f"exit code {result.returncode}"]
+            raise RuntimeError(f"{os.path.basename(script_path)} failed: {detail[0]}")
+        return json.loads(report)
+    finally:
+        os.remove(results_path)
+
+
+def benchmark(working_directory, runs):
+    """Print the per-execution overhead of `uv run` against the warm pool, using an empty script."""
+    with tempfile.NamedTemporaryFile("w", suffix=".py", dir=working_directory) as script:
+        script.write("pass\n")
+        script.flush()
+        file_path = os.path.basename(script.name)
+
+        cold = []
+        for _ in range(runs):
+            started = time.perf_counter()
+            subprocess.run(list(PYTHON_LAUNCHER) + [file_path], cwd=working_directory, capture_output=True, timeout=PYTHON_TIMEOUT_SECONDS)
+            cold.append(time.perf_counter() - started)
+
+        startup = time.perf_counter()
+        POOL.zygote(working_directory)
+        startup = time.perf_counter() - startup
+        warm = []
+        for _ in range(runs):
+            started = time.perf_counter()
+            POOL.run(working_directory, file_path, [])
+            warm.append(time.perf_counter() - started)
+
+    print(f"{' '.join(PYTHON_LAUNCHER)}: {sum(cold) / runs * 1000:.1f} ms per execution (min {min(cold) * 1000:.1f} ms)")
+    print(f"warm pool: {sum(warm) / runs * 1000:.1f} ms per execution (min {min(warm) * 1000:.1f} ms), one-time interpreter start: {startup * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare per-execution overhead of uv run and the warm interpreter pool")
+    parser.add_argument("working_directory", nargs="?", default="calculator", help="Directory to run the empty script in")
+    parser.add_argument("--runs", type=int, default=10, help="Executions to time on each path")
+    benchmark_args = parser.parse_args()
+    try:
+        benchmark(benchmark_args.working_directory, benchmark_args.runs)
+    except Exception as e:
+        print(f"Error: {e}")
+        sys.exit(1)
@@ -0,0 +1,150 @@
+"""Zygote process for the warm Python interpreter pool (see python_pool.py).
+
+Started once per working directory with the interpreter `uv run python` uses there. It
+imports commonly used modules up front, then forks a fresh child for every script the
+agent runs, so a run skips environment resolution and interpreter startup.
+
+Only the standard library is imported: this file runs inside the project's environment.
+Run as: python python_zygote.py <control socket fd> [module to preload ...]
+"""
+
+import atexit
+import builtins
+import importlib
+import importlib.machinery
+import json
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+import traceback
+import types
+
+
+def exit_code(error):
+    """Exit status for a SystemExit, computed the way the interpreter does."""
+    code = error.code
+    if code is None:
+        return 0
+    if isinstance(code, int):
+        return code
+    print(code, file=sys.stderr)
+    return 1
+
+
+def shut_down(code):
+    """
+    Wait for the script's non-daemon threads, then run its atexit handlers, as interpreter shutdown does.
+
+    Returns:
+        int: The exit status, 1 if an atexit handler's exception escaped
+    """
+    try:
+        threading._shutdown()
+    except BaseException:
+        traceback.print_exc()
+    try:
+        atexit._run_exitfuncs()
+    except BaseException:
+        traceback.print_exc()
+        code = 1
+    return code
+
+
+def run_script(request):
+    """Run the requested script as __main__ in this forked process. Never returns."""
+    code = 1
+    try:
+        script = os.path.abspath(request["file_path"])
+        sys.argv = [request["file_path"]] + request["args"]
+        sys.path[0] = os.path.dirname(script)
+        importlib.invalidate_caches()
+
+        # A fresh __main__ module, set up the way `python script.py` sets it up
+        main = types.ModuleType("__main__")
+        main.__file__ = script
+        main.__cached__ = None
+        main.__loader__ = importlib.machinery.SourceFileLoader("__main__", script)
+        main.__builtins__ = builtins
+        sys.modules["__main__"] = main
+        try:
+            with open(script, 'rb') as f:
+                source = f.read()
+            exec(compile(source, script, "exec"), main.__dict__)
+            code = 0
+        except SystemExit as e:
+            code = exit_code(e)
+        except BaseException as e:
+            # Start the traceback at the script's own frames, as `python script.py` would
+            tb = e.__traceback__
+            while tb is not None and tb.tb_frame.f_code.co_filename != script:
+                tb = tb.tb_next
+            traceback.print_exception(type(e), e, tb or e.__traceback__)
+        code = shut_down(code)
+        for stream in (sys.stdout, sys.stderr):
+            try:
+                stream.flush()
+            except Exception:
+                pass
+    finally:
+        os._exit(code & 0xFF)
+
+
+def supervise(request, reply, stdout_fd, stderr_fd):
+    """
+    Fork the child that runs the script, then report its pid and exit status. Never returns.
+
+    The child gets its own session (process group) so the agent can kill everything
+    the script started in one go.
+    """
+    try:
+        signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+        pid = os.fork()
+        if pid == 0:
+            os.setsid()
+            reply.close()
+            devnull = os.open(os.devnull, os.O_RDONLY)
+            os.dup2(devnull, 0)
+            os.dup2(stdout_fd, 1)
+            os.dup2(stderr_fd, 2)
+            for fd in (devnull, stdout_fd, stderr_fd):
+                os.close(fd)
+            run_script(request)
+        os.close(stdout_fd)
+        os.close(stderr_fd)
+        reply.send(json.dumps({"pid": pid, "started": time.monotonic()}).encode("utf-8"))
+        _, status = os.waitpid(pid, 0)
+        reply.send(json.dumps({"returncode": os.waitstatus_to_exitcode(status)}).encode("utf-8"))
+    finally:
+        os._exit(0)
+
+
+def main():
+    control = socket.socket(fileno=int(sys.argv[1]))
+    for name in sys.argv[2:]:
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            pass
+
+    # Supervisors are reaped automatically; each one waits for its own script child
+    signal.signal(signal.SIGCHLD, signal.SIG_IGN)
+    control.send(b"ready")
+
+    while True:
+        message, fds, _, _ = socket.recv_fds(control, 65536, 3)
+        if not message:
+            return  # The agent closed its end of the control socket
+        if len(fds) == 3:
+            pid = os.fork()
+            if pid == 0:
+                control.close()
+                supervise(json.loads(message), socket.socket(fileno=fds[0]), fds[1], fds[2])
+        for fd in fds:
+            os.close(fd)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""Memory-mapped, ranged file reads: only the requested window of a file is decoded.
+
+Line counts and a sparse line -> byte offset table are built in one pass over the mapped
+file and cached by path, mtime and size, so paging through a large file by line number
+only touches the pages it returns.
+"""
+
+import bisect
+import codecs
+import mmap
+import os
+import threading
+
+# Bytes scanned per step when counting lines; one checkpoint is kept per chunk
+CHUNK_BYTES = 1024 * 1024
+
+# Most files whose line tables are cached at once
+MAX_CACHED_INDEXES = 64
+
+
+class LineIndex:
+    """Line count of one version of a file, plus the line number each chunk starts at."""
+    __slots__ = ("size", "line_count", "chunk_lines")
+
+    def __init__(self, size, line_count, chunk_lines):
+        self.size = size
+        self.line_count = line_count
+        self.chunk_lines = chunk_lines
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def _build_index(mapped, size):
+    chunk_lines = []
+    newlines = 0
+    for start in range(0, size, CHUNK_BYTES):
+        chunk_lines.append(newlines)
+        newlines += mapped[start:start + CHUNK_BYTES].count(b"\n")
+    # A last line without a trailing newline still counts
+    line_count = newlines + (1 if size and mapped[size - 1:size] != b"\n" else 0)
+    return LineIndex(size, line_count, chunk_lines)
+
+
+def line_index(path, stat, mapped):
+    """The cached LineIndex for path, rebuilt when its mtime or size changed."""
+    key = (path, stat.st_mtime_ns, stat.st_size)
+    with _indexes_lock:
+        index = _indexes.get(key)
+    if index is None:
+        index = _build_index(mapped, stat.st_size)
+        with _indexes_lock:
+            if len(_indexes) >= MAX_CACHED_INDEXES:
+                _indexes.pop(next(iter(_indexes)))
+            _indexes[key] = index
+    return index
+
+
+def line_start(mapped, index, line):
+    """Byte offset where 0-based line starts (index.size past the last line)."""
+    if line <= 0:
+        return 0
+    if line >= index.line_count:
+        return index.size
+    # Newlines before line N = N; find the chunk holding the N-th newline, then split inside it
+    chunk = bisect.bisect_right(index.chunk_lines, line - 1) - 1
+    start = chunk * CHUNK_BYTES
+    remaining = line - index.chunk_lines[chunk]
+    while True:
+        data = mapped[start:start + CHUNK_BYTES]
+        pieces = data.split(b"\n", remaining)
+        if len(pieces) > remaining:
+            return start + len(data) - len(pieces[-1])
+        remaining -= len(pieces) - 1
+        start += len(data)
+
+
+def decode_window(mapped, start, end, max_characters, whole_lines=False):
+    """
+    Decode bytes [start, end) incrementally, stopping after max_characters.
+
+    Characters split by the window edges are dropped rather than decoded as garbage.
+
+    Returns:
+        tuple: (text, byte offset just past the decoded text)
+    """
+    # Don't start in the middle of a multi-byte UTF-8 character
+    while start < end and mapped[start] & 0xC0 == 0x80:
+        start += 1
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    parts = []
+    characters = 0
+    position = start
+    step = 64 * 1024
+    while position < end and characters < max_characters:
+        data = mapped[position:min(position + step, end)]
+        text = decoder.decode(data, final=position + len(data) == mapped.size() and end == mapped.size())
+        position += len(data)
+        parts.append(text)
+        characters += len(text)
+    text = "".join(parts)
+    pending = len(decoder.getstate()[0])
+    if len(text) <= max_characters:
+        return text, position - pending
+    text = text[:max_characters]
+    if whole_lines and "\n" in text:
+        text = text[:text.rindex("\n") + 1]
+    return text, start + len(text.encode("utf-8"))
+
+
+def read_lines(path, offset, limit, max_characters):
+    """
+    Read limit lines starting at 1-based line offset.
+
+    A line longer than max_characters is cut; the byte offset where it was cut is returned so
+    the rest can be read by byte range.
+
+    Returns:
+        tuple: (text, first line, last line returned, total lines, file size,
+            byte offset where the last line returned was cut or None if it is whole)
+    """
+    first = max(offset, 1)
+    stat = os.stat(path)
+    if stat.st_size == 0:
+        return "", first, first - 1, 0, 0, None
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        index = line_index(path, stat, mapped)
+        if first > index.line_count:
+            return "", first, first - 1, index.line_count, index.size, None
+        last = index.line_count if limit is None else min(first + limit - 1, index.line_count)
+        start = line_start(mapped, index, first - 1)
+        end = line_start(mapped, index, last)
+        text, stop = decode_window(mapped, start, end, max_characters, whole_lines=True)
+        returned_last = first - 1 + text.count("\n") + (0 if text.endswith("\n") or not text else 1)
+        # Text stopping short of the window without a newline ends inside a line
+        cut = stop if stop < end and not text.endswith("\n") else None
+        return text, first, min(returned_last, last), index.line_count, index.size, cut
+
+
+def read_bytes(path, byte_offset, byte_limit, max_characters):
+    """
+    Read up to byte_limit bytes starting at byte_offset.
+
+    Returns:
+        tuple: (text, first byte, byte offset past the text, total lines, file size)
+    """
+    stat = os.stat(path)
+    if stat.st_size == 0:
+        return "", 0, 0, 0, 0
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        index = line_index(path, stat, mapped)
+        start = min(max(byte_offset, 0), index.size)
+        end = index.size if byte_limit is None else min(start + byte_limit, index.size)
+        text, stop = decode_window(mapped, start, end, max_characters)
+        return text, start, stop, index.line_count, index.size
+
+
+def file_totals(path):
+    """(total lines, size in bytes) of path, using the cached line table."""
+    stat = os.stat(path)
+    if stat.st_size == 0:
+        return 0, 0
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        index = line_index(path, stat, mapped)
+        return index.line_count, index.size
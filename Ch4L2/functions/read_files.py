@@ -0,0 +1,153 @@
+"""Function to read several files in one call, sharing a character budget between them."""
+
+import concurrent.futures
+import os
+from .config import READ_FILES_MAX_CHARACTERS, READ_FILES_MAX_FILES, READ_FILES_MAX_WORKERS
+from .file_index import FILE_INDEX, visible_files, contained_files, resolves_inside
+from .get_files_info import glob_matches
+from .ranged_read import file_totals
+from .registry import tool
+from .run_cache import SKIPPED_DIRECTORIES
+from .search_index import BINARY_SNIFF_BYTES
+
+
+def share_budget(lengths, budget):
+    """
+    Split budget characters between texts of the given lengths.
+
+    Texts shorter than an equal share get all they need, and what they leave over is shared
+    equally by the longer ones, so one large file can't crowd the small ones out.
+
+    Returns:
+        list: Characters allowed for each text, in the order of lengths
+    """
+    shares = [0] * len(lengths)
+    remaining = budget
+    order = sorted(range(len(lengths)), key=lambda i: lengths[i])
+    for position, i in enumerate(order):
+        share = remaining // (len(order) - position)
+        shares[i] = min(lengths[i], share)
+        remaining -= shares[i]
+    return shares
+
+
+def _read(path, budget):
+    """Up to budget + 1 characters of a text file, or None for a binary file."""
+    with open(path, 'rb') as f:
+        if b"\0" in f.read(BINARY_SNIFF_BYTES):
+            return None
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        return f.read(budget + 1)
+
+
+def _cut(text, share):
+    """text shortened to share characters, at the end of a line when that keeps at least half of it."""
+    cut = text[:share]
+    line_end = cut.rfind("\n")
+    if line_end >= share // 2:
+        cut = cut[:line_end + 1]
+    return cut
+
+
+@tool(
+    description="Read several files in one call. Takes paths and glob patterns (e.g. [\"main.py\", \"pkg/*.py\"]); a directory reads the files in it. The files share one character budget: small files are shown whole, and only the largest ones are cut short.",
+    parameters={
+        "paths": "Files, directories or glob patterns to read, relative to the working directory. Patterns containing / match the relative path, others the file name anywhere in the tree.",
+        "max_characters": f"Optional total characters of file content to return (default and maximum {READ_FILES_MAX_CHARACTERS}).",
+    },
+    read_only=True,
+)
+def read_files(working_directory, paths: list[str], max_characters: int | None = None):
+    """
+    Read files within a restricted working directory, sharing a character budget.
+
+    Args:
+        working_directory (str): The base directory that limits file access
+        paths (list): Relative file paths, directories or glob patterns
+        max_characters (int): Total characters of content to return
+
+    Returns:
+        str: Each file's content under a header line, or an error message
+    """
+    try:
+        abs_working_dir = os.path.abspath(working_directory)
+        real_working_dir = os.path.realpath(working_directory)
+        if not paths:
+            return 'Error: paths must list at least one file, directory or glob pattern'
+        budget = READ_FILES_MAX_CHARACTERS if max_characters is None else min(max_characters, READ_FILES_MAX_CHARACTERS)
+        if budget < 1:
+            return 'Error: max_characters must be at least 1'
+
+        # Expand patterns and directories to the files they cover, in the order given
+        files = []
+        seen = set()
+        notes = []
+        visible = None
+        for path in paths:
+            abs_path = os.path.abspath(os.path.join(working_directory, path))
+            inside = abs_path.startswith(abs_working_dir + os.sep) or abs_path == abs_working_dir
+            # Symlinks are resolved too, so that none leads out of the working directory
+            if not inside or not resolves_inside(real_working_dir, abs_path):
+                notes.append(f'[Error: Cannot read "{path}" as it is outside the permitted working directory]')
+                continue
+            relative_path = os.path.relpath(abs_path, abs_working_dir).replace(os.sep, "/")
+            if os.path.isfile(abs_path):
+                matches = [relative_path]
+            else:
+                if visible is None:
+                    visible = sorted(
+                        file_path
+                        for file_path, _ in contained_files(abs_working_dir, visible_files(FILE_INDEX.tree(abs_working_dir), SKIPPED_DIRECTORIES))
+                    )
+                if os.path.isdir(abs_path):
+                    prefix = "" if relative_path == "." else relative_path + "/"
+                    matches = [file_path for file_path in visible if file_path.startswith(prefix)]
+                elif any(c in path for c in "*?["):
+                    pattern = path.replace(os.sep, "/").removeprefix("./")
+                    matches = [file_path for file_path in visible if glob_matches([pattern], file_path)]
+                else:
+                    notes.append(f'[Error: File not found: "{path}"]')
+                    continue
+                if not matches:
+                    notes.append(f'[No files match "{path}"]')
+            files.extend(match for match in matches if match not in seen)
+            seen.update(matches)
+        if len(files) > READ_FILES_MAX_FILES:
+            notes.append(f"[...{len(files) - READ_FILES_MAX_FILES} more files not read; at most {READ_FILES_MAX_FILES} are read per call. Use narrower patterns]")
+            files = files[:READ_FILES_MAX_FILES]
+
+        def read(file_path):
+            try:
+                return _read(os.path.join(abs_working_dir, file_path), budget)
+            except OSError as e:
+                return e
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=READ_FILES_MAX_WORKERS) as executor:
+            contents = list(executor.map(read, files))
+
+        texts = [content if isinstance(content, str) else "" for content in contents]
+        shares = share_budget([len(text) for text in texts], budget)
+
+        sections = []
+        for file_path, content, share in zip(files, contents, shares):
+            if isinstance(content, OSError):
+                sections.append(f'[Error: "{file_path}": {content.strerror or content}]')
+            elif content is None:
+                sections.append(f'[File "{file_path}": binary, {os.path.getsize(os.path.join(abs_working_dir, file_path))} bytes; not shown]')
+            elif share >= len(content):
+                lines = content.count("\n") + (1 if content and not content.endswith("\n") else 0)
+                sections.append(f'[File "{file_path}": {lines} {"line" if lines == 1 else "lines"}]\n{content}')
+            else:
+                shown = _cut(content, share)
+                total_lines, size = file_totals(os.path.join(abs_working_dir, file_path))
+                last = shown.count("\n")
+                if shown.endswith("\n"):
+                    footer = f'[...truncated; continue with get_file_content offset={last + 1}]'
+                else:
+                    last += 1
+                    footer = f'[...truncated mid-line; continue with get_file_content offset={last}]'
+                sections.append(f'[File "{file_path}": lines 1-{last} of {total_lines} ({size} bytes)]\n{shown}{footer}')
+        return "\n".join(sections + notes)
+
+    except Exception as e:
+        return f"Error: {str(e)}"
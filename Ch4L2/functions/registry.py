@@ -0,0 +1,126 @@
+"""Declarative registry of the functions the agent can call."""
+
+import inspect
+import threading
+import time
+import types
+import typing
+
+# Arguments supplied by the dispatcher rather than the model; left out of schemas
+INJECTED_ARGUMENTS = {"working_directory"}
+
+_JSON_TYPES = {str: "string", int: "integer", float: "number", bool: "boolean", dict: "object"}
+
+
+def _json_type(annotation):
+    """Translate a type annotation into a JSON schema fragment."""
+    origin = typing.get_origin(annotation)
+    if origin in (typing.Union, types.UnionType):
+        # Optional[X] / X | None: the schema describes X
+        annotation = next(arg for arg in typing.get_args(annotation) if arg is not type(None))
+        origin = typing.get_origin(annotation)
+    if annotation is list or origin is list:
+        item_args = typing.get_args(annotation)
+        schema = {"type": "array"}
+        if item_args:
+            schema["items"] = _json_type(item_args[0])
+        return schema
+    if typing.is_typeddict(annotation):
+        # Objects with named fields, e.g. one search/replace block
+        fields = typing.get_type_hints(annotation)
+        return {
+            "type": "object",
+            "properties": {name: _json_type(field) for name, field in fields.items()},
+            "required": [name for name in fields if name in annotation.__required_keys__],
+        }
+    if annotation in _JSON_TYPES:
+        return {"type": _JSON_TYPES[annotation]}
+    raise TypeError(f"No JSON schema type for annotation {annotation!r}")
+
+
+class Tool:
+    """A registered function, its generated schema, and its call statistics."""
+    __slots__ = ("name", "function", "schema", "read_only", "calls", "seconds", "_lock")
+
+    def __init__(self, name, function, schema, read_only):
+        self.name = name
+        self.function = function
+        self.schema = schema
+        self.read_only = read_only
+        self.calls = 0
+        self.seconds = 0.0
+        self._lock = threading.Lock()
+
+    def __call__(self, **kwargs):
+        started = time.perf_counter()
+        try:
+            return self.function(**kwargs)
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self.calls += 1
+                self.seconds += elapsed
+
+
+# name -> Tool, in registration order (which is also the order schemas are offered in)
+TOOLS = {}
+
+
+def build_schema(function, description, parameters):
+    """
+    Generate the Groq function schema for function from its signature.
+
+    Types come from the annotations, "required" from the parameters without defaults,
+    and each parameter's description from the parameters mapping.
+    """
+    hints = typing.get_type_hints(function)
+    properties = {}
+    required = []
+    for name, parameter in inspect.signature(function).parameters.items():
+        if name in INJECTED_ARGUMENTS:
+            continue
+        properties[name] = dict(_json_type(hints[name]), description=parameters[name])
+        if parameter.default is inspect.Parameter.empty:
+            required.append(name)
+
+    schema_parameters = {"type": "object", "properties": properties}
+    if required:
+        schema_parameters["required"] = required
+    return {
+        "type": "function",
+        "function": {
+            "name": function.__name__,
+            "description": description,
+            "parameters": schema_parameters,
+        },
+    }
+
+
+def tool(description, parameters=None, read_only=False):
+    """
+    Register the decorated function as a tool the model can call.
+
+    Args:
+        description (str): What the tool does, as shown to the model
+        parameters (dict): Description of each model-supplied parameter
+        read_only (bool): True if the tool never changes the working directory,
+            so it can run concurrently with other read-only calls
+
+    Returns:
+        The undecorated function, so it can still be called directly
+    """
+    def register(function):
+        schema = build_schema(function, description, parameters or {})
+        TOOLS[function.__name__] = Tool(function.__name__, function, schema, read_only)
+        return function
+    return register
+
+
+def tool_schemas():
+    """Schemas of every registered tool, in registration order."""
+    return [registered.schema for registered in TOOLS.values()]
+
+
+def read_only_tools():
+    """Names of the registered tools that never modify the working directory."""
+    return {name for name, registered in TOOLS.items() if registered.read_only}
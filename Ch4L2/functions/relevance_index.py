@@ -0,0 +1,461 @@
+"""Persistent BM25 index of code chunks, to pick the snippets of a working directory that a prompt is most likely about.
+
+Files are cut into chunks (a Python file into its functions, methods and class headers, any
+other text file into windows of lines), and each chunk into terms: identifiers split at
+underscores and case changes, lowercased and lightly stemmed, with the file's path and the
+definition's name counted in too. A prompt is split the same way and the chunks are ranked by
+Okapi BM25, so rare words the prompt shares with a chunk weigh most.
+
+Terms are stored in SQLite and only recomputed for files whose stat data changed; a query
+reads the postings of its own terms only.
+"""
+
+import functools
+import heapq
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+from .config import (
+    RELEVANCE_INDEX_PATH, RELEVANCE_INDEX_MAX_FILE_BYTES, RELEVANCE_CHUNK_LINES, RELEVANCE_TOP_K,
+    RELEVANCE_MAX_SNIPPETS_PER_FILE, RELEVANCE_SNIPPET_LINES, RELEVANCE_MAX_CHARACTERS,
+)
+from .file_index import FILE_INDEX, visible_files, contained_files
+from .get_code_outline import cached_outlines
+from .run_cache import SKIPPED_DIRECTORIES
+from .search_index import BINARY_SNIFF_BYTES
+
+# BM25 term frequency saturation and length normalization
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Times a definition's name counts, on top of its occurrences in the chunk
+NAME_WEIGHT = 3
+
+# Most distinct terms of a prompt that are looked up
+MAX_QUERY_TERMS = 64
+
+# Most values bound to one SQLite statement
+SQL_BATCH = 500
+
+RELEVANCE_HEADER = "Code that may be relevant to the request (ranked by shared keywords, so check it before relying on it):"
+
+IDENTIFIER = re.compile(r"[A-Za-z_][A-Za-z0-9_]*|[0-9]+")
+WORD = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|[0-9]+")
+
+STOPWORDS = frozenset("""
+    a an and are as at be but by can do does for from has have how i if in into is it its me my
+    no not of on or our so than that the their them then there these this those to was we were
+    what when where which while who why will with would you your self cls
+""".split())
+
+
+def stem(word):
+    """word without a plural or -ed/-ing ending, so "evaluates" and "evaluated" meet at "evaluat"."""
+    if word.endswith("sses"):
+        return word[:-2]
+    if word.endswith("ies") and len(word) > 4:
+        return word[:-3] + "y"
+    for suffix in ("ing", "ed"):
+        if word.endswith(suffix) and len(word) - len(suffix) >= 4:
+            word = word[:-len(suffix)]
+            break
+    else:
+        if word.endswith("s") and not word.endswith(("ss", "us", "is")) and len(word) > 3:
+            word = word[:-1]
+    if word.endswith("e") and len(word) > 4:
+        word = word[:-1]
+    return word
+
+
+@functools.lru_cache(maxsize=1 << 16)
+def _identifier_terms(identifier):
+    parts = [part.lower() for piece in identifier.split("_") for part in WORD.findall(piece)]
+    result = [identifier.lower().strip("_")] if len(parts) > 1 else []
+    result.extend(stem(part) for part in parts if len(part) > 1 and part not in STOPWORDS)
+    return result
+
+
+def terms(text):
+    """
+    Index terms of text: the parts of each identifier (split at underscores and case changes),
+    plus the whole identifier when it has several parts.
+    """
+    result = []
+    for identifier in IDENTIFIER.findall(text):
+        result.extend(_identifier_terms(identifier))
+    return result
+
+
+def chunk_ranges(line_count, entries=()):
+    """
+    Line ranges to index separately, as (first line, last line, definition name or None).
+
+    A Python file is cut into its functions and methods, and its classes down to their first
+    method (entries of its outline); lines outside those (imports, module code) go into
+    windows, as does any other file.
+    """
+    ranges = []
+    covered = [False] * (line_count + 1)
+    for number, (depth, _, first, last, _, definition, name) in enumerate(entries):
+        if definition.startswith("class ") and number + 1 < len(entries):
+            # A class's own chunk ends where its first method or nested class starts
+            inner = entries[number + 1]
+            if inner[0] > depth and inner[2] <= last:
+                last = inner[2] - 1
+        last = min(last, line_count)
+        ranges.append((first, last, name))
+        for line in range(first, last + 1):
+            covered[line] = True
+
+    start = None
+    for line in range(1, line_count + 1):
+        if covered[line]:
+            if start is not None:
+                ranges.append((start, line - 1, None))
+                start = None
+            continue
+        if start is None:
+            start = line
+        if line - start + 1 == RELEVANCE_CHUNK_LINES:
+            ranges.append((start, line, None))
+            start = None
+    if start is not None:
+        ranges.append((start, line_count, None))
+    return sorted(ranges)
+
+
+def file_chunks(path, relative_path, size, entries=()):
+    """
+    (first line, last line, {term: count}, term total) of each chunk of a file; none for a binary or large file.
+
+    Args:
+        path (str): Absolute path of the file
+        relative_path (str): Its path in the working directory, whose terms every chunk gets
+        size (int): Its size in bytes
+        entries (list): Entries of its outline, for a Python file
+    """
+    if size > RELEVANCE_INDEX_MAX_FILE_BYTES:
+        return []
+    with open(path, 'rb') as f:
+        data = f.read()
+    if b"\0" in data[:BINARY_SNIFF_BYTES]:
+        return []
+    lines = data.decode("utf-8", errors="replace").split("\n")
+    if lines[-1] == "":
+        lines.pop()
+    path_terms = terms(relative_path)
+    chunks = []
+    for first, last, name in chunk_ranges(len(lines), entries):
+        chunk_terms = terms("\n".join(lines[first - 1:last]))
+        if not chunk_terms:
+            continue
+        chunk_terms += path_terms
+        if name:
+            chunk_terms += terms(name) * NAME_WEIGHT
+        counts = {}
+        for term in chunk_terms:
+            counts[term] = counts.get(term, 0) + 1
+        chunks.append((first, last, counts, len(chunk_terms)))
+    return chunks
+
+
+class Snippet:
+    """A ranked chunk of a file."""
+    __slots__ = ("path", "first", "last", "score")
+
+    def __init__(self, path, first, last, score):
+        self.path = path
+        self.first = first
+        self.last = last
+        self.score = score
+
+
+class RelevanceIndex:
+    """Chunks and term postings of the files in working directories, persisted in SQLite."""
+    def __init__(self, path=RELEVANCE_INDEX_PATH):
+        self.path = path
+        self.connection = None
+        self.roots = {}  # working directory -> {relative path: ((mtime_ns, size, inode), indexed_at)}
+        self.lock = threading.Lock()
+        self.updated = 0
+        self.swept = False  # Whether the stored roots were checked for ones that are gone
+
+    def _connect(self):
+        if self.connection is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self.connection = sqlite3.connect(self.path, check_same_thread=False)
+            # Terms are stored once and referred to by id, which keeps the postings small
+            self.connection.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS files (
+                    root TEXT NOT NULL,
+                    path TEXT NOT NULL,
+                    mtime_ns INTEGER NOT NULL,
+                    size INTEGER NOT NULL,
+                    inode INTEGER NOT NULL,
+                    indexed_at INTEGER NOT NULL,
+                    PRIMARY KEY (root, path)
+                );
+                CREATE TABLE IF NOT EXISTS chunks (
+                    id INTEGER PRIMARY KEY,
+                    root TEXT NOT NULL,
+                    path TEXT NOT NULL,
+                    first INTEGER NOT NULL,
+                    last INTEGER NOT NULL,
+                    length INTEGER NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS chunks_by_path ON chunks (root, path);
+                CREATE TABLE IF NOT EXISTS terms (
+                    id INTEGER PRIMARY KEY,
+                    term TEXT NOT NULL UNIQUE
+                );
+                CREATE TABLE IF NOT EXISTS postings (
+                    term INTEGER NOT NULL,
+                    chunk INTEGER NOT NULL,
+                    count INTEGER NOT NULL,
+                    PRIMARY KEY (term, chunk)
+                ) WITHOUT ROWID;
+                CREATE INDEX IF NOT EXISTS postings_by_chunk ON postings (chunk);
+                """
+            )
+            self.connection.commit()
+        return self.connection
+
+    def _load(self, root):
+        indexed = self.roots.get(root)
+        if indexed is None:
+            rows = self._connect().execute(
+                "SELECT path, mtime_ns, size, inode, indexed_at FROM files WHERE root = ?",
+                (root,),
+            )
+            indexed = {path: ((mtime_ns, size, inode), indexed_at) for path, mtime_ns, size, inode, indexed_at in rows}
+            self.roots[root] = indexed
+        return indexed
+
+    def _term_ids(self, connection, words, add=False):
+        """words -> their term ids; with add, words not stored yet are added first."""
+        words = list(words)
+        if add:
+            connection.executemany("INSERT OR IGNORE INTO terms (term) VALUES (?)", [(word,) for word in words])
+        ids = {}
+        for start in range(0, len(words), SQL_BATCH):
+            batch = words[start:start + SQL_BATCH]
+            ids.update(
+                (word, term_id) for term_id, word in connection.execute(
+                    f"SELECT id, term FROM terms WHERE term IN ({', '.join('?' * len(batch))})", batch
+                )
+            )
+        return ids
+
+    def _forget_missing_roots(self, connection):
+        """
+        Drop everything stored for working directories that no longer exist, such as finished batch workspaces.
+
+        The first call checks every stored root; later ones only those loaded since.
+        """
+        if self.swept:
+            roots = list(self.roots)
+        else:
+            roots = [root for (root,) in connection.execute("SELECT DISTINCT root FROM files")]
+            self.swept = True
+        missing = [root for root in roots if not os.path.isdir(root)]
+        if missing:
+            with connection:
+                for root in missing:
+                    connection.execute("DELETE FROM postings WHERE chunk IN (SELECT id FROM chunks WHERE root = ?)", (root,))
+                    connection.execute("DELETE FROM chunks WHERE root = ?", (root,))
+                    connection.execute("DELETE FROM files WHERE root = ?", (root,))
+                    self.roots.pop(root, None)
+
+    def _remove(self, connection, root, path):
+        connection.execute(
+            "DELETE FROM postings WHERE chunk IN (SELECT id FROM chunks WHERE root = ? AND path = ?)",
+            (root, path),
+        )
+        connection.execute("DELETE FROM chunks WHERE root = ? AND path = ?", (root, path))
+        connection.execute("DELETE FROM files WHERE root = ? AND path = ?", (root, path))
+
+    def update(self, root, files):
+        """
+        Bring root's chunks in line with files, reading only new and changed ones.
+
+        Args:
+            root (str): Absolute working directory
+            files (dict): relative path -> IndexEntry of every file under root to index
+
+        Returns:
+            int: Number of files (re)indexed
+        """
+        with self.lock:
+            self._forget_missing_roots(self._connect())
+            indexed = self._load(root)
+            stale = []
+            for path, entry in files.items():
+                key = (entry.mtime_ns, entry.size, entry.inode)
+                stored = indexed.get(path)
+                # As in the trigram index, chunks taken within a second of the file's mtime
+                # may miss a later change that leaves the stat data as it was
+                if stored is not None and stored[0] == key and stored[1] - entry.mtime_ns > 1_000_000_000:
+                    continue
+                stale.append((path, key))
+            removed = [path for path in indexed if path not in files]
+            if not stale and not removed:
+                return 0
+
+            # Python files are parsed in parallel worker processes when there are many
+            outlines = cached_outlines(root, [
+                (path, key[:2]) for path, key in stale
+                if path.endswith(".py") and key[1] <= RELEVANCE_INDEX_MAX_FILE_BYTES
+            ])
+            changed = []
+            for path, key in stale:
+                indexed_at = time.time_ns()
+                try:
+                    chunks = file_chunks(os.path.join(root, path), path, key[1], outlines.get(path, {}).get("entries", ()))
+                except OSError:
+                    continue
+                changed.append((path, key, indexed_at, chunks))
+
+            connection = self._connect()
+            with connection:
+                for path in removed:
+                    self._remove(connection, root, path)
+                    del indexed[path]
+                term_ids = self._term_ids(connection, {term for *_, chunks in changed for _, _, counts, _ in chunks for term in counts}, add=True)
+                for path, key, indexed_at, chunks in changed:
+                    if path in indexed:
+                        self._remove(connection, root, path)
+                    connection.execute("INSERT INTO files VALUES (?, ?, ?, ?, ?, ?)", (root, path, *key, indexed_at))
+                    for first, last, counts, length in chunks:
+                        chunk = connection.execute(
+                            "INSERT INTO chunks (root, path, first, last, length) VALUES (?, ?, ?, ?, ?)",
+                            (root, path, first, last, length),
+                        ).lastrowid
+                        connection.executemany(
+                            "INSERT INTO postings VALUES (?, ?, ?)",
+                            [(term_ids[term], chunk, count) for term, count in counts.items()],
+                        )
+                    indexed[path] = (key, indexed_at)
+            self.updated += len(changed)
+            return len(changed)
+
+    def query(self, root, text, top_k=RELEVANCE_TOP_K, per_file=RELEVANCE_MAX_SNIPPETS_PER_FILE):
+        """
+        The chunks of root that rank highest for text by BM25, best first.
+
+        Args:
+            root (str): Absolute working directory, updated with update() first
+            text (str): The prompt to rank chunks for
+            top_k (int): Most chunks to return
+            per_file (int): Most chunks to return from one file
+
+        Returns:
+            list: Snippet of each chunk, without chunks that share no term with text
+        """
+        query_terms = list(dict.fromkeys(terms(text)))[:MAX_QUERY_TERMS]
+        if not query_terms or top_k < 1:
+            return []
+        with self.lock:
+            connection = self._connect()
+            chunk_count, total_length = connection.execute(
+                "SELECT COUNT(*), SUM(length) FROM chunks WHERE root = ?", (root,)
+            ).fetchone()
+            term_ids = list(self._term_ids(connection, query_terms).values())
+            if not chunk_count or not term_ids:
+                return []
+            postings = connection.execute(
+                f"SELECT postings.term, postings.chunk, postings.count, chunks.length FROM postings"
+                f" JOIN chunks ON chunks.id = postings.chunk"
+                f" WHERE postings.term IN ({', '.join('?' * len(term_ids))}) AND chunks.root = ?",
+                (*term_ids, root),
+            ).fetchall()
+
+            frequencies = {}
+            for term, _, _, _ in postings:
+                frequencies[term] = frequencies.get(term, 0) + 1
+            average_length = total_length / chunk_count
+            scores = {}
+            for term, chunk, count, length in postings:
+                frequency = frequencies[term]
+                weight = math.log(1 + (chunk_count - frequency + 0.5) / (frequency + 0.5))
+                normalized = count * (BM25_K1 + 1) / (count + BM25_K1 * (1 - BM25_B + BM25_B * length / average_length))
+                scores[chunk] = scores.get(chunk, 0.0) + weight * normalized
+
+            # Enough candidates to fill top_k even when the best ones crowd into a few files
+            best = heapq.nlargest(top_k * (per_file + 1) * 4, scores.items(), key=lambda item: item[1])
+            rows = {}
+            for start in range(0, len(best), SQL_BATCH):
+                ids = [chunk for chunk, _ in best[start:start + SQL_BATCH]]
+                rows.update(
+                    (chunk, (path, first, last)) for chunk, path, first, last in connection.execute(
+                        f"SELECT id, path, first, last FROM chunks WHERE id IN ({', '.join('?' * len(ids))})", ids
+                    )
+                )
+
+        snippets = []
+        taken = {}
+        for chunk, score in best:
+            path, first, last = rows[chunk]
+            if taken.get(path, 0) >= per_file:
+                continue
+            taken[path] = taken.get(path, 0) + 1
+            snippets.append(Snippet(path, first, last, score))
+            if len(snippets) == top_k:
+                break
+        return snippets
+
+
+RELEVANCE_INDEX = RelevanceIndex()
+
+
+def format_snippets(root, snippets, max_lines=RELEVANCE_SNIPPET_LINES, max_characters=RELEVANCE_MAX_CHARACTERS):
+    """
+    The snippets' lines under a "path, lines a-b" header each, within max_characters in all.
+
+    Snippets longer than max_lines are cut, and a snippet that no longer fits is left out.
+
+    Returns:
+        list: One section per snippet shown
+    """
+    sections = []
+    characters = len(RELEVANCE_HEADER) + 1
+    for snippet in snippets:
+        try:
+            with open(os.path.join(root, snippet.path), 'r', encoding='utf-8', errors='replace') as f:
+                lines = f.read().split("\n")[snippet.first - 1:snippet.last]
+        except OSError:
+            continue
+        last = snippet.first + min(len(lines), max_lines) - 1
+        body = "\n".join(lines[:max_lines]).rstrip("\n")
+        if last < snippet.last:
+            body += f"\n[...{snippet.last - last} more lines; read them with get_file_content offset={last + 1}]"
+        section = f'[File "{snippet.path}", lines {snippet.first}-{last}]\n{body}'
+        if characters + len(section) + 1 > max_characters:
+            continue
+        characters += len(section) + 1
+        sections.append(section)
+    return sections
+
+
+def relevant_snippets(working_directory, prompt, top_k=RELEVANCE_TOP_K):
+    """
+    The top_k chunks of working_directory that best match prompt, formatted for the system prompt.
+
+    The index is brought up to date first, which only reads files that changed since the last call.
+
+    Returns:
+        tuple: (text, or "" when nothing matches; number of snippets; number of files reindexed)
+    """
+    root = os.path.abspath(working_directory)
+    # Symlinks to files outside the working directory are not indexed, so none of them reach the prompt
+    files = dict(contained_files(root, visible_files(FILE_INDEX.tree(root), SKIPPED_DIRECTORIES)))
+    reindexed = RELEVANCE_INDEX.update(root, files)
+    snippets = RELEVANCE_INDEX.query(root, prompt, top_k)
+    sections = format_snippets(root, snippets)
+    text = "\n".join([RELEVANCE_HEADER] + sections) if sections else ""
+    return text, len(sections), reindexed
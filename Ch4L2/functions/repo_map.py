@@ -0,0 +1,164 @@
+"""Compact map of a working directory (files, sizes and top-level Python definitions) for the system prompt.
+
+With the map in its first request, the model can go straight to the files it needs instead of
+spending its first iterations listing directories. The map is fitted to an estimated-token
+budget by dropping detail, and is cached on disk by the content hash of the tree, so it is
+only rebuilt when a file changed.
+"""
+
+import json
+import os
+import threading
+from .atomic_write import write_atomically
+from .config import REPO_MAP_MAX_TOKENS, REPO_MAP_CACHE_PATH, REPO_MAP_CACHE_MAX_ENTRIES
+from .file_index import FILE_INDEX, visible_files, contained_files
+from .get_code_outline import cached_outlines
+from .run_cache import SKIPPED_DIRECTORIES, tree_hash
+
+# Estimated characters per token, as in the --compact estimates
+CHARACTERS_PER_TOKEN = 4
+
+# Characters of a definition's signature shown in the most detailed map
+SIGNATURE_CHARACTERS = 100
+
+REPO_MAP_HEADER = "Repository map of the working directory (files, sizes in bytes, top-level Python definitions); read the files you need directly:"
+
+_cache_lock = threading.Lock()
+
+
+def _symbols(outline, detail):
+    """Top-level definitions of an outline: full signatures (detail 0) or just names (detail 1)."""
+    symbols = []
+    for depth, _, _, _, _, definition, name in outline.get("entries", []):
+        if depth:
+            continue
+        if detail == 0:
+            symbols.append(definition if len(definition) <= SIGNATURE_CHARACTERS else definition[:SIGNATURE_CHARACTERS - 3] + "...")
+        else:
+            symbols.append(f"{'class' if definition.startswith('class ') else 'def'} {name}")
+    return "; ".join(symbols)
+
+
+def render_map(files, outlines, detail, max_depth=None):
+    """
+    Lines of the map: one per directory and per file, indented by depth.
+
+    Args:
+        files (list): Sorted (relative path, size)
+        outlines (dict): Relative path -> outline of the Python files
+        detail (int): 0 for full signatures, 1 for definition names, 2 for no definitions
+        max_depth (int): Directories at this depth are shown as one line with their file count
+            and total size (0 collapses every top-level directory); None shows every file
+    """
+    collapsed = {}
+    if max_depth is not None:
+        for path, size in files:
+            directories = path.split("/")[:-1]
+            if len(directories) > max_depth:
+                count, total = collapsed.get(tuple(directories[:max_depth + 1]), (0, 0))
+                collapsed[tuple(directories[:max_depth + 1])] = (count + 1, total + size)
+
+    lines = []
+    shown_directories = []
+    for path, size in files:
+        *directories, name = path.split("/")
+        if max_depth is not None and len(directories) > max_depth:
+            key = tuple(directories[:max_depth + 1])
+            if key not in collapsed:
+                continue  # Its directory's line is already there
+            count, total = collapsed.pop(key)
+            *directories, directory = key
+            entry = f"{directory}/ ({count} {'file' if count == 1 else 'files'}, {total})"
+        else:
+            entry = f"{name} {size}"
+            if path in outlines and detail < 2:
+                symbols = _symbols(outlines[path], detail)
+                if symbols:
+                    entry += f": {symbols}"
+        common = 0
+        while common < min(len(directories), len(shown_directories)) and directories[common] == shown_directories[common]:
+            common += 1
+        for depth in range(common, len(directories)):
+            lines.append(f"{'  ' * depth}{directories[depth]}/")
+        shown_directories = directories
+        lines.append(f"{'  ' * len(directories)}{entry}")
+    return lines
+
+
+def _fits(lines, max_characters):
+    return sum(len(line) + 1 for line in lines) <= max_characters
+
+
+def build_repo_map(working_directory, max_tokens):
+    """
+    The map of working_directory in at most max_tokens estimated tokens.
+
+    Detail is dropped until the map fits: signatures become names, then names are left out,
+    then the deepest directories are shown as one line each, and as a last resort the list is
+    cut short. Python files are only parsed when their definitions can fit.
+    """
+    root = os.path.abspath(working_directory)
+    # Symlinks to files outside the working directory are left out, so none of them are parsed
+    entries = sorted(contained_files(root, visible_files(FILE_INDEX.tree(root), SKIPPED_DIRECTORIES)))
+    files = [(path, entry.size) for path, entry in entries]
+    max_characters = max_tokens * CHARACTERS_PER_TOKEN - len(REPO_MAP_HEADER) - 1
+
+    lines = render_map(files, {}, 2)
+    if _fits(lines, max_characters):
+        outlines = cached_outlines(root, [(path, (entry.mtime_ns, entry.size)) for path, entry in entries if path.endswith(".py")])
+        for detail in range(2):
+            detailed = render_map(files, outlines, detail)
+            if _fits(detailed, max_characters):
+                return "\n".join([REPO_MAP_HEADER] + detailed)
+        return "\n".join([REPO_MAP_HEADER] + lines)
+
+    deepest = max((path.count("/") for path, _ in files), default=0)
+    for max_depth in range(deepest - 1, -1, -1):
+        lines = render_map(files, {}, 2, max_depth)
+        if _fits(lines, max_characters):
+            return "\n".join([REPO_MAP_HEADER] + lines)
+    shown = []
+    characters = 0
+    for line in lines:
+        if characters + len(line) + 1 > max_characters - 80:
+            break
+        shown.append(line)
+        characters += len(line) + 1
+    shown.append(f"[...{len(lines) - len(shown)} more entries; list them with get_files_info]")
+    return "\n".join([REPO_MAP_HEADER] + shown)
+
+
+def repo_map(working_directory, max_tokens=REPO_MAP_MAX_TOKENS, cache_path=REPO_MAP_CACHE_PATH):
+    """
+    The map of working_directory, from the cache when no file changed since it was built.
+
+    Returns:
+        tuple: (map text, whether it came from the cache)
+    """
+    root = os.path.abspath(working_directory)
+    key = f"{tree_hash(root)}:{max_tokens}"
+    with _cache_lock:
+        try:
+            with open(cache_path, encoding='utf-8') as f:
+                cache = json.load(f)
+        except (OSError, ValueError):
+            cache = {}
+        cached = cache.get(root)
+        if isinstance(cached, dict) and cached.get("key") == key:
+            if next(reversed(cache)) == root:
+                return cached["map"], True
+            text, from_cache = cached["map"], True
+        else:
+            text, from_cache = build_repo_map(root, max_tokens), False
+        # Only the latest map of each working directory is kept, in order of last use. Maps of
+        # directories that are gone (such as finished batch workspaces) are dropped, and so are
+        # the least recently used ones beyond REPO_MAP_CACHE_MAX_ENTRIES
+        cache.pop(root, None)
+        cache[root] = {"key": key, "map": text}
+        for path in [path for path in cache if not os.path.isdir(path)]:
+            del cache[path]
+        for path in list(cache)[:-REPO_MAP_CACHE_MAX_ENTRIES]:
+            del cache[path]
+        os.makedirs(os.path.dirname(cache_path) or ".", exist_ok=True)
+        write_atomically(cache_path, json.dumps(cache).encode("utf-8"))
+        return text, from_cache
@@ -0,0 +1,127 @@
+"""Functions to roll back the changes the write tools made, from the versions kept in the file history."""
+
+import os
+from .file_history import HISTORY, digest, replace_file, replace_files
+from .registry import tool
+
+
+def _relative_path(working_directory, file_path):
+    """file_path relative to working_directory, as the history records it, or None if it is outside."""
+    abs_working_dir = os.path.abspath(working_directory)
+    abs_path = os.path.abspath(os.path.join(working_directory, file_path))
+    if not abs_path.startswith(abs_working_dir + os.sep):
+        return None
+    return os.path.relpath(abs_path, abs_working_dir).replace(os.sep, "/")
+
+
+def _describe_content(content):
+    return "deleted" if content is None else f"{len(content)} bytes"
+
+
+@tool(
+    description="Undo the most recent change a write tool (write_file, write_files, edit_file, restore_file) made, restoring the previous version from the history. A write_files call is undone as a whole. Call it again to undo the change before that.",
+    parameters={
+        "file_path": "Optional file whose most recent change to undo, relative to the working directory. If not provided, undoes the most recent change to any file.",
+    },
+)
+def undo_change(working_directory, file_path: str | None = None):
+    """
+    Undo the most recent recorded change within the working directory.
+
+    Args:
+        working_directory (str): The permitted working directory
+        file_path (str): Only undo changes to this file
+
+    Returns:
+        str: What was restored, or an error message
+    """
+    try:
+        relative_path = None
+        if file_path is not None:
+            relative_path = _relative_path(working_directory, file_path)
+            if relative_path is None:
+                return f'Error: Cannot undo changes to "{file_path}" as it is outside the permitted working directory'
+
+        journal = HISTORY.journal(working_directory)
+        change = journal.latest(relative_path)
+        if change is None:
+            return f'Error: No changes to "{file_path}" to undo' if file_path is not None else 'Error: No changes to undo'
+
+        # Without a file_path, a change made in a batch (write_files) is undone with the rest of its batch
+        changes = journal.batch(change.batch) if file_path is None and change.batch is not None else [change]
+
+        # Only roll back what those changes wrote; anything since (e.g. a script's output) would be lost
+        for undone in changes:
+            if digest(journal.current(undone.path)) != undone.after:
+                return f'Error: "{undone.path}" was modified after {undone.describe()}, outside the write tools. Use restore_file to see its versions and pick one'
+
+        previous = [journal.blob(undone.before) for undone in changes]
+        undos = replace_files(
+            working_directory,
+            [(os.path.join(journal.root, undone.path), content, undone.id) for undone, content in zip(changes, previous)],
+            "undo_change",
+        )
+        lines = []
+        for undone, content, undo in zip(changes, previous, undos):
+            if content is None:
+                lines.append(f'Undid {undone.describe()}: "{undone.path}" did not exist before, so it was deleted (change {undo.id})')
+            else:
+                lines.append(f'Undid {undone.describe()}: "{undone.path}" is back to its previous version, {len(content)} bytes (change {undo.id})')
+        return "\n".join(lines)
+
+    except Exception as e:
+        return f"Error: {str(e)}"
+
+
+@tool(
+    description="List the recorded versions of a file (every version the write tools replaced or wrote), or restore one of them.",
+    parameters={
+        "file_path": "The file to list or restore, relative to the working directory.",
+        "version": "The version number to restore, from the list. If not provided, lists the versions.",
+    },
+)
+def restore_file(working_directory, file_path: str, version: int | None = None):
+    """
+    List or restore the recorded versions of a file within the working directory.
+
+    Args:
+        working_directory (str): The permitted working directory
+        file_path (str): The file to list or restore
+        version (int): Index of the version to restore
+
+    Returns:
+        str: The version list, what was restored, or an error message
+    """
+    try:
+        relative_path = _relative_path(working_directory, file_path)
+        if relative_path is None:
+            return f'Error: Cannot restore "{file_path}" as it is outside the permitted working directory'
+
+        journal = HISTORY.journal(working_directory)
+        versions = journal.versions(relative_path)
+        if not versions:
+            return f'Error: No recorded versions of "{file_path}"; only files changed by the write tools have a history'
+
+        current_blob = digest(journal.current(relative_path))
+
+        if version is None:
+            lines = [f'Versions of "{file_path}" (restore one with version=N):']
+            for number, (blob, change) in enumerate(versions):
+                source = "before the first recorded change" if change is None else f"after {change.describe()}"
+                size = "did not exist" if blob is None else f"{journal.blob_size(blob)} bytes"
+                marker = " [current]" if blob == current_blob else ""
+                lines.append(f"{number}: {source} - {size}{marker}")
+            return "\n".join(lines)
+
+        if not 0 <= version < len(versions):
+            return f'Error: version must be between 0 and {len(versions) - 1}'
+        blob, _ = versions[version]
+        if blob == current_blob:
+            return f'"{file_path}" is already at version {version}'
+
+        content = journal.blob(blob)
+        change = replace_file(working_directory, os.path.join(journal.root, relative_path), content, "restore_file")
+        return f'Restored "{file_path}" to version {version} ({_describe_content(content)}); undo_change reverts this (change {change.id})'
+
+    except Exception as e:
+        return f"Error: {str(e)}"
@@ -0,0 +1,167 @@
+"""Opt-in cache of run_python_file results.
+
+A result is keyed on the script, its arguments, the interpreter, the project's dependencies
+and a content hash of the working directory. Any file in the working directory can affect a
+run (modules it imports, data it reads), so the whole tree is hashed. That hash is
+incremental: the file index keeps each file's digest until its stat data changes.
+
+The project uv runs the script in may sit above the working directory, and its virtual
+environment is skipped by the tree hash, so its pyproject.toml, uv.lock and installed packages
+are fingerprinted separately.
+"""
+
+import collections
+import glob
+import hashlib
+import json
+import os
+import shutil
+import threading
+from .config import PYTHON_LAUNCHER, PYTHON_RESULT_CACHE_MAX_ENTRIES
+from .file_index import FILE_INDEX
+
+# Directories whose contents never affect a script's result
+SKIPPED_DIRECTORIES = {"__pycache__", ".git", ".agent_cache", ".venv"}
+
+CACHED_RESULT_NOTE = "[Cached result: nothing in the working directory changed since this exact run]"
+
+
+def tree_digests(root):
+    """Content digest of every file under root, keyed by path relative to root."""
+    return FILE_INDEX.tree(root, exact=True).digests(SKIPPED_DIRECTORIES)
+
+
+def tree_hash(root):
+    """Hash of every file's relative path and content under root."""
+    tree = hashlib.blake2b()
+    for relative_path, digest in sorted(tree_digests(root).items()):
+        tree.update(f"{relative_path}\0{digest}\n".encode("utf-8"))
+    return tree.hexdigest()
+
+
+def interpreter_fingerprint():
+    """Identify the interpreter scripts run with (launcher command and executable stat)."""
+    executable = shutil.which(PYTHON_LAUNCHER[0])
+    try:
+        stat = os.stat(executable) if executable else None
+    except OSError:
+        stat = None
+    return [list(PYTHON_LAUNCHER), executable, stat and (stat.st_mtime_ns, stat.st_size)]
+
+
+_file_digests = {}  # path -> ((mtime_ns, size, inode), digest)
+_file_digests_lock = threading.Lock()
+
+
+def file_digest(path):
+    """Content digest of path, recomputed only when its stat data changes; None if it doesn't exist."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    key = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+    with _file_digests_lock:
+        cached = _file_digests.get(path)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+    try:
+        with open(path, 'rb') as f:
+            digest = hashlib.blake2b(f.read()).hexdigest()
+    except OSError:
+        return None
+    with _file_digests_lock:
+        _file_digests[path] = (key, digest)
+    return digest
+
+
+def project_root(working_directory):
+    """The nearest directory at or above working_directory with a pyproject.toml (the project uv runs in), or None."""
+    directory = os.path.abspath(working_directory)
+    while True:
+        if os.path.isfile(os.path.join(directory, "pyproject.toml")):
+            return directory
+        parent = os.path.dirname(directory)
+        if parent == directory:
+            return None
+        directory = parent
+
+
+def dependency_fingerprint(working_directory):
+    """
+    Identify the dependencies scripts in working_directory run with.
+
+    Covers the project's pyproject.toml and uv.lock, and its virtual environment: the
+    interpreter it resolves to, its version (pyvenv.cfg) and its site-packages directories,
+    whose mtimes change when packages are installed, upgraded or removed.
+    """
+    root = project_root(working_directory)
+    if root is None:
+        return None
+    venv = os.path.join(root, os.environ.get("UV_PROJECT_ENVIRONMENT", ".venv"))
+    site_packages = sorted(glob.glob(os.path.join(venv, "lib", "python*", "site-packages")))
+    site_packages.append(os.path.join(venv, "Lib", "site-packages"))  # Windows layout
+    packages = []
+    for directory in site_packages:
+        try:
+            packages.append([directory, os.stat(directory).st_mtime_ns])
+        except OSError:
+            pass
+    return [
+        root,
+        file_digest(os.path.join(root, "pyproject.toml")),
+        file_digest(os.path.join(root, "uv.lock")),
+        file_digest(os.path.join(venv, "pyvenv.cfg")),
+        os.path.realpath(os.path.join(venv, "bin", "python")),
+        packages,
+    ]
+
+
+class RunCache:
+    """Results of earlier script runs, least recently used evicted first."""
+    def __init__(self, max_entries=PYTHON_RESULT_CACHE_MAX_ENTRIES):
+        self.enabled = False
+        self.max_entries = max_entries
+        self.results = collections.OrderedDict()  # key -> (working directory, result)
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, working_directory, file_path, args):
+        """Cache key for running file_path with args in working_directory as it is right now."""
+        working_directory = os.path.abspath(working_directory)
+        return hashlib.sha256(json.dumps([
+            working_directory,
+            os.path.normpath(file_path),
+            args,
+            interpreter_fingerprint(),
+            dependency_fingerprint(working_directory),
+            tree_hash(working_directory),
+        ]).encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        """The cached result text for key, or None."""
+        with self.lock:
+            entry = self.results.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.results.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, working_directory, result):
+        with self.lock:
+            self.results[key] = (os.path.abspath(working_directory), result)
+            self.results.move_to_end(key)
+            while len(self.results) > self.max_entries:
+                self.results.popitem(last=False)
+
+    def invalidate(self, working_directory):
+        """Forget every result from working_directory (called after a tool changes a file there)."""
+        working_directory = os.path.abspath(working_directory)
+        with self.lock:
+            for key in [k for k, (directory, _) in self.results.items() if directory == working_directory]:
+                del self.results[key]
+
+
+RUN_CACHE = RunCache()
@@ -1,8 +1,27 @@
-import subprocess
 import os
+from .config import (
+    PYTHON_LAUNCHER,
+    PYTHON_TIMEOUT_SECONDS,
+    PYTHON_OUTPUT_MAX_BYTES,
+    PYTHON_OUTPUT_KILL_BYTES,
+    PYTHON_POOL_ENABLED,
+)
+from .file_index import FILE_INDEX
+from .process_output import run_process
+from .run_cache import RUN_CACHE, CACHED_RESULT_NOTE
+from .python_pool import POOL
+from .registry import tool
 
 
-def run_python_file(working_directory, file_path, args=[]):
+# Not read_only: the script may write files, so it must not run alongside other calls
+@tool(
+    description="Execute a Python file with optional arguments within the working directory.",
+    parameters={
+        "file_path": "The path to the Python file to execute, relative to the working directory.",
+        "args": "Optional list of command-line arguments to pass to the Python file.",
+    },
+)
+def run_python_file(working_directory, file_path: str, args: list[str] | None = None):
     """
     Execute a Python file with specified arguments in a given working directory.
     
@@ -31,17 +50,32 @@ def run_python_file(working_directory, file_path, args=[]):
         if not file_path.endswith('.py'):
             return f'Error: "{file_path}" is not a Python file.'
         
-        # Prepare command (using uv to run Python)
-        cmd = ['uv', 'run', 'python', file_path] + args
+        # Reuse the result of an identical earlier run if nothing it could depend on changed
+        cache_key = None
+        if RUN_CACHE.enabled:
+            cache_key = RUN_CACHE.key(abs_working_dir, file_path, args or [])
+            cached_result = RUN_CACHE.get(cache_key)
+            if cached_result is not None:
+                return f"{CACHED_RESULT_NOTE}\n{cached_result}"
         
-        # Execute the Python file
-        completed_process = subprocess.run(
-            cmd,
-            cwd=abs_working_dir,
-            capture_output=True,
-            text=True,
-            timeout=30
-        )
+        if PYTHON_POOL_ENABLED:
+            # Execute the Python file in a fresh fork of this directory's warm interpreter
+            completed_process = POOL.run(abs_working_dir, file_path, args or [], timeout=PYTHON_TIMEOUT_SECONDS)
+        else:
+            # Prepare command (using uv to run Python)
+            cmd = list(PYTHON_LAUNCHER) + [file_path] + (args or [])
+            
+            # Execute the Python file, streaming its output into bounded buffers
+            completed_process = run_process(
+                cmd,
+                abs_working_dir,
+                PYTHON_TIMEOUT_SECONDS,
+                PYTHON_OUTPUT_MAX_BYTES,
+                PYTHON_OUTPUT_KILL_BYTES,
+            )
+        
+        # The script may have written files anywhere in the working directory
+        FILE_INDEX.changed(abs_working_dir)
         
         # Format output
         output_parts = []
@@ -54,40 +88,20 @@ def run_python_file(working_directory, file_path, args=[]):
         if completed_process.stderr:
             output_parts.append(f"STDERR:\n{completed_process.stderr}")
         
+        # Say why the process was stopped early
+        if completed_process.output_limit_exceeded:
+            output_parts.append(f"Process killed after printing more than {PYTHON_OUTPUT_KILL_BYTES} bytes of output")
+        
         # Add exit code if non-zero
         if completed_process.returncode != 0:
             output_parts.append(f"Process exited with code {completed_process.returncode}")
         
         # Return formatted output or "No output produced" if empty
-        if output_parts:
-            return '\n'.join(output_parts)
-        else:
-            return "No output produced."
+        result = '\n'.join(output_parts) if output_parts else "No output produced."
+        if cache_key is not None:
+            RUN_CACHE.put(cache_key, abs_working_dir, result)
+        return result
             
     except Exception as e:
         return f"Error executing Python file: {e}"
 
-
-# Function schema for Groq API
-schema_run_python_file = {
-    "type": "function",
-    "function": {
-        "name": "run_python_file",
-        "description": "Execute a Python file with optional arguments within the working directory.",
-        "parameters": {
-            "type": "object",
-            "properties": {
-                "file_path": {
-                    "type": "string",
-                    "description": "The path to the Python file to execute, relative to the working directory."
-                },
-                "args": {
-                    "type": "array",
-                    "items": {"type": "string"},
-                    "description": "Optional list of command-line arguments to pass to the Python file."
-                }
-            },
-            "required": ["file_path"]
-        }
-    }
-}
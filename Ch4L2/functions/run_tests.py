@@ -0,0 +1,179 @@
+"""
+Function to run the unittest tests affected by recent changes, sharded across processes.
+"""
+
+import concurrent.futures
+import fnmatch
+import os
+import threading
+import time
+from .config import (
+    TEST_FILE_PATTERNS,
+    TEST_MAX_SHARDS,
+    TEST_TIMEOUT_SECONDS,
+    TEST_MAX_REPORTED_FAILURES,
+)
+from .import_graph import ImportGraph, python_files
+from .python_pool import run_helper
+from .registry import tool
+from .run_cache import tree_digests
+
+TEST_RUNNER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "test_runner.py")
+
+IMPORT_GRAPH = ImportGraph()
+
+# working directory -> {"digests": file digests at the last run, "failed": {test id: test file}}
+_last_runs = {}
+_locks = {}
+_locks_lock = threading.Lock()
+
+
+def _directory_lock(root):
+    with _locks_lock:
+        return _locks.setdefault(root, threading.Lock())
+
+
+def _module_name(relative_path):
+    return os.path.splitext(relative_path)[0].replace(os.sep, ".")
+
+
+def _run_runner(root, mode, names):
+    """Run test_runner.py in the working directory's interpreter and return its JSON report."""
+    return run_helper(root, TEST_RUNNER_PATH, [mode] + names, TEST_TIMEOUT_SECONDS)
+
+
+def _shards(test_ids, count):
+    """Split test_ids into count contiguous, evenly sized shards (tests of a class stay together)."""
+    size, extra = divmod(len(test_ids), count)
+    shards = []
+    start = 0
+    for i in range(count):
+        end = start + size + (1 if i < extra else 0)
+        shards.append(test_ids[start:end])
+        start = end
+    return shards
+
+
+# Not read_only: the tests may write files, so they must not run alongside other calls
+@tool(
+    description="Run the unittest tests affected by changes in the working directory and summarize which passed and failed. A test file is affected when it imports a changed module, directly or indirectly; tests that failed last time are always run again. Tests are run in parallel.",
+    parameters={
+        "changed_files": "Optional list of changed files, relative to the working directory. If not provided, the files changed since the last run_tests call are used (every test on the first call).",
+        "run_all": "Run every test, not only the affected ones.",
+    },
+)
+def run_tests(working_directory, changed_files: list[str] | None = None, run_all: bool = False):
+    """
+    Run the tests affected by changed files in a given working directory.
+
+    Args:
+        working_directory (str): The working directory containing the tests
+        changed_files (list): Changed files; defaults to those changed since the last call
+        run_all (bool): Run every test regardless of what changed
+
+    Returns:
+        str: Compact pass/fail summary or error message
+    """
+    try:
+        root = os.path.abspath(working_directory)
+        started = time.perf_counter()
+
+        with _directory_lock(root):
+            digests = tree_digests(root)
+            last_run = _last_runs.get(root)
+
+            if changed_files is not None:
+                changed = set()
+                for path in changed_files:
+                    abs_path = os.path.abspath(os.path.join(root, path))
+                    if not abs_path.startswith(root + os.sep):
+                        return f'Error: Cannot use "{path}" as it is outside the permitted working directory'
+                    changed.add(os.path.relpath(abs_path, root))
+                since = "listed as changed"
+            elif last_run is not None:
+                changed = {
+                    path for path in digests.keys() | last_run["digests"].keys()
+                    if digests.get(path) != last_run["digests"].get(path)
+                }
+                since = "changed since the last run_tests call"
+            else:
+                changed = None
+
+            all_python_files = python_files(root)
+            test_files = [
+                path for path in all_python_files
+                if any(fnmatch.fnmatch(os.path.basename(path), pattern) for pattern in TEST_FILE_PATTERNS)
+            ]
+            if not test_files:
+                return f"No test files ({', '.join(TEST_FILE_PATTERNS)}) found in the working directory."
+
+            # Anything that isn't an existing Python module (data files, deleted modules) may
+            # affect any test, so it selects them all
+            non_modules = sorted(path for path in changed or () if path not in all_python_files)
+            if run_all:
+                selected_files, reason = test_files, "all tests (run_all)"
+            elif changed is None:
+                selected_files, reason = test_files, "all tests (first run_tests call)"
+            elif non_modules:
+                selected_files, reason = test_files, f"all tests ({', '.join(non_modules[:5])} {since}, not a Python module)"
+            else:
+                dependencies = IMPORT_GRAPH.dependencies(root, test_files)
+                selected_files = [path for path in test_files if dependencies[path] & changed]
+                changed_list = ", ".join(sorted(changed)[:5]) + (", ..." if len(changed) > 5 else "")
+                reason = f"tests importing {changed_list} ({since})" if changed else "no files changed"
+
+            test_ids = []
+            if selected_files:
+                test_ids = _run_runner(root, "list", [_module_name(path) for path in selected_files])["ids"]
+            previously_failed = {
+                test_id: path for test_id, path in (last_run or {"failed": {}})["failed"].items()
+                if path in test_files and test_id not in test_ids
+            }
+            test_ids += list(previously_failed)
+            if previously_failed:
+                reason += f" + {len(previously_failed)} that failed last time"
+
+            if not test_ids:
+                _last_runs[root] = {"digests": digests, "failed": {}}
+                return f"No tests selected: {reason}. {len(test_files)} test files, none affected."
+
+            shard_count = min(TEST_MAX_SHARDS, os.cpu_count() or 1, len(test_ids))
+            with concurrent.futures.ThreadPoolExecutor(max_workers=shard_count) as executor:
+                reports = list(executor.map(lambda shard: _run_runner(root, "run", shard), _shards(test_ids, shard_count)))
+
+            test_files_by_module = {_module_name(path): path for path in test_files}
+            failures = [("FAIL", failure) for report in reports for failure in report["failures"]]
+            failures += [("ERROR", error) for report in reports for error in report["errors"]]
+            failed = {}
+            for _, failure in failures:
+                module = failure["id"]
+                while module and module not in test_files_by_module:
+                    module = module.rpartition(".")[0]
+                if module:
+                    failed[failure["id"]] = test_files_by_module[module]
+            _last_runs[root] = {"digests": digests, "failed": failed}
+
+        run = sum(report["run"] for report in reports)
+        skipped = sum(report["skipped"] for report in reports)
+        failure_count = sum(len(report["failures"]) for report in reports)
+        error_count = sum(len(report["errors"]) for report in reports)
+        unexpected = [test_id for report in reports for test_id in report["unexpected_successes"]]
+
+        lines = [
+            f"Ran {run} tests from {len(set(selected_files) | set(previously_failed.values()))} of {len(test_files)} test files "
+            f"in {shard_count} shards ({time.perf_counter() - started:.2f}s): "
+            f"{run - failure_count - error_count - skipped} passed, {failure_count} failed, {error_count} errors, {skipped} skipped",
+            f"Selected: {reason}",
+        ]
+        for kind, failure in failures[:TEST_MAX_REPORTED_FAILURES]:
+            location = f" ({failure['location']})" if failure["location"] else ""
+            lines.append(f"{kind} {failure['id']}{location}")
+            lines.append(f"    {failure['message']}")
+        if len(failures) > TEST_MAX_REPORTED_FAILURES:
+            lines.append(f"... and {len(failures) - TEST_MAX_REPORTED_FAILURES} more failures")
+        for test_id in unexpected:
+            lines.append(f"UNEXPECTED SUCCESS {test_id}")
+        return '\n'.join(lines)
+
+    except Exception as e:
+        return f"Error running tests: {e}"
@@ -0,0 +1,233 @@
+"""Function to search the files in the working directory for a regular expression or literal text."""
+
+import concurrent.futures
+import mmap
+import os
+import re
+from .config import SEARCH_MAX_RESULTS, SEARCH_SNIPPET_CHARACTERS, SEARCH_MAX_WORKERS, SEARCH_INDEX_MIN_FILES
+from .file_index import FILE_INDEX, visible_files, contained_files, resolves_inside
+from .get_files_info import glob_matches
+from .registry import tool
+from .run_cache import SKIPPED_DIRECTORIES
+from .search_index import TRIGRAM_INDEX, BINARY_SNIFF_BYTES
+
+# Characters that end a run of literal text in a regular expression
+REGEX_SPECIAL = set(".^$*+?{}[]\\|()")
+
+
+def required_literals(pattern):
+    """
+    Literal strings that every match of a regular expression contains.
+
+    Conservative: text under groups, classes, alternations and optional quantifiers is left
+    out, and patterns with inline flags (such as verbose mode) yield nothing.
+    """
+    if "(?" in pattern:
+        return []
+    runs = []
+    run = []
+    depth = 0
+    i = 0
+    while i < len(pattern):
+        c = pattern[i]
+        if c == "\\":
+            escaped = pattern[i + 1:i + 2]
+            if depth == 0 and escaped and not escaped.isalnum():
+                run.append(escaped)
+            else:
+                runs.append(run)
+                run = []
+            i += 2
+            continue
+        if c == "[":
+            # Skip the class; a ] right after [ or [^ is part of it
+            end = i + 1
+            if pattern[end:end + 1] == "^":
+                end += 1
+            if pattern[end:end + 1] == "]":
+                end += 1
+            while end < len(pattern) and pattern[end] != "]":
+                end += 2 if pattern[end] == "\\" else 1
+            runs.append(run)
+            run = []
+            i = end + 1
+            continue
+        if depth:
+            depth += {"(": 1, ")": -1}.get(c, 0)
+        elif c == "|":
+            return []
+        elif c == "(":
+            depth = 1
+            runs.append(run)
+            run = []
+        elif c in "*?{" or c == "+":
+            # The quantified character may occur zero times (* ? {0,}); with + it occurs at least once
+            if c != "+" and run:
+                run.pop()
+            runs.append(run)
+            run = []
+            if c == "{":
+                close = pattern.find("}", i)
+                i = close if close != -1 else i
+        elif c in REGEX_SPECIAL:
+            runs.append(run)
+            run = []
+        else:
+            run.append(c)
+        i += 1
+    runs.append(run)
+    return ["".join(run) for run in runs if len(run) >= 3]
+
+
+def _snippet(line, column):
+    """The line, shortened around column to SEARCH_SNIPPET_CHARACTERS."""
+    if len(line) <= SEARCH_SNIPPET_CHARACTERS:
+        return line.strip()
+    start = max(0, min(column - SEARCH_SNIPPET_CHARACTERS // 2, len(line) - SEARCH_SNIPPET_CHARACTERS))
+    text = line[start:start + SEARCH_SNIPPET_CHARACTERS].strip()
+    return ("..." if start else "") + text + ("..." if start + SEARCH_SNIPPET_CHARACTERS < len(line) else "")
+
+
+def search_file(path, compiled, max_matches):
+    """
+    Search one memory-mapped file; at most one match is reported per line.
+
+    Returns:
+        list: (line number, snippet) of up to max_matches matching lines; empty for binary files
+    """
+    matches = []
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return matches
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            if mapped.find(b"\0", 0, BINARY_SNIFF_BYTES) != -1:
+                return matches
+            line_number = 1
+            counted_to = 0
+            position = 0
+            while len(matches) < max_matches and position < len(mapped):
+                match = compiled.search(mapped, position)
+                if match is None:
+                    break
+                start = match.start()
+                line_number += mapped[counted_to:start].count(b"\n")
+                counted_to = start
+                line_start = mapped.rfind(b"\n", 0, start) + 1
+                line_end = mapped.find(b"\n", start)
+                if line_end == -1:
+                    line_end = len(mapped)
+                column = len(mapped[line_start:start].decode("utf-8", errors="replace"))
+                line = mapped[line_start:line_end].decode("utf-8", errors="replace")
+                matches.append((line_number, _snippet(line, column)))
+                position = line_end + 1
+    return matches
+
+
+@tool(
+    description="Search the files in the working directory for literal text or a regular expression, and list the matching lines as path:line: text. Files ignored by .gitignore and binary files are skipped.",
+    parameters={
+        "pattern": "The text to search for (a Python regular expression if regex is true).",
+        "regex": "Treat pattern as a regular expression instead of literal text.",
+        "directory": "Optional directory to search in, relative to the working directory (default: the whole working directory).",
+        "include": "Optional glob patterns; only files matching one are searched (e.g. [\"*.py\"]). Patterns containing / match the relative path, others the name.",
+        "ignore_case": "Match letters regardless of case.",
+        "max_results": f"Optional maximum number of matching lines to return (default {SEARCH_MAX_RESULTS}).",
+    },
+    read_only=True,
+)
+def search_files(
+    working_directory,
+    pattern: str,
+    regex: bool = False,
+    directory: str = ".",
+    include: list[str] | None = None,
+    ignore_case: bool = False,
+    max_results: int | None = None,
+):
+    """
+    Search files within a restricted working directory.
+
+    Args:
+        working_directory (str): The base directory that limits file access
+        pattern (str): Literal text, or a regular expression if regex is true
+        regex (bool): Whether pattern is a regular expression
+        directory (str): Relative path within working_directory to search
+        include (list): Glob patterns a file must match to be searched
+        ignore_case (bool): Case-insensitive matching
+        max_results (int): Most matching lines to return
+
+    Returns:
+        str: One "path:line: snippet" per matching line, or an error message
+    """
+    try:
+        abs_working_dir = os.path.abspath(working_directory)
+        abs_directory = os.path.abspath(os.path.join(working_directory, directory))
+        inside = abs_directory.startswith(abs_working_dir + os.sep) or abs_directory == abs_working_dir
+        if not inside or not resolves_inside(os.path.realpath(abs_working_dir), abs_directory):
+            return f'Error: Cannot search "{directory}" as it is outside the permitted working directory'
+        if not os.path.isdir(abs_directory):
+            return f'Error: "{directory}" is not a directory'
+        if not pattern:
+            return 'Error: pattern must not be empty'
+        max_results = SEARCH_MAX_RESULTS if max_results is None else max_results
+        if max_results < 1:
+            return 'Error: max_results must be at least 1'
+
+        # Files are searched as bytes, so the pattern is too
+        source = pattern if regex else re.escape(pattern)
+        try:
+            compiled = re.compile(source.encode("utf-8"), re.MULTILINE | (re.IGNORECASE if ignore_case else 0))
+        except re.error as e:
+            return f'Error: Invalid regular expression: {e}'
+
+        index = FILE_INDEX.tree(abs_working_dir)
+        # Symlinks to files outside the working directory are not followed
+        files = dict(contained_files(abs_working_dir, visible_files(index, SKIPPED_DIRECTORIES)))
+        prefix = os.path.relpath(abs_directory, abs_working_dir).replace(os.sep, "/")
+        prefix = "" if prefix == "." else prefix + "/"
+        paths = sorted(
+            path for path in files
+            if path.startswith(prefix) and (not include or glob_matches(include, path[len(prefix):]))
+        )
+
+        in_scope = len(paths)
+
+        # In large trees, only open the files whose trigrams include the pattern's literal text
+        if len(files) >= SEARCH_INDEX_MIN_FILES:
+            TRIGRAM_INDEX.update(abs_working_dir, files)
+            literals = required_literals(pattern) if regex else [pattern]
+            # Trigrams are only lowercased for ASCII, so other text can't be looked up regardless of case
+            if not (ignore_case and not all(literal.isascii() for literal in literals)):
+                paths = TRIGRAM_INDEX.candidates(abs_working_dir, paths, [literal.encode("utf-8") for literal in literals])
+
+        def search(path):
+            try:
+                return search_file(os.path.join(abs_working_dir, path), compiled, max_results + 1)
+            except OSError:
+                return []  # Deleted or unreadable since it was indexed
+
+        # Files are read and searched in parallel; results keep the sorted path order
+        results = []
+        truncated = False
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=SEARCH_MAX_WORKERS)
+        try:
+            searches = executor.map(search, paths)
+            for path, matches in zip(paths, searches):
+                for line_number, snippet in matches:
+                    if len(results) == max_results:
+                        truncated = True
+                        break
+                    results.append(f"{path}:{line_number}: {snippet}")
+                if truncated:
+                    break
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        if not results:
+            return f'No matches for "{pattern}" in {in_scope} files.'
+        if truncated:
+            results.append(f"[...more matches; showing the first {max_results}. Narrow the search with directory/include or a more specific pattern]")
+        return "\n".join(results)
+
+    except Exception as e:
+        return f"Error: {str(e)}"
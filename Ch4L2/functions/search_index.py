@@ -0,0 +1,202 @@
+"""Persistent trigram index that narrows a search_files call down to the files that can match.
+
+Each file gets a signature: a bitmap with one bit set per distinct (ASCII lowercased)
+3-byte sequence in it, sized to the number of those trigrams. A search needs every trigram of
+the literal text its pattern requires, so a file whose signature lacks one of their bits is
+skipped without being opened. Signatures can give false positives, never false negatives.
+
+Signatures are stored in SQLite and only recomputed for files whose stat data changed.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from .config import SEARCH_INDEX_PATH, SEARCH_INDEX_MAX_FILE_BYTES
+
+# Bytes at the start of a file checked for a NUL byte, which marks it as binary
+BINARY_SNIFF_BYTES = 8192
+
+# Signature sizes in bits (powers of two); each is about twice the file's trigram count
+MIN_SIGNATURE_BITS = 256
+MAX_SIGNATURE_BITS = 1 << 16
+
+# Kinds of indexed file
+TEXT, BINARY, UNINDEXED = 0, 1, 2
+
+
+def trigram_bit(trigram, bits):
+    """Bit of a bits-sized signature that stands for a 3-byte trigram (stable across processes)."""
+    return ((int.from_bytes(trigram, "little") * 0x9E3779B1) & 0xFFFFFFFF) >> (33 - bits.bit_length())
+
+
+def trigrams(data):
+    """Distinct trigrams of data, ASCII lowercased."""
+    data = data.lower()
+    return {data[i:i + 3] for i in range(len(data) - 2)}
+
+
+def file_signature(path, size):
+    """(kind, bits, signature as an int) for the file at path."""
+    if size > SEARCH_INDEX_MAX_FILE_BYTES:
+        return UNINDEXED, 0, 0
+    with open(path, 'rb') as f:
+        data = f.read()
+    if b"\0" in data[:BINARY_SNIFF_BYTES]:
+        return BINARY, 0, 0
+    grams = trigrams(data)
+    bits = min(max(MIN_SIGNATURE_BITS, 1 << (2 * len(grams)).bit_length()), MAX_SIGNATURE_BITS)
+    signature = 0
+    for gram in grams:
+        signature |= 1 << trigram_bit(gram, bits)
+    return TEXT, bits, signature
+
+
+class Signature:
+    """Stored signature of one version of a file."""
+    __slots__ = ("key", "kind", "bits", "signature", "indexed_at")
+
+    def __init__(self, key, kind, bits, signature, indexed_at):
+        self.key = key
+        self.kind = kind
+        self.bits = bits
+        self.signature = signature
+        self.indexed_at = indexed_at
+
+
+class TrigramIndex:
+    """Trigram signatures of the files in working directories, persisted in SQLite."""
+    def __init__(self, path=SEARCH_INDEX_PATH):
+        self.path = path
+        self.connection = None
+        self.roots = {}  # working directory -> {relative path: Signature}
+        self.lock = threading.Lock()
+        self.updated = 0
+        self.swept = False  # Whether the stored roots were checked for ones that are gone
+
+    def _connect(self):
+        if self.connection is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self.connection = sqlite3.connect(self.path, check_same_thread=False)
+            self.connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS signatures (
+                    root TEXT NOT NULL,
+                    path TEXT NOT NULL,
+                    mtime_ns INTEGER NOT NULL,
+                    size INTEGER NOT NULL,
+                    inode INTEGER NOT NULL,
+                    kind INTEGER NOT NULL,
+                    bits INTEGER NOT NULL,
+                    signature BLOB NOT NULL,
+                    indexed_at INTEGER NOT NULL,
+                    PRIMARY KEY (root, path)
+                )
+                """
+            )
+            self.connection.commit()
+        return self.connection
+
+    def _load(self, root):
+        signatures = self.roots.get(root)
+        if signatures is None:
+            rows = self._connect().execute(
+                "SELECT path, mtime_ns, size, inode, kind, bits, signature, indexed_at FROM signatures WHERE root = ?",
+                (root,),
+            )
+            signatures = {
+                path: Signature((mtime_ns, size, inode), kind, bits, int.from_bytes(blob, "little"), indexed_at)
+                for path, mtime_ns, size, inode, kind, bits, blob, indexed_at in rows
+            }
+            self.roots[root] = signatures
+        return signatures
+
+    def _forget_missing_roots(self, connection):
+        """
+        Drop the signatures of working directories that no longer exist, such as finished batch workspaces.
+
+        The first call checks every stored root; later ones only those loaded since.
+        """
+        if self.swept:
+            roots = list(self.roots)
+        else:
+            roots = [root for (root,) in connection.execute("SELECT DISTINCT root FROM signatures")]
+            self.swept = True
+        missing = [root for root in roots if not os.path.isdir(root)]
+        if missing:
+            with connection:
+                connection.executemany("DELETE FROM signatures WHERE root = ?", [(root,) for root in missing])
+            for root in missing:
+                self.roots.pop(root, None)
+
+    def update(self, root, files):
+        """
+        Bring root's signatures in line with files, reading only new and changed ones.
+
+        Args:
+            root (str): Absolute working directory
+            files (dict): relative path -> IndexEntry of every searchable file under root
+        """
+        with self.lock:
+            self._forget_missing_roots(self._connect())
+            signatures = self._load(root)
+            changed = []
+            for path, entry in files.items():
+                key = (entry.mtime_ns, entry.size, entry.inode)
+                stored = signatures.get(path)
+                # As with content digests, a signature taken within a second of the file's
+                # mtime may miss a later change that leaves the stat data as it was
+                if stored is not None and stored.key == key and stored.indexed_at - entry.mtime_ns > 1_000_000_000:
+                    continue
+                indexed_at = time.time_ns()
+                try:
+                    kind, bits, signature = file_signature(os.path.join(root, path), entry.size)
+                except OSError:
+                    continue
+                signatures[path] = Signature(key, kind, bits, signature, indexed_at)
+                changed.append((root, path, *key, kind, bits, signature.to_bytes(bits // 8, "little"), indexed_at))
+            removed = [(root, path) for path in signatures if path not in files]
+            for _, path in removed:
+                del signatures[path]
+
+            if changed or removed:
+                connection = self._connect()
+                with connection:
+                    connection.executemany("INSERT OR REPLACE INTO signatures VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", changed)
+                    connection.executemany("DELETE FROM signatures WHERE root = ? AND path = ?", removed)
+                self.updated += len(changed)
+
+    def candidates(self, root, paths, literals):
+        """
+        The paths (in order) that may contain every one of literals; binary files are left out.
+
+        Args:
+            root (str): Absolute working directory, updated with update() first
+            paths (list): Relative paths to filter
+            literals (list): Byte strings a match must contain (none: keep every text file)
+        """
+        grams = set()
+        for literal in literals:
+            grams |= trigrams(literal)
+        masks = {}
+        with self.lock:
+            signatures = self.roots.get(root, {})
+        kept = []
+        for path in paths:
+            stored = signatures.get(path)
+            if stored is None or stored.kind == UNINDEXED:
+                kept.append(path)
+                continue
+            if stored.kind == BINARY:
+                continue
+            mask = masks.get(stored.bits)
+            if mask is None:
+                mask = masks[stored.bits] = sum({1 << trigram_bit(gram, stored.bits) for gram in grams})
+            if stored.signature & mask == mask:
+                kept.append(path)
+        return kept
+
+
+TRIGRAM_INDEX = TrigramIndex()
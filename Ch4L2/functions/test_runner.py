@@ -0,0 +1,87 @@
+"""Test runner used by the run_tests tool: lists or runs unittest tests and writes the results as JSON.
+
+Runs inside the project's environment with the working directory as its cwd, so only the
+standard library is imported.
+Run as: python test_runner.py <results path> list|run <test name> ...
+"""
+
+import json
+import os
+import re
+import sys
+import time
+import unittest
+
+FAILED_IMPORT_PREFIX = "unittest.loader._FailedTest."
+
+LOCATION_PATTERN = re.compile(r'File "([^"]+)", line (\d+)')
+
+
+def test_ids(suite):
+    """Ids of every test case in suite, depth first."""
+    for test in suite:
+        if isinstance(test, unittest.TestSuite):
+            yield from test_ids(test)
+        else:
+            yield test.id()
+
+
+def describe(test, formatted_traceback):
+    """Compact description of a failure: test id, innermost location and the exception line."""
+    # Drop the test's buffered output, which unittest appends after the traceback
+    formatted_traceback = re.split(r"\n(?:Stdout|Stderr):\n", formatted_traceback)[0]
+    lines = [line for line in formatted_traceback.strip().splitlines() if line.strip()]
+    location = ""
+    for line in reversed(lines):
+        match = LOCATION_PATTERN.search(line)
+        if match:
+            location = f"{os.path.relpath(match.group(1))}:{match.group(2)}"
+            break
+    return {
+        "id": test.id().replace(FAILED_IMPORT_PREFIX, ""),
+        "location": location,
+        "message": lines[-1][:300] if lines else "",
+    }
+
+
+def list_tests(names):
+    ids = []
+    for name in names:
+        try:
+            for test_id in test_ids(unittest.defaultTestLoader.loadTestsFromName(name)):
+                # A module that fails to import is run by name so its error is reported
+                ids.append(name if test_id.startswith(FAILED_IMPORT_PREFIX) else test_id)
+        except Exception:
+            ids.append(name)
+    return {"ids": list(dict.fromkeys(ids))}
+
+
+def run_tests(names):
+    suite = unittest.TestSuite()
+    for name in names:
+        suite.addTest(unittest.defaultTestLoader.loadTestsFromName(name))
+    result = unittest.TestResult()
+    result.buffer = True  # Keep what the tests print out of the agent's output
+    started = time.perf_counter()
+    suite.run(result)
+    return {
+        "run": result.testsRun,
+        "failures": [describe(test, tb) for test, tb in result.failures],
+        "errors": [describe(test, tb) for test, tb in result.errors],
+        "skipped": len(result.skipped),
+        "unexpected_successes": [test.id() for test in result.unexpectedSuccesses],
+        "seconds": time.perf_counter() - started,
+    }
+
+
+def main():
+    results_path, mode, names = sys.argv[1], sys.argv[2], sys.argv[3:]
+    # Import the project's modules from the working directory, not from this file's directory
+    sys.path[0] = os.getcwd()
+    report = list_tests(names) if mode == "list" else run_tests(names)
+    with open(results_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,9 +4,18 @@ Function to write content to files within a specified working directory.
 """
 
 import os
+from .file_history import replace_file
+from .registry import tool
 
 
-def write_file(working_directory, file_path, content):
+@tool(
+    description="Write content to a file within the working directory. Creates directories as needed.",
+    parameters={
+        "file_path": "The path to the file to write to, relative to the working directory.",
+        "content": "The content to write to the file.",
+    },
+)
+def write_file(working_directory, file_path: str, content: str):
     """
     Write content to a file within the specified working directory.
     
@@ -39,35 +48,11 @@ def write_file(working_directory, file_path, content):
         if dir_path and not os.path.exists(dir_path):
             os.makedirs(dir_path)
         
-        # Write the content to the file
-        with open(file_path_abs, 'w', encoding='utf-8') as f:
-            f.write(content)
+        # Write the content atomically, keeping the previous version for undo_change
+        change = replace_file(working_dir_abs, file_path_abs, content, "write_file")
         
-        return f'Successfully wrote to "{file_path}" ({len(content)} characters written)'
+        return f'Successfully wrote to "{file_path}" ({len(content)} characters written; change {change.id})'
         
     except Exception as e:
         return f'Error: {str(e)}'
 
-
-# Function schema for Groq API
-schema_write_file = {
-    "type": "function",
-    "function": {
-        "name": "write_file",
-        "description": "Write content to a file within the working directory. Creates directories as needed.",
-        "parameters": {
-            "type": "object",
-            "properties": {
-                "file_path": {
-                    "type": "string",
-                    "description": "The path to the file to write to, relative to the working directory."
-                },
-                "content": {
-                    "type": "string",
-                    "description": "The content to write to the file."
-                }
-            },
-            "required": ["file_path", "content"]
-        }
-    }
-}
@@ -0,0 +1,119 @@
+"""Function to write or patch several files in one transaction."""
+
+import os
+import typing
+from .file_history import history_path, replace_files
+from .patching import EditError, SearchReplace, apply_search_replace, apply_unified_diff, diff_summary
+from .registry import tool
+
+
+class FileWrite(typing.TypedDict):
+    path: str
+    content: typing.NotRequired[str]
+    diff: typing.NotRequired[str]
+    edits: typing.NotRequired[list[SearchReplace]]
+
+
+def _new_content(abs_path, entry):
+    """
+    The old and new content of one entry's file (old is None for a new file).
+
+    Raises:
+        EditError: The entry's diff or edits don't apply
+    """
+    old_content = None
+    if os.path.isfile(abs_path):
+        # newline='' keeps the file's line endings as they are; a file that is replaced whole
+        # is only read for the summary, so it doesn't have to be UTF-8
+        errors = 'replace' if "content" in entry else 'strict'
+        with open(abs_path, 'r', encoding='utf-8', errors=errors, newline='') as f:
+            old_content = f.read()
+    if "content" in entry:
+        return old_content, entry["content"]
+    if old_content is None:
+        raise EditError("the file does not exist; use content to create it")
+    if "diff" in entry:
+        return old_content, apply_unified_diff(old_content, entry["diff"])
+    return old_content, apply_search_replace(old_content, entry["edits"])
+
+
+@tool(
+    description="Write or change several files in one call, as one transaction: either every file is written or none is. Each entry gives a path and either content (the whole new file), diff (a unified diff of that file) or edits (search/replace blocks, as in edit_file). Use it for changes that span files, instead of one write_file per file.",
+    parameters={
+        "files": "The files to write: [{\"path\": ..., \"content\": ...} or {\"path\": ..., \"diff\": ...} or {\"path\": ..., \"edits\": [...]}]. Paths are relative to the working directory, and each path may appear once.",
+    },
+)
+def write_files(working_directory, files: list[FileWrite]):
+    """
+    Write and patch several files within the working directory, all or nothing.
+
+    Args:
+        working_directory (str): The permitted working directory
+        files (list): {"path": ...} entries, each with "content", "diff" or "edits"
+
+    Returns:
+        str: A summary line per file, or the errors that stopped the whole write
+    """
+    try:
+        working_dir_abs = os.path.abspath(working_directory)
+        if not isinstance(files, list) or not files:
+            return 'Error: files must be a non-empty list of {"path": ..., "content"/"diff"/"edits": ...} entries'
+
+        # Every entry is checked and applied in memory before anything is written
+        errors = []
+        writes = []
+        seen = set()
+        for number, entry in enumerate(files, 1):
+            path = entry.get("path") if isinstance(entry, dict) else None
+            if not isinstance(path, str) or not path:
+                errors.append(f'file {number}: "path" is missing')
+                continue
+            label = f'file {number} "{path}"'
+            abs_path = os.path.abspath(os.path.join(working_directory, path))
+            if not abs_path.startswith(working_dir_abs + os.sep):
+                errors.append(f"{label}: outside the permitted working directory")
+                continue
+            if abs_path in seen:
+                errors.append(f"{label}: the same file appears twice; combine its changes into one entry")
+                continue
+            seen.add(abs_path)
+            modes = [mode for mode in ("content", "diff", "edits") if mode in entry]
+            if len(modes) != 1:
+                errors.append(f"{label}: give exactly one of content, diff or edits")
+                continue
+            if os.path.isdir(abs_path):
+                errors.append(f"{label}: is a directory")
+                continue
+            try:
+                history_path(working_dir_abs, abs_path)
+                old_content, new_content = _new_content(abs_path, entry)
+            except (EditError, ValueError, TypeError) as e:
+                errors.append(f"{label}: {e}")
+                continue
+            writes.append((path, abs_path, old_content, new_content))
+        if errors:
+            return "Error: Nothing was written:\n" + "\n".join(f"- {error}" for error in errors)
+
+        changed = [write for write in writes if write[2] != write[3]]
+        if not changed:
+            return "No changes: every file already has that content"
+        changes = replace_files(
+            working_dir_abs,
+            [(abs_path, new_content, None) for _, abs_path, _, new_content in changed],
+            "write_files",
+        )
+
+        ids = f"change {changes[0].id}" if len(changes) == 1 else f"changes {changes[0].id}-{changes[-1].id}"
+        unchanged = f", {len(writes) - len(changes)} unchanged" if len(changes) < len(writes) else ""
+        lines = [f"Wrote {len(changes)} {'file' if len(changes) == 1 else 'files'} in one transaction{unchanged} ({ids}; undo_change reverts {'it' if len(changes) == 1 else 'them together'}):"]
+        for path, _, old_content, new_content in writes:
+            if old_content == new_content:
+                lines.append(f'"{path}": unchanged')
+            elif old_content is None:
+                lines.append(f'"{path}": created, {len(new_content)} characters')
+            else:
+                lines.append(diff_summary(path, old_content, new_content, 0).split("\n")[0])
+        return "\n".join(lines)
+
+    except Exception as e:
+        return f'Error: {str(e)}'
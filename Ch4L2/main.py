@@ -1,17 +1,57 @@
 import os
 import sys
 import argparse
+import asyncio
 import json
+import time
 from dotenv import load_dotenv
-from groq import Groq
-from functions.get_files_info import schema_get_files_info, get_files_info
-from functions.get_file_content import schema_get_file_content, get_file_content
-from functions.run_python import schema_run_python_file, run_python_file
-from functions.write_file import schema_write_file, write_file
+from groq import AsyncGroq
+from functions.registry import TOOLS, tool_schemas, read_only_tools
+# Importing a tool module registers its functions in TOOLS
+import functions.get_files_info
+import functions.get_file_content
+import functions.read_files
+import functions.run_python
+import functions.write_file
+import functions.write_files
+import functions.edit_file
+import functions.restore
+import functions.run_tests
+import functions.search_files
+import functions.get_code_outline
+from functions.python_pool import POOL as PYTHON_POOL, prewarm as prewarm_python
+from functions.run_cache import RUN_CACHE
+from functions.repo_map import repo_map
+from functions.relevance_index import relevant_snippets
+from functions.config import PYTHON_POOL_ENABLED, REPO_MAP_MAX_TOKENS, RELEVANCE_TOP_K
+from agent.streaming import consume_stream
+from agent.cache import CompletionCache, CachedCompletions
+from agent.compaction import compact_messages
+from agent.cassette import RecordingCompletions, ReplayCompletions
+from agent.batch import run_batch
+from agent.daemon import serve
+from agent.memo import ToolCallMemo
+from agent.rate_limit import RateLimiter, RateLimitedCompletions
+from agent.config import (
+    COMPLETION_CACHE_PATH,
+    COMPLETION_CACHE_MAX_BYTES,
+    COMPLETION_CACHE_TTL_SECONDS,
+    CONTEXT_TOKEN_BUDGET,
+    RATE_LIMIT_REQUESTS_PER_MINUTE,
+    RATE_LIMIT_TOKENS_PER_MINUTE,
+    RATE_LIMIT_MAX_RETRIES,
+    DAEMON_SOCKET_PATH,
+)
+
+
+# Directory the agent's functions are confined to (batch tasks use their own copy)
+WORKING_DIRECTORY = "./calculator"
 
 
 class GroqFunctionCall:
     """Simple class to mimic Gemini's types.FunctionCall structure for Groq."""
+    __slots__ = ("name", "args")
+
     def __init__(self, name, args):
         self.name = name
         self.args = args
@@ -19,29 +59,51 @@ class GroqFunctionCall:
 
 class GroqContent:
     """Simple class to mimic Gemini's types.Content structure for Groq."""
+    __slots__ = ("role", "parts")
+
     def __init__(self, role, parts):
         self.role = role
         self.parts = parts
 
 
+class FunctionResponse:
+    """Simple class to mimic Gemini's types.FunctionResponse structure for Groq."""
+    __slots__ = ("name", "response")
+
+    def __init__(self, name, response):
+        self.name = name
+        self.response = response
+
+
 class GroqPart:
     """Simple class to mimic Gemini's types.Part structure for Groq."""
+    __slots__ = ("function_response",)
+
     def __init__(self, function_response):
         self.function_response = function_response
     
     @classmethod
     def from_function_response(cls, name, response):
-        function_response = type('FunctionResponse', (), {'response': response})()
-        return cls(function_response)
+        return cls(FunctionResponse(name, response))
+
+
+def print_function_call(function_call_part, verbose=False):
+    """Print which function is about to be called (with its args when verbose)."""
+    if verbose:
+        print(f"Calling function: {function_call_part.name}({function_call_part.args})")
+    else:
+        print(f" - Calling function: {function_call_part.name}")
 
 
-def call_function(function_call_part, verbose=False):
+def call_function(function_call_part, verbose=False, announce=True, working_directory=WORKING_DIRECTORY):
     """
-    Handle calling one of our four functions based on the function_call_part.
+    Handle calling one of the registered tools based on the function_call_part.
     
     Args:
         function_call_part: Object with .name (string) and .args (dict) properties
         verbose: If True, print detailed function call information
+        announce: If False, skip printing the call (the caller already did)
+        working_directory: Directory the function is confined to
         
     Returns:
         GroqContent object with function response
@@ -50,24 +112,15 @@ def call_function(function_call_part, verbose=False):
     function_args = function_call_part.args.copy()  # Make a copy to avoid modifying original
     
     # Print function call information
-    if verbose:
-        print(f"Calling function: {function_name}({function_args})")
-    else:
-        print(f" - Calling function: {function_name}")
+    if announce:
+        print_function_call(function_call_part, verbose)
     
-    # Add working_directory to args - set to ./calculator as specified
-    function_args["working_directory"] = "./calculator"
+    # Add working_directory to args - ./calculator unless a batch task supplied its own copy
+    function_args["working_directory"] = working_directory
     
-    # Dictionary mapping function names to actual functions
-    function_map = {
-        "get_files_info": get_files_info,
-        "get_file_content": get_file_content,
-        "run_python_file": run_python_file,
-        "write_file": write_file
-    }
-    
-    # Check if function name is valid
-    if function_name not in function_map:
+    # Look the function up in the registry's dispatch table
+    registered = TOOLS.get(function_name)
+    if registered is None:
         return GroqContent(
             role="tool",
             parts=[
@@ -80,7 +133,7 @@ def call_function(function_call_part, verbose=False):
     
     # Call the function with keyword arguments
     try:
-        function_result = function_map[function_name](**function_args)
+        function_result = registered(**function_args)
         return GroqContent(
             role="tool",
             parts=[
@@ -101,84 +154,322 @@ def call_function(function_call_part, verbose=False):
             ],
         )
 
+
+# Functions that only read the working directory and can safely run side by side
+PARALLEL_SAFE_FUNCTIONS = read_only_tools()
+
+
+async def call_function_async(function_call_part, verbose=False, working_directory=WORKING_DIRECTORY):
+    """Run call_function in a worker thread so several tools can run at once."""
+    return await asyncio.to_thread(call_function, function_call_part, verbose, False, working_directory)
+
+
+class ToolCallScheduler:
+    """
+    Starts tool calls as soon as they are submitted, running independent ones concurrently.
+    
+    Read-only calls only wait for the most recent write; any other call (e.g. write_file or edit_file)
+    waits for everything submitted before it, so it never races with neighbouring reads.
+    With a session ToolCallMemo, repeated reads of unchanged paths get a short reply.
+    """
+    def __init__(self, verbose=False, working_directory=WORKING_DIRECTORY, memo=None):
+        self.verbose = verbose
+        self.working_directory = working_directory
+        self.memo = memo
+        self.tasks = []
+        self.barrier = None
+    
+    def submit(self, tool_call):
+        """Parse a tool call and schedule it behind whatever it depends on."""
+        try:
+            args = json.loads(tool_call.function.arguments or "{}")
+            if not isinstance(args, dict):
+                raise ValueError("expected a JSON object")
+        except ValueError as e:
+            # Malformed or truncated arguments (e.g. a streamed call cut short) go back to the model
+            # as this call's error instead of ending the session
+            print(f" - Invalid arguments for {tool_call.function.name}: {e}")
+            self.tasks.append(asyncio.create_task(self._invalid_arguments(tool_call.function.name, e)))
+            return
+        function_call_part = GroqFunctionCall(tool_call.function.name, args)
+        
+        # Announce from the event loop so the printed order matches submission order
+        print_function_call(function_call_part, self.verbose)
+        
+        if function_call_part.name in PARALLEL_SAFE_FUNCTIONS:
+            depends_on = [self.barrier] if self.barrier else []
+        else:
+            depends_on = list(self.tasks)
+        number = self.memo.next_call_number() if self.memo is not None else None
+        task = asyncio.create_task(self._run(function_call_part, depends_on, number, tool_call.id))
+        if function_call_part.name not in PARALLEL_SAFE_FUNCTIONS:
+            self.barrier = task
+        self.tasks.append(task)
+    
+    async def _invalid_arguments(self, function_name, error):
+        return GroqContent(
+            role="tool",
+            parts=[
+                GroqPart.from_function_response(
+                    name=function_name,
+                    response={"error": f"Invalid arguments for {function_name}: {error}. Send them as one JSON object"},
+                )
+            ],
+        )
+    
+    async def _run(self, function_call_part, depends_on, number, tool_call_id):
+        if depends_on:
+            await asyncio.wait(depends_on)
+        if self.memo is None:
+            return await call_function_async(function_call_part, self.verbose, self.working_directory)
+        
+        memo_args = dict(function_call_part.args, working_directory=self.working_directory)
+        reply = await asyncio.to_thread(self.memo.lookup, function_call_part.name, memo_args)
+        if reply is not None:
+            return GroqContent(
+                role="tool",
+                parts=[GroqPart.from_function_response(name=function_call_part.name, response={"result": reply})],
+            )
+        
+        function_call_result = await call_function_async(function_call_part, self.verbose, self.working_directory)
+        response = function_call_result.parts[0].function_response.response
+        await asyncio.to_thread(self.memo.record, function_call_part.name, memo_args, response.get("result"), number, tool_call_id)
+        return function_call_result
+    
+    async def results(self):
+        """Wait for every submitted call; results are in submission order."""
+        return await asyncio.gather(*self.tasks)
+
+
 load_dotenv()
 api_key = os.environ.get("GROQ_API_KEY")
-client = Groq(api_key=api_key)
 
 # System prompt with function usage instructions
 system_prompt = """
 AI coding agent for calculator project. Functions available:
 - get_files_info: List files/sizes
 - get_file_content: Read files  
+- read_files: Read several files (paths or globs) in one call
 - run_python_file: Execute Python
-- write_file: Write/modify files
+- write_file: Write new files or replace whole files
+- write_files: Write/patch several files in one all-or-nothing call
+- edit_file: Change part of a file (search/replace blocks or a unified diff)
+- undo_change / restore_file: Roll back your changes from the file history (no need to resend old content)
+- run_tests: Run the tests affected by your changes
+- search_files: Find text or a regex in files (path:line: text)
+- get_code_outline: Classes/functions of Python files with line ranges
 
-For understanding: explore with get_files_info → read with get_file_content → explain.
+For understanding: locate code with search_files, get_code_outline or get_files_info → read just the lines you need with get_file_content, or several files at once with read_files → explain.
 
-For fixes: When asked to FIX/MODIFY/CHANGE/UPDATE/IMPROVE files, ACTUALLY IMPLEMENT changes using write_file (don't just recommend). 
+For fixes: When asked to FIX/MODIFY/CHANGE/UPDATE/IMPROVE files, ACTUALLY IMPLEMENT changes (don't just recommend): edit_file for changes to existing files, write_file for new files, write_files when a change spans several files. Verify fixes with run_tests.
 
 Working directory: "./calculator" (use relative paths).
 """
 
 # Create available functions list
-available_functions = [
-    schema_get_files_info,
-    schema_get_file_content,
-    schema_run_python_file,
-    schema_write_file
-]
+available_functions = tool_schemas()
 
 # Get current working directory for function calls
 working_directory = os.getcwd()
 
 # Set up argument parser
 parser = argparse.ArgumentParser(description='Generate content using Groq API')
-parser.add_argument('prompt', help='The prompt to send to the AI model')
+parser.add_argument('prompt', nargs='?', help='The prompt to send to the AI model')
 parser.add_argument('--verbose', action='store_true', help='Show detailed output including prompt and token counts')
+parser.add_argument('--stream', action='store_true', help='Stream responses and start tool calls as soon as their arguments arrive')
+parser.add_argument('--cache', action='store_true', help='Serve repeated (non-streamed) completions from a persistent on-disk cache')
+parser.add_argument('--cache-path', default=COMPLETION_CACHE_PATH, help='SQLite file for --cache')
+parser.add_argument('--cache-ttl', type=float, default=COMPLETION_CACHE_TTL_SECONDS, help='Seconds before a cached completion expires')
+parser.add_argument('--cache-max-mb', type=float, default=COMPLETION_CACHE_MAX_BYTES / (1024 * 1024), help='Size limit for --cache before least recently used entries are evicted')
+parser.add_argument('--cache-runs', action='store_true', help='Reuse run_python_file results while nothing in the working directory has changed')
+parser.add_argument('--memo', action='store_true', help='Answer repeated reads of unchanged files/directories with a short "unchanged since tool call N" reply')
+parser.add_argument('--compact', action='store_true', help='Elide superseded file reads and trim stale tool output before each request')
+parser.add_argument('--token-budget', type=int, default=CONTEXT_TOKEN_BUDGET, help='Estimated-token target for --compact')
+parser.add_argument('--record', metavar='CASSETTE', help='Write every request and response of this session to a cassette file')
+parser.add_argument('--replay', metavar='CASSETTE', help='Serve responses from a recorded cassette instead of the Groq API (no network or API key needed)')
+parser.add_argument('--replay-latency', type=float, default=0.0, help='Seconds of simulated network latency added to each replayed response')
+parser.add_argument('--batch', metavar='PROMPTS_JSONL', help='Run every prompt in a JSONL file instead of a single prompt')
+parser.add_argument('--batch-output', metavar='RESULTS_JSONL', help='Where batch results are streamed (default: <prompts>.results.jsonl); existing successes are skipped on resume')
+parser.add_argument('--concurrency', type=int, default=4, help='Number of batch prompts run at once')
+parser.add_argument('--rpm', type=float, default=RATE_LIMIT_REQUESTS_PER_MINUTE, help='Client-side requests-per-minute limit shared by all sessions')
+parser.add_argument('--tpm', type=float, default=RATE_LIMIT_TOKENS_PER_MINUTE, help='Client-side tokens-per-minute limit (replaced by the limit Groq reports in its response headers)')
+parser.add_argument('--max-retries', type=int, default=RATE_LIMIT_MAX_RETRIES, help='Retries for rate-limited or transient API errors')
+parser.add_argument('--repo-map', action='store_true', help='Start with a map of the working directory (files, sizes, top-level Python definitions) in the system prompt')
+parser.add_argument('--repo-map-tokens', type=int, default=REPO_MAP_MAX_TOKENS, help='Estimated-token budget for --repo-map')
+parser.add_argument('--relevant-snippets', action='store_true', help='Start with the code snippets that best match the prompt in the system prompt, ranked by a local BM25 keyword index of the working directory')
+parser.add_argument('--relevant-snippets-count', type=int, default=RELEVANCE_TOP_K, help='Number of snippets for --relevant-snippets')
+parser.add_argument('--daemon', action='store_true', help='Stay running and serve prompts from agent.client over a Unix socket, keeping the client and caches warm')
+parser.add_argument('--socket', default=DAEMON_SOCKET_PATH, help='Unix socket for --daemon')
 
 # Parse arguments
 args = parser.parse_args()
+if not args.prompt and not args.batch and not args.daemon:
+    parser.error("a prompt is required unless --batch or --daemon is given")
 user_prompt = args.prompt
 verbose = args.verbose
+stream = args.stream
+token_budget = args.token_budget if args.compact else None
+memoize = args.memo
+RUN_CACHE.enabled = args.cache_runs
+
+# Every request goes through this object: the rate-limited Groq API (or a replayed
+# cassette), optionally wrapped by the on-disk cache and then by the cassette recorder
+replay = None
+rate_limiter = None
+if args.replay:
+    replay = ReplayCompletions(args.replay, latency=args.replay_latency)
+    completions = replay
+else:
+    # Retries are handled by the rate limiter, which also honours retry-after
+    client = AsyncGroq(api_key=api_key, max_retries=0)
+    rate_limiter = RateLimiter(args.rpm, args.tpm)
+    completions = RateLimitedCompletions(client.chat.completions, rate_limiter, args.max_retries, verbose)
+
+completion_cache = None
+if args.cache:
+    completion_cache = CompletionCache(
+        args.cache_path,
+        max_bytes=int(args.cache_max_mb * 1024 * 1024),
+        ttl_seconds=args.cache_ttl,
+    )
+    completions = CachedCompletions(completions, completion_cache, verbose)
+
+if args.record:
+    completions = RecordingCompletions(completions, args.record)
+
+def build_messages(user_prompt, working_directory=WORKING_DIRECTORY):
+    """Create the initial messages list (Groq-adapted structure) for one prompt."""
+    content = system_prompt
+    if args.repo_map:
+        # Saves the model the listing round trips it would otherwise start with
+        started = time.perf_counter()
+        map_text, cached = repo_map(working_directory, args.repo_map_tokens)
+        content += "\n" + map_text
+        if verbose:
+            print(f"Repo map: ~{len(map_text) // 4} estimated tokens ({'cached' if cached else 'built'} in {(time.perf_counter() - started) * 1000:.1f} ms)")
+    if args.relevant_snippets:
+        # The code the prompt names is usually what the model would go looking for first
+        started = time.perf_counter()
+        snippets_text, count, reindexed = relevant_snippets(working_directory, user_prompt, args.relevant_snippets_count)
+        if snippets_text:
+            content += "\n" + snippets_text
+        if verbose:
+            print(f"Relevant snippets: {count}, ~{len(snippets_text) // 4} estimated tokens ({reindexed} files indexed, {(time.perf_counter() - started) * 1000:.1f} ms)")
+    return [
+        {
+            "role": "system",
+            "content": content
+        },
+        {
+            "role": "user", 
+            "content": user_prompt
+        }
+    ]
 
-# Create messages list (Groq-adapted structure)
-messages = [
-    {
-        "role": "system",
-        "content": system_prompt
-    },
-    {
-        "role": "user", 
-        "content": user_prompt
-    }
-]
 
 # Create conversation loop to handle multiple rounds of tool use
 max_iterations = 20
-iteration_count = 0
 
-# Output initial information if verbose
-if verbose:
-    print(f"User prompt: {user_prompt}")
 
-try:
+def print_streamed_text(text, state):
+    """Write a streamed content delta to the terminal, starting with the final-response header."""
+    if not state["started"]:
+        print("Final response:")
+        state["started"] = True
+    print(text, end="", flush=True)
+
+
+async def stream_completion(messages, scheduler, verbose=False):
+    """
+    Request a streamed completion, submitting each tool call to scheduler as soon as it is complete.
+    
+    Returns:
+        StreamResult with the assembled assistant message and usage
+    """
+    started = time.perf_counter()
+    text_state = {"started": False}
+    completion_stream = await completions.create(
+        model="llama3-70b-8192",
+        messages=messages,
+        tools=available_functions,
+        tool_choice="auto",
+        stream=True
+    )
+    result = await consume_stream(
+        completion_stream,
+        started,
+        on_text=lambda text: print_streamed_text(text, text_state),
+        on_tool_call=scheduler.submit,
+    )
+    if text_state["started"]:
+        print()
+    
+    if verbose:
+        first_byte = f"{result.first_byte_seconds:.2f}s" if result.first_byte_seconds is not None else "n/a"
+        first_action = f"{result.first_action_seconds:.2f}s" if result.first_action_seconds is not None else "n/a"
+        print(f"Time to first byte: {first_byte}, time to first tool call: {first_action}")
+    return result
+
+
+def print_session_summary(session, iteration_count):
+    """Print how a session's wall time split between the model and the tools."""
+    total_seconds = time.perf_counter() - session["started"]
+    print(f"Session: {iteration_count} iterations in {total_seconds:.2f}s - model: {session['model_seconds']:.2f}s, tools: {session['tool_seconds']:.2f}s, agent overhead: {total_seconds - session['model_seconds'] - session['tool_seconds']:.2f}s")
+    if session["memo"] is not None:
+        print(f"Tool memo - {session['memo'].hits} of {session['memo'].call_count} tool calls answered as unchanged")
+
+
+async def run_conversation(messages, verbose=False, stream=False, token_budget=None, working_directory=WORKING_DIRECTORY, memoize=False):
+    """
+    Run the tool-use loop until the model gives a final answer or max_iterations is hit.
+    
+    Args:
+        messages: Conversation so far; assistant and tool messages are appended in place
+        verbose: If True, print token counts and function results
+        stream: If True, stream each response and start tool calls while it is still arriving
+        token_budget: If set, send a compacted copy of messages aimed at this many estimated tokens
+        working_directory: Directory the agent's functions are confined to
+        memoize: If True, repeated reads of unchanged paths get a short reply instead of the full output
+        
+    Returns:
+        str: The final response text, or None if the conversation ended without one
+    """
+    iteration_count = 0
+    memo = ToolCallMemo() if memoize else None
+    session = {"started": time.perf_counter(), "model_seconds": 0.0, "tool_seconds": 0.0, "memo": memo}
+    
     while iteration_count < max_iterations:
         iteration_count += 1
+        scheduler = ToolCallScheduler(verbose, working_directory, memo)
+        
+        # Compact what we send; the full transcript in messages is kept as is
+        request_messages = messages
+        if token_budget is not None:
+            compaction = compact_messages(messages, token_budget)
+            request_messages = compaction.messages
+            if verbose:
+                print(f"Iteration {iteration_count} - Context compaction: {compaction.tokens_before} -> {compaction.tokens_after} estimated tokens (saved {compaction.tokens_saved}; {compaction.elided} elided, {compaction.trimmed} trimmed)")
         
         # Make API call with current messages
-        response = client.chat.completions.create(
-            model="llama3-70b-8192",  # Groq's 70B model with function calling support         
-            messages=messages,
-            tools=available_functions,
-            tool_choice="auto"
-        )
+        request_started = time.perf_counter()
+        if stream:
+            result = await stream_completion(request_messages, scheduler, verbose)
+            response_message = result.message
+            usage = result.usage
+        else:
+            response = await completions.create(
+                model="llama3-70b-8192",  # Groq's 70B model with function calling support         
+                messages=request_messages,
+                tools=available_functions,
+                tool_choice="auto"
+            )
+            response_message = response.choices[0].message
+            usage = response.usage
+        session["model_seconds"] += time.perf_counter() - request_started
         
         # Output token usage if verbose
-        if verbose:
-            print(f"Iteration {iteration_count} - Prompt tokens: {response.usage.prompt_tokens}, Response tokens: {response.usage.completion_tokens}")
-        
-        # Get the response message
-        response_message = response.choices[0].message
+        if verbose and usage is not None:
+            print(f"Iteration {iteration_count} - Prompt tokens: {usage.prompt_tokens}, Response tokens: {usage.completion_tokens}")
         
         # Add the assistant's response to the conversation
         messages.append({
@@ -191,15 +482,17 @@ try:
         tool_calls = response_message.tool_calls
         
         if tool_calls:
-            # Handle each function call
-            for tool_call in tool_calls:
-                function_name = tool_call.function.name
-                function_args = json.loads(tool_call.function.arguments)
-                
-                # Create a GroqFunctionCall object and use our call_function
-                function_call_part = GroqFunctionCall(function_name, function_args)
-                function_call_result = call_function(function_call_part, verbose)
-                
+            # Run this turn's function calls, independent ones concurrently
+            # (when streaming they were already submitted as they arrived)
+            if not stream:
+                for tool_call in tool_calls:
+                    scheduler.submit(tool_call)
+            tools_started = time.perf_counter()
+            function_call_results = await scheduler.results()
+            session["tool_seconds"] += time.perf_counter() - tools_started
+            
+            # Results come back in tool_calls order, so the transcript stays deterministic
+            for tool_call, function_call_result in zip(tool_calls, function_call_results):
                 # Check if we got a valid response
                 if not hasattr(function_call_result, 'parts') or not function_call_result.parts:
                     raise Exception("call_function did not return a valid response with parts")
@@ -211,7 +504,7 @@ try:
                 messages.append({
                     "role": "tool",
                     "tool_call_id": tool_call.id,
-                    "name": function_name,
+                    "name": tool_call.function.name,
                     "content": json.dumps(function_call_result.parts[0].function_response.response)
                 })
                 
@@ -224,20 +517,100 @@ try:
         
         # If no tool calls and we have a text response, we're done
         if response_message.content:
-            print("Final response:")
-            print(response_message.content)
-            break
+            if not stream:
+                print("Final response:")
+                print(response_message.content)
+            if verbose:
+                print_session_summary(session, iteration_count)
+            return response_message.content
         
         # If we somehow get here without content or tool calls, break to avoid infinite loop
         if not response_message.content and not tool_calls:
             print("No response content or tool calls. Ending conversation.")
-            break
+            if verbose:
+                print_session_summary(session, iteration_count)
+            return None
+    
+    print(f"Reached maximum iterations ({max_iterations}). Ending conversation.")
+    if verbose:
+        print_session_summary(session, iteration_count)
+    return None
+
+
+async def run_batch_prompt(prompt, batch_working_directory):
+    """Run one batch prompt as its own session, sharing the client and its connection pool."""
+    if verbose:
+        print(f"User prompt: {prompt}")
+    messages = await asyncio.to_thread(build_messages, prompt, batch_working_directory)
+    return await run_conversation(messages, verbose, stream, token_budget, batch_working_directory, memoize)
+
+
+async def run_daemon_request(request):
+    """Run one prompt received by the daemon, with the client's display options."""
+    # Options can be switched on by either the client or the daemon's own command line
+    request_verbose = request.get("verbose") or verbose
+    if request_verbose:
+        print(f"User prompt: {request['prompt']}")
+    request_token_budget = args.token_budget if request.get("compact") or args.compact else None
+    messages = await asyncio.to_thread(build_messages, request["prompt"])
+    return await run_conversation(
+        messages,
+        request_verbose,
+        request.get("stream") or stream,
+        request_token_budget,
+        memoize=request.get("memo") or memoize,
+    )
+
+
+# Start ./calculator's warm Python interpreter while the first request is in flight
+# (batch sessions each run in their own copy, so theirs start on first use)
+if PYTHON_POOL_ENABLED and not args.batch:
+    prewarm_python(WORKING_DIRECTORY)
+
+try:
+    if args.daemon:
+        try:
+            asyncio.run(serve(args.socket, run_daemon_request))
+        except KeyboardInterrupt:
+            print("Agent daemon stopped.")
+    elif args.batch:
+        batch_output = args.batch_output or os.path.splitext(args.batch)[0] + ".results.jsonl"
+        batch_started = time.perf_counter()
+        batch_counts = asyncio.run(run_batch(args.batch, batch_output, run_batch_prompt, WORKING_DIRECTORY, args.concurrency))
+        print(f"Batch finished in {time.perf_counter() - batch_started:.2f}s - completed: {batch_counts['completed']}, failed: {batch_counts['failed']}, skipped (already done): {batch_counts['skipped']}. Results: {batch_output}")
+    else:
+        # Output initial information if verbose
+        if verbose:
+            print(f"User prompt: {user_prompt}")
+        
+        asyncio.run(run_conversation(build_messages(user_prompt), verbose, stream, token_budget, memoize=memoize))
+    
+    if completion_cache is not None and verbose:
+        cache_stats = completion_cache.stats()
+        print(f"Completion cache - hits: {cache_stats['hits']}, misses: {cache_stats['misses']}, evictions: {cache_stats['evictions']}, entries: {cache_stats['entries']} ({cache_stats['bytes']} bytes)")
+    
+    if rate_limiter is not None and verbose:
+        print(f"Rate limiter - waited: {rate_limiter.waited_seconds:.2f}s, retries: {rate_limiter.retries}")
+    
+    if verbose and RUN_CACHE.enabled:
+        print(f"Script result cache - hits: {RUN_CACHE.hits}, misses: {RUN_CACHE.misses}")
+    
+    if verbose and PYTHON_POOL_ENABLED:
+        pool_stats = PYTHON_POOL.stats()
+        if pool_stats["executions"]:
+            print(f"Python pool - executions: {pool_stats['executions']}, overhead: {pool_stats['overhead_seconds'] / pool_stats['executions'] * 1000:.1f} ms per execution, interpreters started: {pool_stats['starts']} ({pool_stats['startup_seconds']:.2f}s)")
+    
+    if verbose:
+        tool_stats = ", ".join(f"{name}: {registered.calls} ({registered.seconds:.2f}s)" for name, registered in TOOLS.items() if registered.calls)
+        if tool_stats:
+            print(f"Tool calls - {tool_stats}")
     
-    if iteration_count >= max_iterations:
-        print(f"Reached maximum iterations ({max_iterations}). Ending conversation.")
+    if replay is not None and verbose:
+        replay_stats = replay.stats()
+        print(f"Cassette replay - served: {replay_stats['served']} ({replay_stats['exact']} exact, {replay_stats['fallback']} in recorded order), remaining: {replay_stats['remaining']}")
 
 except Exception as e:
     print(f"Error during conversation: {str(e)}")
     if verbose:
         import traceback
-        traceback.print_exc()
\ No newline at end of file
+        traceback.print_exc()
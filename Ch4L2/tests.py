@@ -1,15 +1,16 @@
 #!/usr/bin/env python3
 """
-Manual testing script for the write_file and run_python_file functions.
+Manual testing script for the write_file, get_files_info and run_python_file functions.
 Run with: uv run tests.py
 """
 
 from functions.write_file import write_file
+from functions.get_files_info import get_files_info
 from functions.run_python import run_python_file
 
 
 def main():
-    """Run manual tests for the write_file and run_python_file functions."""
+    """Run manual tests for the write_file, get_files_info and run_python_file functions."""
     
     print("=== Testing write_file function ===")
     
@@ -31,6 +32,15 @@ def main():
     print(f"    {result3}")
     print()
     
+    print("=== Testing get_files_info function ===")
+    
+    # Test 1: List recursively after the writes above (should not show .agent_cache, where they are journaled)
+    print('get_files_info("calculator", recursive=True, respect_gitignore=False):')
+    listing = get_files_info("calculator", recursive=True, respect_gitignore=False)
+    print(f"    {listing}")
+    print(f"    .agent_cache listed: {'.agent_cache' in listing}")
+    print()
+    
     print("=== Testing run_python_file function ===")
     
     # Test 1: Run calculator main.py (should print usage instructions)